@@ -0,0 +1,470 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+# Load generator: N simulated players against webui.py (Socket.IO) or the
+# telnet server, with a realistic command mix.
+#
+# Each bot logs in, then loops: think, send a command, wait for its reply.
+# Bots wander through the exits they are shown, fight with attack/run when
+# jumped, and shop/buy in vendor rooms. Reported:
+#   - command round trip p50/p95/p99: send -> the server's acknowledgement
+#     that the command ran and its reply went out (a telnet timing mark, a
+#     Socket.IO ack), so fight rounds and others' chatter don't count
+#   - broadcast lag ('go' sent -> others see "<name> enters the room.")
+#   - server CPU and RSS per player (needs --spawn or --server-pid; Linux /proc)
+#   - tick duration and overruns (web only, via /admin/stats.json)
+#
+#   python bench/loadgen.py --target telnet --spawn --clients 500 --duration 30
+#   python bench/loadgen.py --target web --spawn --clients 200 --json results.json
+#   python bench/loadgen.py --target web --url http://127.0.0.1:5000 --prefix bench \
+#       --password pw --server-pid 1234
+#
+# The web client needs `python-socketio[asyncio_client]` (aiohttp). Against
+# a server you started yourself, create the accounts first with --seed-db,
+# and start it with AUTH_RATE_LIMIT above --clients: all bots log in from
+# one address, and the default limit is 10 logins a minute (--spawn sets
+# this for you).
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Weighted command mixes when not in a fight; '{dir}' and '{item}' are filled in
+MIXES = {
+    'explore': {'go {dir}': 40, 'look': 25, 'who': 5, 'credits': 5, 'shop': 10, 'buy {item}': 10, 'search': 5},
+    'social': {'look': 40, 'who': 30, 'go {dir}': 20, 'credits': 10},
+    'shopper': {'shop': 30, 'buy {item}': 30, 'go {dir}': 30, 'look': 10},
+}
+FIGHT_MIX = {'attack': 85, 'run': 15}
+
+# AUTH_RATE_LIMIT for a --spawn web server (logins per address per window)
+BENCH_AUTH_RATE_LIMIT = 1000000
+BUY_ITEMS = ('stimpack', 'energy drink', 'ammo')
+
+BROADCAST_RE = re.compile(r'^(?P<name>.+) (?:enters|leaves) the room\.$|^.+ disconnects\.$')
+ENTER_RE = re.compile(r'^(?P<name>.+) enters the room\.$')
+EXITS_RE = re.compile(r'^Exits: (?P<exits>.+)$', re.M)
+FIGHT_START = ("You're in a fight", 'You are in a fight')
+FIGHT_END = ('You win the fight', 'You manage to escape', 'knocked out', "You're not in a fight")
+# Telnet timing mark (RFC 860), answered by the server after a line's replies
+TIMING_MARK_REQUEST = bytes((255, 253, 6))
+TIMING_MARK_REPLY = bytes((255, 251, 6))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def summarize(values_ms):
+    return {
+        'count': len(values_ms),
+        'p50_ms': round(percentile(values_ms, 50), 3),
+        'p95_ms': round(percentile(values_ms, 95), 3),
+        'p99_ms': round(percentile(values_ms, 99), 3),
+        'max_ms': round(max(values_ms) if values_ms else 0.0, 3),
+    }
+
+
+def weighted(mix):
+    names = list(mix)
+    return random.choices(names, weights=[mix[n] for n in names])[0]
+
+
+class Recorder:
+    """Shared results for all bots in this process."""
+
+    def __init__(self):
+        self.rtt_ms = {}
+        self.broadcast_ms = []
+        self.moves = {}
+        self.errors = 0
+        self.connected = 0
+        self.failed = 0
+
+    def command(self, verb, ms):
+        self.rtt_ms.setdefault(verb, []).append(ms)
+
+    def all_rtt(self):
+        return [v for values in self.rtt_ms.values() for v in values]
+
+
+class Bot:
+    """Transport-independent player logic; subclasses do the I/O."""
+
+    def __init__(self, name, recorder, mix, think):
+        self.name = name
+        self.recorder = recorder
+        self.mix = MIXES[mix]
+        self.think = think
+        self.exits = ['north', 'south', 'east', 'west']
+        self.in_fight = False
+        self._pending = None
+
+    def next_command(self):
+        if self.in_fight:
+            return weighted(FIGHT_MIX)
+        cmd = weighted(self.mix)
+        return cmd.format(dir=random.choice(self.exits), item=random.choice(BUY_ITEMS))
+
+    def on_text(self, text):
+        # Called for every message (one telnet line or one Socket.IO message)
+        now = time.perf_counter()
+        line = text.strip()
+        m = ENTER_RE.match(line)
+        if m:
+            sent = self.recorder.moves.get(m.group('name'))
+            if sent is not None:
+                self.recorder.broadcast_ms.append((now - sent) * 1000.0)
+            return
+        if BROADCAST_RE.match(line):
+            return
+        exits = EXITS_RE.search(text)
+        if exits:
+            self.exits = [e.strip() for e in exits.group('exits').split(',') if e.strip()] or self.exits
+        if any(s in text for s in FIGHT_START) or 'rushes in' in text or 'lunges at you' in text:
+            self.in_fight = True
+        if any(s in text for s in FIGHT_END):
+            self.in_fight = False
+
+    def on_answered(self):
+        # The server has finished the command in flight; its reply, if
+        # any, already went through on_text
+        if self._pending is not None and not self._pending.done():
+            self._pending.set_result(time.perf_counter())
+
+    async def run(self, deadline, timeout):
+        loop = asyncio.get_running_loop()
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(random.uniform(*self.think))
+            cmd = self.next_command()
+            verb = cmd.split(' ', 1)[0]
+            self._pending = loop.create_future()
+            sent = time.perf_counter()
+            if verb == 'go':
+                self.recorder.moves[self.name] = sent
+            try:
+                await self.send(cmd)
+                done = await asyncio.wait_for(self._pending, timeout)
+            except (asyncio.TimeoutError, ConnectionError, OSError):
+                self.recorder.errors += 1
+                continue
+            self.recorder.command(verb, (done - sent) * 1000.0)
+
+    async def send(self, line):
+        raise NotImplementedError
+
+
+class TelnetBot(Bot):
+    async def connect(self, host, port):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        welcome = (await self.reader.readline()).decode('utf-8', 'replace')
+        m = re.search(r'You are (\S+?)\.', welcome)
+        if m:
+            self.name = m.group(1)
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    async def _read_loop(self):
+        # Lines, plus timing mark replies; the server sends those between
+        # lines, never inside one
+        buf = b''
+        while True:
+            data = await self.reader.read(65536)
+            if not data:
+                break
+            buf += data
+            while buf:
+                if buf.startswith(TIMING_MARK_REPLY):
+                    buf = buf[len(TIMING_MARK_REPLY):]
+                    self.on_answered()
+                    continue
+                end = buf.find(b'\n')
+                if end < 0:
+                    break
+                self.on_text(buf[:end + 1].decode('utf-8', 'replace'))
+                buf = buf[end + 1:]
+
+    async def send(self, line):
+        self.writer.write(line.encode('utf-8') + TIMING_MARK_REQUEST + b'\r\n')
+        await self.writer.drain()
+
+    async def close(self):
+        self.writer.close()
+        self._reader_task.cancel()
+
+
+class WebBot(Bot):
+    async def connect(self, url, password, http):
+        import aiohttp
+        import socketio
+        self.http = aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True), connector=http,
+                                          connector_owner=False)
+        async with self.http.post(f'{url}/login', data={'username': self.name, 'password': password},
+                                  allow_redirects=False) as resp:
+            if resp.status != 302:
+                raise ConnectionError(f'login failed for {self.name} ({resp.status})')
+        cookie = '; '.join(f'{c.key}={c.value}' for c in self.http.cookie_jar)
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.sio.on('message', lambda data: self.on_text((data or {}).get('data', '')))
+        await self.sio.connect(url, headers={'Cookie': cookie}, transports=['websocket'])
+
+    async def send(self, line):
+        # Acked once the handler returns, after the reply message was sent
+        await self.sio.emit('command', {'command': line}, callback=lambda *_: self.on_answered())
+
+    async def close(self):
+        await self.sio.disconnect()
+        await self.http.close()
+
+
+class ProcSampler:
+    """CPU time and RSS of a server process from /proc (Linux)."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+    def sample(self):
+        try:
+            with open(f'/proc/{self.pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{self.pid}/status') as f:
+                rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+        except (OSError, StopIteration, IndexError, ValueError):
+            return None
+        cpu = (int(fields[11]) + int(fields[12])) / float(self.ticks)
+        return {'t': time.perf_counter(), 'cpu_s': cpu, 'rss_kb': rss_kb}
+
+
+def seed_accounts(db_path, prefix, count, password):
+    # Create bench accounts (race/class chosen) directly in an accounts DB
+    sys.path.insert(0, ROOT)
+    from game.storage import AccountStore
+    from werkzeug.security import generate_password_hash
+    hashed = generate_password_hash(password)
+    store = AccountStore(db_path)
+    store.save_many({
+        f'{prefix}{i}': {
+            'password': hashed, 'email': '', 'verified': True, 'race': 'Human',
+            'char_class': 'Fixer', 'char_name': f'{prefix}{i}', 'credits': 1000,
+        }
+        for i in range(count)
+    }.items())
+    store.close()
+
+
+def wait_for_port(host, port, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1.0):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(args, tmp):
+    # Start webui.py or server.py as a child process with throwaway data
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    if args.target == 'web':
+        db = os.path.join(tmp, 'accounts.db')
+        seed_accounts(db, args.prefix, args.clients, args.password)
+        # Every bot logs in from 127.0.0.1, so lift the per-address auth
+        # rate limit; keep the server's other state out of data/ too
+        env.update(ACCOUNTS_DB=db, PORT=str(port), AUTH_RATE_LIMIT=str(BENCH_AUTH_RATE_LIMIT),
+                   ITEMS_DB=os.path.join(tmp, 'items.db'), MAIL_QUEUE_DB=os.path.join(tmp, 'outbox.db'),
+                   MAIL_FILE_DIR=os.path.join(tmp, 'mail'))
+        cmd = [sys.executable, os.path.join(ROOT, 'webui.py')]
+    else:
+        env.update(TELNET_HOST='127.0.0.1', TELNET_PORT=str(port))
+        cmd = [sys.executable, os.path.join(ROOT, 'server.py')]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_for_port('127.0.0.1', port):
+        proc.kill()
+        raise SystemExit('server did not start')
+    return proc, port
+
+
+async def admin_stats(url, user, password):
+    # Tick/save/command stats from the web server (None if unavailable)
+    try:
+        import aiohttp
+        async with aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True)) as http:
+            await http.post(f'{url}/admin_login', data={'username': user, 'password': password})
+            async with http.get(f'{url}/admin/stats.json') as resp:
+                if resp.status != 200:
+                    return None
+                return await resp.json()
+    except Exception:
+        return None
+
+
+async def run_load(args, url, host, port, sampler):
+    recorder = Recorder()
+    bots = []
+    http = None
+    if args.target == 'web':
+        import aiohttp
+        http = aiohttp.TCPConnector(limit=0)
+    before = await admin_stats(url, args.admin_user, args.admin_password) if args.target == 'web' else None
+    idle = sampler.sample() if sampler else None
+    # Ramp up with bounded concurrency so logins don't stampede the server
+    gate = asyncio.Semaphore(args.ramp)
+
+    async def start(i):
+        if args.target == 'web':
+            bot = WebBot(f'{args.prefix}{i}', recorder, args.mix, args.think)
+        else:
+            bot = TelnetBot(f'guest{i}', recorder, args.mix, args.think)
+        async with gate:
+            try:
+                if args.target == 'web':
+                    await bot.connect(url, args.password, http)
+                else:
+                    await bot.connect(host, port)
+            except Exception:
+                recorder.failed += 1
+                return None
+        recorder.connected += 1
+        return bot
+
+    bots = [b for b in await asyncio.gather(*(start(i) for i in range(args.clients))) if b is not None]
+    loaded = sampler.sample() if sampler else None
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(b.run(deadline, args.timeout) for b in bots))
+    elapsed = time.perf_counter() - started
+    end = sampler.sample() if sampler else None
+    after = await admin_stats(url, args.admin_user, args.admin_password) if args.target == 'web' else None
+    await asyncio.gather(*(b.close() for b in bots), return_exceptions=True)
+    if http is not None:
+        await http.close()
+
+    commands = recorder.all_rtt()
+    result = {
+        'target': args.target,
+        'clients': args.clients,
+        'connected': recorder.connected,
+        'connect_failures': recorder.failed,
+        'duration_s': round(elapsed, 3),
+        'mix': args.mix,
+        'commands': len(commands),
+        'commands_per_s': round(len(commands) / elapsed, 2) if elapsed else 0.0,
+        'timeouts_or_errors': recorder.errors,
+        'round_trip': summarize(commands),
+        'round_trip_by_command': {verb: summarize(v) for verb, v in sorted(recorder.rtt_ms.items())},
+        'broadcast_lag': summarize(recorder.broadcast_ms),
+        'server': None,
+        'ticks': None,
+    }
+    if idle and loaded and end:
+        cpu_s = end['cpu_s'] - loaded['cpu_s']
+        players = max(1, recorder.connected)
+        result['server'] = {
+            'cpu_percent': round(100.0 * cpu_s / (end['t'] - loaded['t']), 2),
+            'cpu_ms_per_command': round(1000.0 * cpu_s / len(commands), 3) if commands else None,
+            'cpu_ms_per_player_s': round(1000.0 * cpu_s / players / elapsed, 4),
+            'rss_idle_mb': round(idle['rss_kb'] / 1024.0, 2),
+            'rss_loaded_mb': round(end['rss_kb'] / 1024.0, 2),
+            'rss_per_player_kb': round((end['rss_kb'] - idle['rss_kb']) / players, 2),
+        }
+    if after:
+        ticks = after.get('ticks', {})
+        base = (before or {}).get('ticks', {})
+        result['ticks'] = {
+            'ticks': ticks.get('ticks', 0) - base.get('ticks', 0),
+            'overruns': ticks.get('overruns', 0) - base.get('overruns', 0),
+            'skipped_ticks': ticks.get('skipped_ticks', 0) - base.get('skipped_ticks', 0),
+            'max_tick_ms': ticks.get('max_tick_ms'),
+            'max_drift_ms': ticks.get('max_drift_ms'),
+            'systems': ticks.get('systems'),
+        }
+    return result
+
+
+def git_revision():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulated players against the web or telnet server')
+    parser.add_argument('--target', choices=('web', 'telnet'), default='web')
+    parser.add_argument('--clients', type=int, default=100, help='simulated players')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds of load after all clients connect')
+    parser.add_argument('--mix', choices=sorted(MIXES), default='explore', help='command mix')
+    parser.add_argument('--think', type=float, nargs=2, default=(0.5, 2.0), metavar=('MIN', 'MAX'),
+                        help='seconds between a bot\'s commands')
+    parser.add_argument('--timeout', type=float, default=10.0, help='seconds to wait for a reply')
+    parser.add_argument('--ramp', type=int, default=50, help='concurrent logins while connecting')
+    parser.add_argument('--spawn', action='store_true', help='start the server as a child process')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='web server URL')
+    parser.add_argument('--host', default='127.0.0.1', help='telnet host')
+    parser.add_argument('--port', type=int, default=4000, help='telnet port')
+    parser.add_argument('--server-pid', type=int, help='sample CPU/RSS of this process')
+    parser.add_argument('--prefix', default='bench', help='web account name prefix')
+    parser.add_argument('--password', default='benchpass', help='web account password')
+    parser.add_argument('--seed-db', help='create the bench accounts in this accounts DB and exit')
+    parser.add_argument('--admin-user', default='admin')
+    parser.add_argument('--admin-password', default='adminpass')
+    parser.add_argument('--json', dest='json_path', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    if args.seed_db:
+        seed_accounts(args.seed_db, args.prefix, args.clients, args.password)
+        print(f'Seeded {args.clients} accounts into {args.seed_db}')
+        return None
+
+    proc = None
+    tmp = tempfile.mkdtemp(prefix='mud-loadgen-')
+    url, host, port = args.url.rstrip('/'), args.host, args.port
+    pid = args.server_pid
+    if args.spawn:
+        proc, spawned_port = spawn_server(args, tmp)
+        pid = proc.pid
+        if args.target == 'web':
+            url = f'http://127.0.0.1:{spawned_port}'
+        else:
+            host, port = '127.0.0.1', spawned_port
+    sampler = ProcSampler(pid) if pid and os.path.exists(f'/proc/{pid}') else None
+    try:
+        result = asyncio.run(run_load(args, url, host, port, sampler))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+    result['revision'] = git_revision()
+    result['timestamp'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(result, f, indent=2)
+    return result
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Measures command latency while the game loop ticks under load.
+#
+# Connects N idle players plus one probe through the Socket.IO test client,
+# runs the tick engine at a fast rate, and has the probe issue commands on a
+# fixed schedule. Latency is measured from the scheduled send time, so time a
+# command spends waiting for a busy tick to yield the hub is included.
+#
+#   python bench/tick_latency.py --players 500 --commands 300 --tick 0.2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROBE_COMMANDS = ['look', 'credits', 'shop', 'go north', 'go south']
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def summarize(values_ms):
+    return {
+        'count': len(values_ms),
+        'p50_ms': round(percentile(values_ms, 50), 3),
+        'p95_ms': round(percentile(values_ms, 95), 3),
+        'p99_ms': round(percentile(values_ms, 99), 3),
+        'max_ms': round(max(values_ms) if values_ms else 0.0, 3),
+    }
+
+
+def connect(webui, username):
+    # Sessions are injected directly; the account never logs in over HTTP
+    webui.accounts[username] = {
+        'password': '',
+        'email': '', 'verified': True, 'race': 'Human', 'char_class': 'Fixer',
+        'char_name': username, 'credits': 1000, 'current_room': 'start',
+    }
+    http = webui.app.test_client()
+    with http.session_transaction() as sess:
+        sess['username'] = username
+    return webui.socketio.test_client(webui.app, flask_test_client=http)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Command latency while the game loop ticks under load')
+    parser.add_argument('--players', type=int, default=300, help='idle connected players')
+    parser.add_argument('--commands', type=int, default=200, help='probe commands to send')
+    parser.add_argument('--interval', type=float, default=0.02, help='seconds between probe commands')
+    parser.add_argument('--tick', type=float, default=0.2, help='TICK_SECONDS for the run')
+    parser.add_argument('--batch', type=int, default=100, help='TICK_BATCH_SIZE for the run')
+    parser.add_argument('--json', dest='json_path', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix='mud-bench-')
+    os.environ['ACCOUNTS_DB'] = os.path.join(tmp, 'accounts.db')
+    os.environ['TICK_SECONDS'] = str(args.tick)
+    os.environ['MOB_TICK_SECONDS'] = str(args.tick)
+    os.environ['TICK_BATCH_SIZE'] = str(args.batch)
+    os.environ['SAVE_INTERVAL'] = str(max(args.tick, 1.0))
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    import webui
+
+    idle = [connect(webui, f'bench{i}') for i in range(args.players)]
+    probe = connect(webui, 'probe')
+
+    lag_ms, service_ms = [], []
+    start = time.perf_counter() + 0.5
+    for k in range(args.commands):
+        scheduled = start + k * args.interval
+        delay = scheduled - time.perf_counter()
+        eventlet.sleep(max(0.0, delay))
+        sent = time.perf_counter()
+        probe.emit('command', {'command': random.choice(PROBE_COMMANDS)})
+        done = time.perf_counter()
+        lag_ms.append((done - scheduled) * 1000.0)
+        service_ms.append((done - sent) * 1000.0)
+        probe.get_received()
+        # Drain idle clients so their queues don't grow without bound
+        if k % 10 == 0:
+            for c in idle:
+                c.get_received()
+
+    result = {
+        'players': args.players,
+        'tick_seconds': args.tick,
+        'batch_size': args.batch,
+        'command_latency': summarize(lag_ms),
+        'command_service': summarize(service_ms),
+        'ticks': webui.ticker.snapshot(),
+    }
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(result, f, indent=2)
+    return result
+
+
+if __name__ == '__main__':
+    main()
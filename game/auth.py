@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from game.metrics import REGISTRY
+
+HASH_SECONDS = REGISTRY.histogram('mud_auth_hash_seconds', 'Time spent hashing or checking one password', ('op',))
+HASH_WAIT_SECONDS = REGISTRY.histogram('mud_auth_hash_wait_seconds', 'Time a password job waited for a free worker')
+HASH_INFLIGHT = REGISTRY.gauge('mud_auth_hash_inflight', 'Password jobs running in the worker pool')
+HASH_WAITING = REGISTRY.gauge('mud_auth_hash_waiting', 'Password jobs queued for a worker')
+AUTH_REJECTED = REGISTRY.counter('mud_auth_rejected_total', 'Auth requests turned away before hashing', ('reason',))
+
+
+class AuthBusy(Exception):
+    """Too many password jobs queued already; the caller should retry later."""
+
+
+class PasswordHasher:
+    """Runs password hashing and checks off the calling thread.
+
+    Jobs go through `execute(fn, *args)` (in the web server, eventlet's
+    native thread pool, so the hub keeps serving players while PBKDF2 or
+    scrypt runs). At most `concurrency` run at once; up to `max_waiting`
+    more queue for a slot, for no longer than `wait_timeout` seconds.
+    Anything beyond that raises AuthBusy instead of piling up.
+    """
+
+    def __init__(self, concurrency=4, max_waiting=64, wait_timeout=10.0, execute=None, semaphore=None):
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        # Without an executor the work runs inline (telnet tools, scripts)
+        self.execute = execute or (lambda fn, *args: fn(*args))
+        self._slots = semaphore if semaphore is not None else threading.BoundedSemaphore(concurrency)
+        self._waiting = 0
+        self._inflight = 0
+        # Made on first use, in a worker, with the current default method
+        self._dummy_hash = None
+        self._hash_time = HASH_SECONDS.labels('hash')
+        self._check_time = HASH_SECONDS.labels('check')
+        HASH_INFLIGHT.set_function(lambda: self._inflight)
+        HASH_WAITING.set_function(lambda: self._waiting)
+
+    def hash(self, password):
+        return self._run(self._hash_time, generate_password_hash, password)
+
+    def check(self, pwhash, password):
+        # False for a missing password, without spending a worker. A missing
+        # hash (unknown user) is checked against a dummy one, so it takes as
+        # long as a wrong password for a real account.
+        if not password:
+            return False
+        if not pwhash:
+            return self._run(self._check_time, self._check_dummy, password)
+        return self._run(self._check_time, check_password_hash, pwhash, password)
+
+    def _check_dummy(self, password):
+        if self._dummy_hash is None:
+            self._dummy_hash = generate_password_hash(os.urandom(16).hex())
+        check_password_hash(self._dummy_hash, password)
+        return False
+
+    def _run(self, timer, fn, *args):
+        if self._waiting >= self.max_waiting:
+            AUTH_REJECTED.labels('busy').inc()
+            raise AuthBusy()
+        queued = time.perf_counter()
+        self._waiting += 1
+        try:
+            acquired = self._slots.acquire(timeout=self.wait_timeout)
+        finally:
+            self._waiting -= 1
+        if not acquired:
+            AUTH_REJECTED.labels('busy').inc()
+            raise AuthBusy()
+        started = time.perf_counter()
+        HASH_WAIT_SECONDS.observe(started - queued)
+        self._inflight += 1
+        try:
+            return self.execute(fn, *args)
+        finally:
+            self._inflight -= 1
+            self._slots.release()
+            timer.observe(time.perf_counter() - started)
+
+
+class RateLimiter:
+    """Per-key token bucket: `limit` attempts per `window` seconds, bursting
+    up to `limit`.
+
+    `hit(key)` spends one token and returns 0, or the seconds until the
+    next token if the bucket is empty. Full buckets are forgotten once the
+    table grows past `max_keys`, so a scan from many addresses can't grow
+    it without bound.
+    """
+
+    def __init__(self, limit=10, window=60.0, max_keys=10000, clock=time.monotonic):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self.clock = clock
+        self._rate = limit / window
+        # key -> [tokens, last refill time]
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key):
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._prune(now)
+                bucket = self._buckets[key] = [float(self.limit), now]
+            tokens = min(self.limit, bucket[0] + (now - bucket[1]) * self._rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                AUTH_REJECTED.labels('rate_limited').inc()
+                return (1 - tokens) / self._rate
+            bucket[0] = tokens - 1
+            return 0
+
+    def _prune(self, now):
+        # Drop buckets that would be full again by now
+        full = self.limit / self._rate
+        for key in [k for k, (_, last) in self._buckets.items() if now - last >= full]:
+            del self._buckets[key]
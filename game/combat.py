@@ -0,0 +1,349 @@
+import itertools
+import random
+
+from game.metrics import REGISTRY
+
+ENCOUNTERS = REGISTRY.gauge('mud_combat_encounters', 'Fights in progress')
+ROUNDS = REGISTRY.counter('mud_combat_rounds_total', 'Combat rounds resolved')
+
+# Stats for opponents that aren't in World.mob_types (e.g. the hallway addict)
+DEFAULT_MOB = {'hp': 40, 'damage': [5, 12], 'speed': 10}
+
+# Status effects: how many rounds they last and what they do each round
+STATUS_EFFECTS = {
+    # Loses its next turn
+    'stunned': {'rounds': 1, 'skip': True},
+    # Takes damage at the start of each turn
+    'bleeding': {'rounds': 3, 'dot': 3},
+}
+
+# Chance that an escape attempt succeeds
+FLEE_CHANCE = 0.5
+
+
+class Combatant:
+    """One side's fighter in an encounter: a player or a mob instance.
+
+    A player's HP is the player's own `hp`; a mob's lives here.
+    """
+
+    __slots__ = ('name', 'player', 'mob_hp', 'max_hp', 'speed', 'damage', 'on_hit',
+                 'from_world', 'effects', 'target', 'action')
+
+    def __init__(self, name, player=None, hp=0, speed=10, damage=(5, 12), on_hit=None, from_world=False):
+        self.name = name
+        self.player = player
+        self.mob_hp = hp
+        self.max_hp = hp
+        self.speed = speed
+        self.damage = tuple(damage)
+        # Status effect name -> chance to apply it on a hit (mobs)
+        self.on_hit = on_hit or {}
+        # Taken out of World.mobs_by_room; goes back if it survives
+        self.from_world = from_world
+        # Status effect name -> rounds left
+        self.effects = {}
+        self.target = None
+        # Queued player action for the next round ('flee'), None = attack
+        self.action = None
+
+    @property
+    def hp(self):
+        return self.player.hp if self.player is not None else self.mob_hp
+
+    @hp.setter
+    def hp(self, value):
+        value = max(0, value)
+        if self.player is not None:
+            self.player.hp = value
+        else:
+            self.mob_hp = value
+
+    @property
+    def alive(self):
+        return self.hp > 0
+
+
+class Encounter:
+    """A fight in one room: players on one side, mobs on the other."""
+
+    __slots__ = ('id', 'room', 'players', 'mobs', 'round', 'defeated')
+
+    def __init__(self, encounter_id, room):
+        self.id = encounter_id
+        self.room = room
+        self.players = []
+        self.mobs = []
+        self.round = 0
+        # Names of mobs beaten so far (for XP and 'search')
+        self.defeated = []
+
+    def living_mobs(self):
+        return [m for m in self.mobs if m.alive]
+
+
+class CombatEngine:
+    """Every fight in the world, resolved a round at a time on the tick.
+
+    Commands only start fights, join them, pick targets or queue a flee.
+    `tick()` resolves one round in every encounter: initiative is speed
+    plus a d6, each combatant acts in that order, and status effects tick
+    at the start of a combatant's turn. Output goes to players through
+    `notify(player, text, events)`, which the game core provides.
+    """
+
+    def __init__(self, world, round_seconds=2.0, batched=None):
+        self.world = world
+        self.round_seconds = round_seconds
+        # Optional iterator wrapper that yields between batches (TickEngine.batched)
+        self.batched = batched
+        self.notify = None
+        self.encounters = {}
+        self.by_room = {}
+        self._ids = itertools.count(1)
+
+    def mob_spec(self, name):
+        return self.world.mob_type(name) or DEFAULT_MOB
+
+    def encounter_in(self, room):
+        return self.by_room.get(room)
+
+    def engage(self, player, mob_name, hp=None, from_world=False):
+        # Start a fight between a player and one mob (or add the mob to the
+        # fight already going on in the room). With from_world the mob is
+        # taken out of the room's roaming mobs for the duration.
+        room = player.current_room
+        enc = self.by_room.get(room)
+        if enc is None:
+            enc = Encounter(next(self._ids), room)
+            self.encounters[enc.id] = enc
+            self.by_room[room] = enc
+            ENCOUNTERS.set(len(self.encounters))
+        spec = self.mob_spec(mob_name)
+        mob = Combatant(mob_name, hp=hp if hp is not None else spec.get('hp', DEFAULT_MOB['hp']),
+                        speed=spec.get('speed', DEFAULT_MOB['speed']),
+                        damage=spec.get('damage', DEFAULT_MOB['damage']),
+                        on_hit=spec.get('effects'), from_world=from_world)
+        if from_world:
+            self.world.take_mob(room, mob_name)
+        enc.mobs.append(mob)
+        if player.fight is None:
+            self._add_player(enc, player)
+        if player.fight.target is None or not player.fight.target.alive:
+            player.fight.target = mob
+        return enc
+
+    def join(self, player):
+        # Join the fight in the player's room, if there is one
+        enc = self.by_room.get(player.current_room)
+        if enc is None or player.fight is not None or not enc.living_mobs():
+            return None
+        self._add_player(enc, player)
+        player.fight.target = enc.living_mobs()[0]
+        return enc
+
+    def set_target(self, player, name):
+        # Aim at a mob by (partial) name; returns it, or None if not found
+        enc = self._encounter_of(player)
+        if enc is None:
+            return None
+        name = name.lower()
+        for mob in enc.living_mobs():
+            if mob.name.lower().startswith(name) or name in mob.name.lower():
+                player.fight.target = mob
+                return mob
+        return None
+
+    def flee(self, player):
+        # Queue an escape attempt for the next round
+        if player.fight is not None:
+            player.fight.action = 'flee'
+
+    def leave(self, player):
+        # Take a player out of their fight right away (e.g. disconnect)
+        enc = self._encounter_of(player)
+        if enc is None:
+            return
+        enc.players.remove(player.fight)
+        player.fight = None
+        if not enc.players:
+            self._end(enc)
+
+    def tick(self):
+        # Resolve one round in every active fight
+        encounters = list(self.encounters.values())
+        if self.batched is not None:
+            encounters = self.batched(encounters)
+        for enc in encounters:
+            if enc.id in self.encounters:
+                self.resolve_round(enc)
+
+    def resolve_round(self, enc):
+        enc.round += 1
+        ROUNDS.inc()
+        out = {c.player: [] for c in enc.players}
+        events = {c.player: set() for c in enc.players}
+        order = enc.players + enc.mobs
+        # Initiative: speed plus a d6, highest first
+        order.sort(key=lambda c: c.speed + random.randint(1, 6), reverse=True)
+        for actor in order:
+            if not actor.alive or (actor.player is not None and actor.player.fight is not actor):
+                continue
+            if self._tick_effects(enc, actor, out):
+                continue
+            if actor.player is not None:
+                self._player_turn(enc, actor, out, events)
+            else:
+                self._mob_turn(enc, actor, out, events)
+            if not enc.players or not enc.living_mobs():
+                break
+        self._settle(enc, out, events)
+        if self.notify is not None:
+            for player, lines in out.items():
+                if lines:
+                    self.notify(player, '\n'.join(lines), tuple(events[player]))
+
+    def _tick_effects(self, enc, actor, out):
+        # Apply status effects at the start of a turn; True if the turn is lost
+        skip = False
+        for name in list(actor.effects):
+            effect = STATUS_EFFECTS[name]
+            if effect.get('dot'):
+                actor.hp -= effect['dot']
+                self._say(enc, out, actor, f"You bleed for {effect['dot']} damage.",
+                          f"{self._label(actor)} bleeds for {effect['dot']} damage.")
+            if effect.get('skip'):
+                skip = True
+                self._say(enc, out, actor, "You're stunned and can't act!", f"{self._label(actor)} is stunned.")
+            actor.effects[name] -= 1
+            if actor.effects[name] <= 0:
+                del actor.effects[name]
+        if not actor.alive:
+            self._down(enc, actor, out)
+            return True
+        return skip
+
+    def _player_turn(self, enc, actor, out, events):
+        player = actor.player
+        if actor.action == 'flee':
+            actor.action = None
+            if random.random() < FLEE_CHANCE:
+                out[player].append("You manage to escape and flee the fight!")
+                self._broadcast(enc, out, f"{player.name} flees the fight!", exclude=actor)
+                enc.players.remove(actor)
+                player.fight = None
+                return
+            out[player].append("You try to run, but you can't break away!")
+            return
+        target = actor.target
+        if target is None or not target.alive:
+            living = enc.living_mobs()
+            if not living:
+                return
+            target = actor.target = living[0]
+        stats = player.stats.current()
+        crit = stats['crit_chance'] > 0 and random.random() < stats['crit_chance']
+        dmg = random.randint(6, 12) + max(0, stats['attack'] // 4) + stats['damage']
+        if crit:
+            dmg = int(dmg * 1.5)
+            target.effects['bleeding'] = STATUS_EFFECTS['bleeding']['rounds']
+            events[player].add('player_crit')
+        target.hp -= dmg
+        # Attacking costs endurance
+        player.endurance = max(0, player.endurance - random.randint(3, 7))
+        tag = ' (CRIT!)' if crit else ''
+        out[player].append(f"You hit the {target.name} (Atk {stats['attack']}) for {dmg} damage{tag}. "
+                           f"It has {target.hp} HP left.")
+        self._broadcast(enc, out, f"{player.name} hits the {target.name} for {dmg} damage{tag}.", exclude=actor)
+        if not target.alive:
+            self._down(enc, target, out)
+
+    def _mob_turn(self, enc, actor, out, events):
+        targets = [c for c in enc.players if c.alive]
+        if not targets:
+            return
+        target = random.choice(targets)
+        player = target.player
+        dmg = random.randint(*actor.damage)
+        target.hp -= dmg
+        # Taking hits wears down willpower
+        player.willpower = max(0, player.willpower - random.randint(2, 6))
+        events[player].add('player_hit')
+        out[player].append(f"The {actor.name} hits you for {dmg} damage!")
+        self._broadcast(enc, out, f"The {actor.name} hits {player.name} for {dmg} damage.", exclude=target)
+        for name, chance in actor.on_hit.items():
+            if name in STATUS_EFFECTS and random.random() < chance:
+                target.effects[name] = STATUS_EFFECTS[name]['rounds']
+                out[player].append(f"You are {name}!")
+        if not target.alive:
+            self._down(enc, target, out)
+
+    def _down(self, enc, combatant, out):
+        if combatant.player is None:
+            enc.defeated.append(combatant.name)
+            self._broadcast(enc, out, f"The {combatant.name} goes down.")
+            return
+        player = combatant.player
+        out[player].append("You were knocked out! You wake up later, dazed, with some health restored.")
+        self._broadcast(enc, out, f"{player.name} is knocked out!", exclude=combatant)
+        enc.players.remove(combatant)
+        player.fight = None
+
+    def _settle(self, enc, out, events):
+        # Close out the fight once one side is gone
+        if enc.players and not enc.living_mobs():
+            for c in list(enc.players):
+                player = c.player
+                xp_gain = sum(random.randint(15, 30) for _ in enc.defeated) or random.randint(15, 30)
+                leveled = player.gain_xp(xp_gain)
+                player.last_defeated = enc.defeated[-1] if enc.defeated else None
+                msg = f"You win the fight!\nYou gain {xp_gain} XP."
+                if leveled:
+                    msg += f"\nYou leveled up! You are now level {player.level}."
+                out[player].append(msg)
+                player.fight = None
+            enc.players.clear()
+        if not enc.players:
+            self._end(enc)
+
+    def _end(self, enc):
+        # Surviving roaming mobs go back to the streets
+        for mob in enc.living_mobs():
+            if mob.from_world:
+                self.world.spawn_mob(enc.room, mob.name)
+        for c in enc.players:
+            c.player.fight = None
+        self.encounters.pop(enc.id, None)
+        if self.by_room.get(enc.room) is enc:
+            del self.by_room[enc.room]
+        ENCOUNTERS.set(len(self.encounters))
+
+    def _encounter_of(self, player):
+        if player.fight is None:
+            return None
+        enc = self.by_room.get(player.current_room)
+        if enc is None or player.fight not in enc.players:
+            return None
+        return enc
+
+    def _add_player(self, enc, player):
+        fighter = Combatant(player.name or player.username or 'someone', player=player,
+                            speed=player.stats['speed'])
+        enc.players.append(fighter)
+        player.fight = fighter
+
+    @staticmethod
+    def _label(combatant):
+        return combatant.name if combatant.player is not None else f"The {combatant.name}"
+
+    def _say(self, enc, out, actor, own, others):
+        if actor.player is not None and actor.player in out:
+            out[actor.player].append(own)
+        self._broadcast(enc, out, others, exclude=actor)
+
+    @staticmethod
+    def _broadcast(enc, out, text, exclude=None):
+        # Tell every player still in the fight
+        for c in enc.players:
+            if c is not exclude and c.player in out:
+                out[c.player].append(text)
@@ -0,0 +1,108 @@
+import time
+
+from game.metrics import REGISTRY
+
+COMMAND_SECONDS = REGISTRY.histogram('mud_command_duration_seconds', 'Command handler run time', ('command',))
+
+
+class Command:
+    __slots__ = ('name', 'handler', 'aliases', 'in_fight', 'fight_only', 'usage', 'order', 'latency')
+
+    def __init__(self, name, handler, aliases=(), in_fight=False, fight_only=False, usage='', order=0):
+        self.name = name
+        self.handler = handler
+        self.aliases = tuple(aliases)
+        # in_fight: usable during a fight; fight_only: only during a fight
+        self.in_fight = in_fight or fight_only
+        self.fight_only = fight_only
+        self.usage = usage or name
+        self.order = order
+        self.latency = COMMAND_SECONDS.labels(name)
+
+
+class _TrieNode:
+    __slots__ = ('children', 'best')
+
+    def __init__(self):
+        self.children = {}
+        # Earliest-registered command whose name starts with this prefix
+        self.best = None
+
+
+class CommandRegistry:
+    """Verb table for the command parser.
+
+    Names go into a prefix trie so any unambiguous-by-priority abbreviation
+    resolves in O(len(verb)): 'sh' finds 'shop', 'eq' finds 'equip'. When
+    several commands share a prefix, the one registered first wins. Aliases
+    ('l', 'n', ...) only match exactly and take precedence over prefixes.
+    """
+
+    def __init__(self):
+        self.commands = []
+        self._exact = {}
+        self._root = _TrieNode()
+
+    def register(self, name, handler, aliases=(), **options):
+        cmd = Command(name, handler, aliases, order=len(self.commands), **options)
+        self.commands.append(cmd)
+        self._exact.setdefault(name, cmd)
+        for alias in cmd.aliases:
+            self._exact.setdefault(alias, cmd)
+        node = self._root
+        for ch in name:
+            node = node.children.setdefault(ch, _TrieNode())
+            if node.best is None:
+                node.best = cmd
+        return cmd
+
+    def command(self, name, aliases=(), **options):
+        # Decorator form of register()
+        def wrap(handler):
+            self.register(name, handler, aliases, **options)
+            return handler
+        return wrap
+
+    def resolve(self, verb):
+        cmd = self._exact.get(verb)
+        if cmd is not None:
+            return cmd
+        node = self._root
+        for ch in verb:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        return node.best
+
+    def parse(self, line):
+        # Split a raw line into (Command or None, verb, args) in one pass
+        line = line.strip()
+        verb, _, args = line.partition(' ')
+        verb = verb.lower()
+        if not verb:
+            return None, '', ''
+        return self.resolve(verb), verb, args.strip()
+
+    def run(self, cmd, *args, **kwargs):
+        # Call a command's handler, recording its latency
+        started = time.perf_counter()
+        try:
+            return cmd.handler(*args, **kwargs)
+        finally:
+            cmd.latency.observe(time.perf_counter() - started)
+
+    def timings(self):
+        # Per-command latency summary (count, mean and p50/p95/p99 bounds in ms)
+        out = {}
+        for cmd in self.commands:
+            h = cmd.latency
+            if not h.count:
+                continue
+            out[cmd.name] = {
+                'count': h.count,
+                'mean_ms': round(h.sum / h.count * 1000.0, 3),
+                'p50_ms': h.quantile(0.50) * 1000.0,
+                'p95_ms': h.quantile(0.95) * 1000.0,
+                'p99_ms': h.quantile(0.99) * 1000.0,
+            }
+        return out
@@ -0,0 +1,253 @@
+import bisect
+import sys
+import threading
+
+
+def _lock_module():
+    # Instruments are updated from the eventlet hub and from real OS threads
+    # (mail sender, profiler). Under monkey patching threading.Lock is a
+    # green lock that can't be shared across OS threads, so use the
+    # original one; it is only ever held for an add.
+    patcher = sys.modules.get('eventlet.patcher')
+    if patcher is not None and patcher.is_monkey_patched('thread'):
+        return patcher.original('threading')
+    return threading
+
+
+_threading = _lock_module()
+
+# Latency buckets in seconds (upper bounds), from 100µs to 10s
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """Fixed-bucket histogram: O(log buckets) per observation, no allocation."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One slot per bucket plus +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = _threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation. Past the
+        # top bucket this is the top bound (as Prometheus' histogram_quantile
+        # does), never inf, so results stay valid JSON.
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return self.buckets[-1]
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        return {
+            'buckets': self.buckets,
+            'counts': counts,
+            'sum': total,
+            'count': count,
+        }
+
+
+class Value:
+    """A single counter or gauge value."""
+
+    __slots__ = ('value', '_fn', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._fn = None
+        self._lock = _threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, fn):
+        # Read the value from fn() at scrape time instead (gauges only)
+        self._fn = fn
+
+    def get(self):
+        if self._fn is not None:
+            try:
+                return float(self._fn())
+            except Exception:
+                return float('nan')
+        return self.value
+
+
+class Metric:
+    """A named metric family; labels(...) returns (and caches) one child.
+
+    Families without labels forward inc/dec/set/observe to their single
+    child, so `requests.inc()` and `by_verb.labels('look').inc()` both work.
+    Hot paths should keep the child from labels() rather than look it up
+    on every call.
+    """
+
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = _threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        return Value()
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f'{self.name} expects labels {self.labelnames}')
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+    def set_function(self, fn):
+        self._default.set_function(fn)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def samples(self):
+        # (suffix, labels dict, value) triples for the exposition format
+        for key, child in list(self._children.items()):
+            yield '', dict(zip(self.labelnames, key)), child.get()
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+
+class HistogramMetric(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help_text, labelnames)
+
+    def _new_child(self):
+        return Histogram(self.buckets)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            snap = child.snapshot()
+            cumulative = 0
+            for bound, n in zip(snap['buckets'], snap['counts']):
+                cumulative += n
+                yield '_bucket', dict(labels, le=_format_value(bound)), cumulative
+            yield '_bucket', dict(labels, le='+Inf'), snap['count']
+            yield '_sum', labels, snap['sum']
+            yield '_count', labels, snap['count']
+
+
+class Registry:
+    """Metric families for one process, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = _threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, labelnames, **kwargs):
+        # Re-registering a name returns the existing family (module reloads, tests)
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help_text, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f'{name} already registered as a {metric.kind}')
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._get_or_create(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._get_or_create(HistogramMetric, name, help_text, labelnames, buckets=buckets)
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for suffix, labels, value in metric.samples():
+                lines.append(f'{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+# Text exposition content type for /metrics responses
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for k, v in labels.items():
+        v = str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{k}="{v}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value):
+    if value != value:
+        return 'NaN'
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+# Process-wide registry that /metrics serves
+REGISTRY = Registry()
@@ -0,0 +1,255 @@
+import os
+import sqlite3
+import threading
+import time
+
+from game.metrics import REGISTRY
+from game.player import item_id
+
+ITEM_FLUSH_SECONDS = REGISTRY.histogram('mud_items_flush_duration_seconds', 'Time to write changed rooms of ground items')
+ITEM_ROOMS_WRITTEN = REGISTRY.counter('mud_items_rooms_written_total', 'Rooms of ground items written to the store')
+GROUND_ITEMS = REGISTRY.gauge('mud_items_ground', 'Item stacks lying on the ground')
+
+# Shared empty index for rooms with nothing on the ground
+_NO_ITEMS = {}
+
+# Ids claimed from the store at a time
+ID_BLOCK = 100
+
+
+class GroundItem:
+    """A stack of one item lying in a room.
+
+    `id` is assigned when the stack first appears and survives restarts;
+    more copies of the same item dropped in the room join the stack.
+    """
+
+    __slots__ = ('id', 'room', 'name', 'count')
+
+    def __init__(self, object_id, room, name, count):
+        self.id = object_id
+        self.room = room
+        self.name = name
+        self.count = count
+
+
+class ItemStore:
+    """SQLite table of ground items (WAL mode), written a stack at a time."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        with self._lock:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS ground_items ('
+                ' id INTEGER PRIMARY KEY,'
+                ' room TEXT NOT NULL,'
+                ' name TEXT NOT NULL,'
+                ' count INTEGER NOT NULL,'
+                ' updated_at REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS ground_items_room ON ground_items (room)')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+
+    def load_all(self):
+        # (id, room, name, count) rows
+        with self._lock:
+            return self._conn.execute('SELECT id, room, name, count FROM ground_items').fetchall()
+
+    def reserve_ids(self, count):
+        # Claim `count` consecutive ids; returns the first. Every process
+        # sharing the file draws from the same counter, so ids never clash.
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()
+                top = self._conn.execute('SELECT MAX(id) FROM ground_items').fetchone()[0]
+                first = max(int(row[0]) if row else 1, (top or 0) + 1)
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_id', ?)",
+                                   (str(first + count),))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return first
+
+    def save_stacks(self, stacks, removed):
+        # Write changed stacks and delete removed ones, by id, in one
+        # transaction. Stacks this process never touched are left alone,
+        # so processes sharing the file don't wipe each other's items.
+        # stacks: [(id, room, name, count), ...]; removed: [id, ...]
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.executemany('DELETE FROM ground_items WHERE id = ?', [(i,) for i in removed])
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO ground_items (id, room, name, count, updated_at) VALUES (?, ?, ?, ?, ?)',
+                    [(object_id, room, name, count, now) for object_id, room, name, count in stacks]
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ObjectStore:
+    """Items lying on the ground, indexed by id and by room.
+
+    Each room maps lowercased item name -> GroundItem, so finding an item
+    by name costs the same however full the room is. take/drop/place move
+    items between the ground and an inventory under one lock, so two
+    players can't both pick up the last copy. Changed rooms and emptied
+    stacks are remembered and flush() writes just those stacks, by id,
+    when a store is set.
+    """
+
+    def __init__(self, store=None, on_change=None):
+        self.store = store
+        # Optional callback(room) whenever a room's items change
+        self.on_change = on_change
+        self.by_id = {}
+        self.by_room = {}
+        self.dirty_rooms = set()
+        # Ids of stacks picked up since the last flush
+        self.removed_ids = set()
+        # Ids from _next_id up to _id_limit are ours to hand out; with a
+        # store they come in blocks from its shared counter
+        self._next_id = 1
+        self._id_limit = 0
+        self._lock = threading.RLock()
+        GROUND_ITEMS.set_function(lambda: len(self.by_id))
+
+    def load(self):
+        # Replace the ground with what the store holds
+        if self.store is None:
+            return 0
+        rows = self.store.load_all()
+        with self._lock:
+            self.by_id.clear()
+            self.by_room.clear()
+            self.dirty_rooms.clear()
+            self.removed_ids.clear()
+            for object_id, room, name, count in rows:
+                self._index(GroundItem(object_id, room, item_id(name), count))
+            # Draw fresh ids from the store from here on
+            self._id_limit = 0
+        return len(rows)
+
+    def items_in(self, room):
+        # {item name: count} for a room, in the order items arrived
+        return {stack.name: stack.count for stack in self.by_room.get(room, _NO_ITEMS).values()}
+
+    def find(self, room, name):
+        # The stack of `name` (any case) in a room, or None
+        return self.by_room.get(room, _NO_ITEMS).get(name.lower())
+
+    def get(self, object_id):
+        return self.by_id.get(object_id)
+
+    def place(self, room, name, n=1):
+        # Put n copies of an item on the ground (loot, spawns); returns the stack
+        if n <= 0:
+            return None
+        with self._lock:
+            return self._add(room, item_id(name), n)
+
+    def take(self, room, name, inventory, n=1):
+        # Move up to n copies from the ground into an inventory.
+        # Returns (item name, copies taken), or (None, 0) if it isn't here.
+        with self._lock:
+            stack = self.find(room, name)
+            if stack is None:
+                return None, 0
+            n = min(n, stack.count)
+            stack.count -= n
+            if stack.count <= 0:
+                self._unindex(stack)
+            inventory.add(stack.name, n)
+            self._changed(room)
+            return stack.name, n
+
+    def drop(self, room, name, inventory, n=1):
+        # Move n copies from an inventory onto the ground.
+        # Returns the item name, or None if the inventory hasn't got them.
+        with self._lock:
+            item = inventory.find(name)
+            if item is None or not inventory.remove(item, n):
+                return None
+            self._add(room, item, n)
+            return item
+
+    def flush(self):
+        # Write the stacks in rooms changed since the last flush; returns
+        # how many rooms that covered
+        if self.store is None:
+            self.dirty_rooms.clear()
+            self.removed_ids.clear()
+            return 0
+        with self._lock:
+            dirty, self.dirty_rooms = self.dirty_rooms, set()
+            removed, self.removed_ids = self.removed_ids, set()
+            stacks = [
+                (s.id, room, s.name, s.count)
+                for room in dirty for s in self.by_room.get(room, _NO_ITEMS).values()
+            ]
+        if not dirty:
+            return 0
+        started = time.perf_counter()
+        try:
+            self.store.save_stacks(stacks, removed)
+        except Exception:
+            # Try these again next time
+            with self._lock:
+                self.dirty_rooms |= dirty
+                self.removed_ids |= removed
+            raise
+        ITEM_FLUSH_SECONDS.observe(time.perf_counter() - started)
+        ITEM_ROOMS_WRITTEN.inc(len(dirty))
+        return len(dirty)
+
+    def _add(self, room, item, n):
+        stack = self.find(room, item)
+        if stack is None:
+            stack = GroundItem(self._new_id(), room, item, n)
+            self._index(stack)
+        else:
+            stack.count += n
+        self._changed(room)
+        return stack
+
+    def _new_id(self):
+        if self.store is not None and self._next_id >= self._id_limit:
+            self._next_id = self.store.reserve_ids(ID_BLOCK)
+            self._id_limit = self._next_id + ID_BLOCK
+        object_id = self._next_id
+        self._next_id += 1
+        return object_id
+
+    def _index(self, stack):
+        self.by_id[stack.id] = stack
+        self.by_room.setdefault(stack.room, {})[stack.name.lower()] = stack
+
+    def _unindex(self, stack):
+        del self.by_id[stack.id]
+        self.removed_ids.add(stack.id)
+        here = self.by_room[stack.room]
+        del here[stack.name.lower()]
+        if not here:
+            del self.by_room[stack.room]
+
+    def _changed(self, room):
+        self.dirty_rooms.add(room)
+        if self.on_change is not None:
+            self.on_change(room)
@@ -0,0 +1,329 @@
+import json
+import os
+import random
+import smtplib
+import socket
+import sqlite3
+import ssl
+import threading
+import time
+import uuid
+from email.message import EmailMessage
+
+from game.metrics import REGISTRY
+
+MAIL_SENT = REGISTRY.counter('mud_mail_sent_total', 'Messages handed to the mail transport')
+MAIL_RETRIES = REGISTRY.counter('mud_mail_retries_total', 'Failed send attempts that will be retried')
+MAIL_DEAD = REGISTRY.counter('mud_mail_dead_total', 'Messages given up on (permanent error or out of attempts)')
+MAIL_QUEUE = REGISTRY.gauge('mud_mail_queue_depth', 'Messages waiting to be sent')
+MAIL_SEND_SECONDS = REGISTRY.histogram('mud_mail_send_duration_seconds', 'Time to hand one message to the transport')
+
+
+class PermanentMailError(Exception):
+    """A send failure that retrying won't fix (e.g. recipient refused)."""
+
+
+class Outbox:
+    """Persistent outbound mail queue (SQLite, WAL mode).
+
+    Request handlers only enqueue(); a MailSender delivers in the
+    background. Messages survive restarts until sent or given up on.
+    The sender may run on a real OS thread while handlers run on the
+    eventlet hub, so pass the unpatched threading module as
+    `threading_module` under monkey patching.
+
+    Several processes may share the file (cluster mode), each with its own
+    sender. due() claims the rows it returns ('sending', with this outbox's
+    `owner` and a lease of `lease_seconds`) in one transaction, so a
+    message goes to one sender only. A claim whose sender died is picked
+    up again once its lease runs out.
+    """
+
+    def __init__(self, path, threading_module=threading, lease_seconds=300.0, owner=None):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.owner = owner or f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading_module.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        with self._lock:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS outbox ('
+                ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+                ' recipients TEXT NOT NULL,'
+                ' subject TEXT NOT NULL,'
+                ' body TEXT NOT NULL,'
+                ' attempts INTEGER NOT NULL DEFAULT 0,'
+                ' next_attempt REAL NOT NULL,'
+                ' last_error TEXT,'
+                " status TEXT NOT NULL DEFAULT 'pending',"
+                ' created_at REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt)')
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(outbox)')}
+            if 'owner' not in columns:
+                self._conn.execute('ALTER TABLE outbox ADD COLUMN owner TEXT')
+        MAIL_QUEUE.set_function(self.pending)
+
+    def enqueue(self, subject, recipients, body):
+        # Queue a message for delivery as soon as possible; returns its id
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                'INSERT INTO outbox (recipients, subject, body, next_attempt, created_at) VALUES (?, ?, ?, ?, ?)',
+                (json.dumps(list(recipients)), subject, body, now, now)
+            )
+            return cur.lastrowid
+
+    def due(self, limit=50, now=None):
+        # Claim up to `limit` messages whose next attempt time has come,
+        # oldest first: pending ones, and ones whose claim lease ran out.
+        # While claimed, next_attempt holds the lease expiry.
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, recipients, subject, body, attempts FROM outbox"
+                    " WHERE status IN ('pending', 'sending') AND next_attempt <= ? ORDER BY next_attempt LIMIT ?",
+                    (now, limit)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE outbox SET status = 'sending', owner = ?, next_attempt = ? WHERE id = ?",
+                    [(self.owner, now + self.lease_seconds, r[0]) for r in rows]
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return [
+            {'id': r[0], 'recipients': json.loads(r[1]), 'subject': r[2], 'body': r[3], 'attempts': r[4]}
+            for r in rows
+        ]
+
+    def mark_sent(self, message_id):
+        with self._lock:
+            self._conn.execute('DELETE FROM outbox WHERE id = ?', (message_id,))
+
+    def mark_retry(self, message_id, error, next_attempt):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'pending', owner = NULL, attempts = attempts + 1, last_error = ?,"
+                " next_attempt = ? WHERE id = ?",
+                (error, next_attempt, message_id)
+            )
+
+    def release(self, message_ids):
+        # Hand claimed messages back untried (e.g. the sender is stopping)
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE outbox SET status = 'pending', owner = NULL, next_attempt = ?"
+                " WHERE id = ? AND status = 'sending' AND owner = ?",
+                [(time.time(), message_id, self.owner) for message_id in message_ids]
+            )
+
+    def mark_dead(self, message_id, error):
+        # Kept (status 'dead') so an admin can see what never went out
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'dead', owner = NULL, attempts = attempts + 1, last_error = ? WHERE id = ?",
+                (error, message_id)
+            )
+
+    def pending(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status IN ('pending', 'sending')"
+            ).fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM outbox GROUP BY status').fetchall()
+        counts = {'pending': 0, 'sending': 0, 'dead': 0}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SMTPTransport:
+    """Sends through one SMTP connection, kept open between messages.
+
+    The connection is opened on first use, reused while messages keep
+    coming, and closed after `idle_seconds` without traffic or on error.
+    """
+
+    def __init__(self, host, port=587, use_tls=True, username=None, password=None, timeout=10.0, idle_seconds=60.0):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.idle_seconds = idle_seconds
+        self._smtp = None
+        self._last_used = 0.0
+
+    def send(self, message):
+        fresh = self._smtp is None
+        if fresh:
+            self._connect()
+        try:
+            self._send(message)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped a reused connection; try once on a new one
+            self.close()
+            if fresh:
+                raise
+            self._connect()
+            self._send(message)
+        self._last_used = time.monotonic()
+
+    def _send(self, message):
+        try:
+            refused = self._smtp.send_message(message)
+        except smtplib.SMTPRecipientsRefused as e:
+            raise PermanentMailError(f'recipients refused: {sorted(e.recipients)}') from e
+        except smtplib.SMTPResponseException as e:
+            if e.smtp_code >= 500:
+                raise PermanentMailError(f'{e.smtp_code} {e.smtp_error!r}') from e
+            self.close()
+            raise
+        except (OSError, smtplib.SMTPException):
+            self.close()
+            raise
+        if refused:
+            raise PermanentMailError(f'recipients refused: {sorted(refused)}')
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                smtp.starttls(context=ssl.create_default_context())
+            if self.username:
+                smtp.login(self.username, self.password or '')
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+
+    def idle(self):
+        # Called when the queue is empty: hang up once the connection sat idle
+        if self._smtp is not None and time.monotonic() - self._last_used >= self.idle_seconds:
+            self.close()
+
+    def close(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except (OSError, smtplib.SMTPException):
+            smtp.close()
+
+
+class FileTransport:
+    """Debug sink: writes each message to `directory` as an .eml file."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._seq = 0
+
+    def send(self, message):
+        self._seq += 1
+        name = f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{self._seq}.eml'
+        with open(os.path.join(self.directory, name), 'wb') as f:
+            f.write(message.as_bytes())
+
+    def idle(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class MailSender:
+    """Background delivery loop for an Outbox.
+
+    Sends due messages through the transport, retries transient failures
+    with exponential backoff (plus jitter) and gives up after
+    `max_attempts` or on a permanent error.
+    """
+
+    def __init__(self, outbox, transport, sender, poll_seconds=1.0, backoff_seconds=30.0,
+                 max_backoff_seconds=3600.0, max_attempts=8, sleep=time.sleep):
+        self.outbox = outbox
+        self.transport = transport
+        self.sender = sender
+        self.poll_seconds = poll_seconds
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.max_attempts = max_attempts
+        self.sleep = sleep
+        self._stopped = False
+
+    def run(self):
+        while not self._stopped:
+            try:
+                sent = self.run_once()
+            except Exception:
+                # A broken queue read must not kill the sender
+                sent = 0
+            if not sent:
+                self.transport.idle()
+                self.sleep(self.poll_seconds)
+        self.transport.close()
+
+    def stop(self):
+        self._stopped = True
+
+    def run_once(self):
+        # Try every due message once; returns how many were delivered
+        sent = 0
+        claimed = self.outbox.due()
+        for i, item in enumerate(claimed):
+            if self._stopped:
+                self.outbox.release([m['id'] for m in claimed[i:]])
+                break
+            started = time.perf_counter()
+            try:
+                self.transport.send(self.build(item))
+            except PermanentMailError as e:
+                self.outbox.mark_dead(item['id'], str(e))
+                MAIL_DEAD.inc()
+                continue
+            except Exception as e:
+                attempts = item['attempts'] + 1
+                if attempts >= self.max_attempts:
+                    self.outbox.mark_dead(item['id'], f'{type(e).__name__}: {e}')
+                    MAIL_DEAD.inc()
+                else:
+                    self.outbox.mark_retry(item['id'], f'{type(e).__name__}: {e}', time.time() + self.backoff(attempts))
+                    MAIL_RETRIES.inc()
+                continue
+            MAIL_SEND_SECONDS.observe(time.perf_counter() - started)
+            self.outbox.mark_sent(item['id'])
+            MAIL_SENT.inc()
+            sent += 1
+        return sent
+
+    def backoff(self, attempts):
+        # Delay before attempt number attempts+1: base * 2^(attempts-1), capped, +-20%
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    def build(self, item):
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = ', '.join(item['recipients'])
+        message['Subject'] = item['subject']
+        message.set_content(item['body'])
+        return message
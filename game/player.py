@@ -1,63 +1,272 @@
+import sys
+
+from game.stats import DerivedStats
+
+# Equipment slots, in display order. Equipment keeps one fixed-size list
+# indexed by these, so a slot lookup is a dict hit plus a list index.
+SLOTS = ('head', 'body', 'legs', 'feet', 'hands', 'weapon', 'offhand', 'accessory')
+SLOT_INDEX = {slot: i for i, slot in enumerate(SLOTS)}
+
+STARTING_ITEMS = ('Cyberdeck', 'Neon Blade', 'Stimpack')
+
+# Account record layout written by Player.to_record(). Version 1 is the
+# original format (inventory as a list with one entry per copy); records
+# without a version are read as version 1.
+SAVE_VERSION = 2
+
+
+def item_id(name):
+    # Items are identified by their display name, interned so every stack
+    # of the same item shares one key object
+    return sys.intern(str(name))
+
+
+class Inventory:
+    """Counted multiset of items: item id -> count, in pickup order.
+
+    Lookups by exact id are O(1); `find` resolves a typed name
+    case-insensitively through a lowercase index kept alongside.
+    """
+
+    __slots__ = ('_counts', '_folded')
+
+    def __init__(self, items=()):
+        self._counts = {}
+        self._folded = {}
+        if isinstance(items, dict):
+            for item, n in items.items():
+                self.add(item, int(n))
+        else:
+            for item in items:
+                self.add(item)
+
+    def add(self, item, n=1):
+        if n <= 0:
+            return
+        item = item_id(item)
+        if item not in self._counts:
+            self._counts[item] = 0
+            self._folded[item.lower()] = item
+        self._counts[item] += n
+
+    def remove(self, item, n=1):
+        # Take n copies out; False (and no change) if there aren't enough
+        have = self._counts.get(item, 0)
+        if have < n:
+            return False
+        if have == n:
+            del self._counts[item]
+            del self._folded[item.lower()]
+        else:
+            self._counts[item] = have - n
+        return True
+
+    def find(self, name):
+        # Exact item id for a case-insensitive name, or None
+        return self._folded.get(name.lower())
+
+    def count(self, item):
+        return self._counts.get(item, 0)
+
+    def __contains__(self, item):
+        return item in self._counts
+
+    def __iter__(self):
+        # Distinct items
+        return iter(self._counts)
+
+    def __len__(self):
+        # Total number of copies
+        return sum(self._counts.values())
+
+    def items(self):
+        return self._counts.items()
+
+    def to_dict(self):
+        return dict(self._counts)
+
+    def to_list(self):
+        # One entry per copy (the player_info wire format)
+        return [item for item, n in self._counts.items() for _ in range(n)]
+
+
+class Equipment:
+    """Fixed equipment slots (see SLOTS); an empty slot holds None.
+
+    `version` goes up on every change, so derived stats know to recompute.
+    """
+
+    __slots__ = ('_items', 'version')
+
+    def __init__(self, worn=None):
+        self._items = [None] * len(SLOTS)
+        self.version = 0
+        if worn:
+            self.update(worn)
+
+    def get(self, slot, default=None):
+        i = SLOT_INDEX.get(slot)
+        if i is None:
+            return default
+        item = self._items[i]
+        return default if item is None else item
+
+    def __getitem__(self, slot):
+        return self._items[SLOT_INDEX[slot]]
+
+    def __setitem__(self, slot, item):
+        self._items[SLOT_INDEX[slot]] = None if item is None else item_id(item)
+        self.version += 1
+
+    def update(self, worn):
+        # Copy slots from a mapping; unknown slot names are ignored
+        for slot, item in worn.items():
+            if slot in SLOT_INDEX:
+                self[slot] = item or None
+
+    def items(self):
+        return zip(SLOTS, self._items)
+
+    def to_dict(self):
+        return dict(zip(SLOTS, self._items))
+
 
 class Player:
+    # Every attribute is declared here: no per-instance __dict__, and a typo
+    # in an assignment fails loudly instead of creating a new attribute
+    __slots__ = (
+        'address', 'username', 'current_room', 'name', 'race', 'char_class',
+        'level', 'xp', 'xp_max', 'credits', 'inventory', 'equipment',
+        'hp', 'energy', 'endurance', 'willpower', 'abilities',
+        # Derived stats (strength, tech, speed, attack...) and buffs; see game/stats.py
+        'stats',
+        # This player's Combatant while in a fight (game/combat.py), encounter state
+        'fight', 'last_encounter', 'last_defeated',
+        'red_eye_used',
+    )
+
     def __init__(self, address, start_room):
         self.address = address
+        self.username = None
         self.current_room = start_room
         self.name = None
         self.level = 1
         self.xp = 0
         self.xp_max = 100
-        self.inventory = ['Cyberdeck', 'Neon Blade', 'Stimpack']
+        self.inventory = Inventory(STARTING_ITEMS)
         # Simple currency balance
         self.credits = 100
-        # Equipment slots
-        self.equipment = {
-            'head': None,
-            'body': None,
-            'legs': None,
-            'feet': None,
-            'hands': None,
-            'weapon': None,
-            'offhand': None,
-            'accessory': None
-        }
+        self.equipment = Equipment()
         self.race = None
         self.char_class = None
-        # Default stats
+        # Resource pools (0-100)
         self.hp = 100
         self.energy = 100
         self.endurance = 100
         self.willpower = 100
-        self.strength = 10
-        self.tech = 10
-        self.speed = 10
         self.abilities = []
+        self.stats = DerivedStats(self)
+        self.fight = None
+        self.last_encounter = None
+        self.last_defeated = None
+        self.red_eye_used = False
         self.apply_race_class()
 
+    # Read-only views of the derived stats
+    @property
+    def strength(self):
+        return self.stats['strength']
+
+    @property
+    def tech(self):
+        return self.stats['tech']
+
+    @property
+    def speed(self):
+        return self.stats['speed']
+
+    @property
+    def attack_boost(self):
+        return self.stats['attack_pct']
+
     def get_attack(self):
-        base = getattr(self, 'strength', 10)
-        bonus = 0
-        eq = getattr(self, 'equipment', {}) or {}
-        if eq.get('weapon') == 'Neon Blade':
-            bonus += 3
-        # Temporary boosts
-        if getattr(self, 'attack_boost', 0):
-            bonus += int(base * getattr(self, 'attack_boost'))
-        return base + bonus
+        return self.stats['attack']
+
+    @property
+    def in_fight(self):
+        return self.fight is not None
+
+    @property
+    def fight_opponent(self):
+        # Name of the mob this player is aiming at
+        target = self.fight.target if self.fight is not None else None
+        return target.name if target is not None else None
+
+    @property
+    def fight_hp(self):
+        target = self.fight.target if self.fight is not None else None
+        return target.hp if target is not None else None
+
+    def gain_xp(self, amount):
+        # Add XP, levelling up when it passes xp_max; True on level-up
+        self.xp += amount
+        if self.xp < self.xp_max:
+            return False
+        self.level += 1
+        self.xp -= self.xp_max
+        self.xp_max = int(self.xp_max * 1.2)
+        return True
 
     def apply_race_class(self):
-        # Set stats/abilities based on race/class
+        # Abilities from race/class; their stat bonuses come from self.stats
         from game.races_classes import RACES, CLASSES
+        self.abilities = []
         if self.race in RACES:
-            race = RACES[self.race]
-            for stat, value in race["stats"].items():
-                setattr(self, stat, value)
-            self.abilities.extend(race.get("abilities", []))
+            self.abilities.extend(RACES[self.race].get("abilities", []))
         if self.char_class in CLASSES:
-            char_class = CLASSES[self.char_class]
-            for stat, value in char_class["stats"].items():
-                if hasattr(self, stat):
-                    setattr(self, stat, getattr(self, stat) + value)
-                else:
-                    setattr(self, stat, value)
-            self.abilities.extend(char_class.get("abilities", []))
\ No newline at end of file
+            self.abilities.extend(CLASSES[self.char_class].get("abilities", []))
+
+    # Account record fields copied straight to and from the player
+    RECORD_INTS = ('level', 'xp', 'xp_max', 'credits', 'hp', 'energy', 'endurance', 'willpower')
+
+    def to_record(self):
+        # Progression fields for the account record. Identity (char_name,
+        # race, class) is owned by the account pages and not written here.
+        record = {attr: int(getattr(self, attr)) for attr in self.RECORD_INTS}
+        record['inventory'] = self.inventory.to_dict()
+        record['equipment'] = self.equipment.to_dict()
+        record['current_room'] = self.current_room
+        record['save_version'] = SAVE_VERSION
+        return record
+
+    @classmethod
+    def from_record(cls, acc, address, start_room, username=None, rooms=None):
+        # Build a player from an account record (any save version). Bad or
+        # missing fields keep their defaults; an unknown room falls back to
+        # the start room when `rooms` is given.
+        player = cls(address, start_room)
+        player.username = username
+        # Use character name if set, else fall back to the account name
+        player.name = acc.get('char_name', username)
+        player.race = acc.get('race')
+        player.char_class = acc.get('char_class')
+        player.apply_race_class()
+        for attr in cls.RECORD_INTS:
+            if attr in acc:
+                try:
+                    setattr(player, attr, int(acc[attr]))
+                except (TypeError, ValueError):
+                    pass
+        inventory = acc.get('inventory')
+        if isinstance(inventory, (dict, list)):
+            # dict in version 2, one entry per copy in version 1
+            try:
+                player.inventory = Inventory(inventory)
+            except (TypeError, ValueError):
+                pass
+        if isinstance(acc.get('equipment'), dict):
+            player.equipment.update(acc['equipment'])
+        room = acc.get('current_room')
+        if isinstance(room, str) and (rooms is None or room in rooms):
+            player.current_room = room
+        return player
@@ -0,0 +1,150 @@
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+
+from game.metrics import REGISTRY
+
+log = logging.getLogger(__name__)
+
+SLOW_COMMANDS = REGISTRY.counter('mud_slow_commands_total', 'Commands slower than the slow-command threshold')
+
+
+class SamplingProfiler:
+    """Statistical profiler: samples every thread's stack at a fixed rate.
+
+    Sampling runs on a real OS thread, so under eventlet pass the unpatched
+    threading module and sleep (eventlet.patcher.original) -- then it still
+    sees whatever greenthread is hogging the hub. Output is the collapsed
+    stack format ("outer;inner;leaf count" per line) that flamegraph.pl,
+    speedscope and similar tools read.
+    """
+
+    def __init__(self, interval=0.005, threading_module=threading, sleep=time.sleep, clock=time.perf_counter):
+        self.interval = interval
+        self.threading = threading_module
+        self.sleep = sleep
+        self.clock = clock
+        self._busy = threading_module.Lock()
+
+    @property
+    def running(self):
+        return self._busy.locked()
+
+    def profile(self, seconds, wait=None):
+        # Sample for `seconds` and return collapsed stacks (None if a run is
+        # already in progress). `wait(seconds)` blocks the caller meanwhile;
+        # pass a cooperative sleep under eventlet.
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            counts = collections.Counter()
+            done = self.threading.Event()
+            sampler = self.threading.Thread(target=self._sample, args=(seconds, counts, done), daemon=True)
+            sampler.start()
+            if wait is None:
+                done.wait()
+            else:
+                while not done.is_set():
+                    wait(min(0.1, seconds))
+            return self.collapse(counts)
+        finally:
+            self._busy.release()
+
+    def _sample(self, seconds, counts, done):
+        me = self.threading.get_ident()
+        names = {}
+        deadline = self.clock() + seconds
+        try:
+            while self.clock() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    if ident not in names:
+                        names[ident] = _thread_name(ident)
+                    stack.append(names[ident])
+                    counts[';'.join(reversed(stack))] += 1
+                self.sleep(self.interval)
+        finally:
+            done.set()
+
+    @staticmethod
+    def collapse(counts):
+        return ''.join(f'{stack} {n}\n' for stack, n in counts.most_common())
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def _thread_name(ident):
+    for t in threading.enumerate():
+        if t.ident == ident:
+            return f'thread:{t.name}'
+    return f'thread:{ident}'
+
+
+class CommandTrace:
+    """Timing breakdown of one command as it passes through the layers.
+
+    Each layer adds the time it spent to a phase: dispatch (parsing and
+    lookup), logic (the command handler), emit (sending replies and room
+    notices) and persist (account bookkeeping).
+    """
+
+    __slots__ = ('command', 'player', 'room', 'started', 'phases')
+
+    PHASES = ('dispatch', 'logic', 'emit', 'persist')
+
+    def __init__(self, command, player=None, room=None):
+        self.command = command
+        self.player = player
+        self.room = room
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(self.PHASES, 0.0)
+
+    def add(self, phase, seconds):
+        self.phases[phase] += seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+class SlowCommandLog:
+    """Keeps (and logs) commands that took longer than `threshold_ms`."""
+
+    def __init__(self, threshold_ms=50.0, size=200):
+        self.threshold_ms = threshold_ms
+        self.entries = collections.deque(maxlen=size)
+
+    def record(self, trace):
+        # Call when the command is fully handled; cheap when it was fast
+        total_ms = trace.elapsed() * 1000.0
+        if total_ms < self.threshold_ms:
+            return None
+        entry = {
+            'at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'command': trace.command,
+            'player': trace.player,
+            'room': trace.room,
+            'total_ms': round(total_ms, 3),
+        }
+        for phase, seconds in trace.phases.items():
+            entry[f'{phase}_ms'] = round(seconds * 1000.0, 3)
+        entry['other_ms'] = round(total_ms - sum(trace.phases.values()) * 1000.0, 3)
+        self.entries.append(entry)
+        SLOW_COMMANDS.inc()
+        log.warning('Slow command %r by %s in %s: %.1f ms (dispatch %.1f, logic %.1f, emit %.1f, persist %.1f)',
+                    trace.command, trace.player, trace.room, total_ms,
+                    entry['dispatch_ms'], entry['logic_ms'], entry['emit_ms'], entry['persist_ms'])
+        return entry
+
+    def recent(self, limit=50):
+        return list(self.entries)[-limit:][::-1]
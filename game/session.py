@@ -0,0 +1,191 @@
+import time
+
+from game.commands import handle_command
+from game.metrics import REGISTRY
+
+CONNECTS = REGISTRY.counter('mud_connects_total', 'Sessions attached to the world', ('frontend',))
+DISCONNECTS = REGISTRY.counter('mud_disconnects_total', 'Sessions detached from the world', ('frontend',))
+PLAYERS = REGISTRY.gauge('mud_players_connected', 'Players currently in the world', ('frontend',))
+LINES = REGISTRY.counter('mud_command_lines_total', 'Input lines run through the core', ('frontend',))
+
+
+class Session:
+    """A connected player as the game core sees it, whatever the transport.
+
+    Front ends subclass this and implement send()/close() for their own
+    wire format; the core never touches sockets.
+    """
+
+    def __init__(self, sid, player):
+        self.sid = sid
+        self.player = player
+        self.frontend = None
+
+    def send(self, text):
+        raise NotImplementedError
+
+    def close(self):
+        # Ask the front end to end this connection (after pending output)
+        pass
+
+    def signal(self, event):
+        # Non-text cue for clients that render them (e.g. 'player_hit')
+        pass
+
+
+class Frontend:
+    """Room fan-out for one transport.
+
+    The default walks the core's own sessions in the room. A transport with
+    its own rooms (Socket.IO) overrides join/leave/broadcast to use them.
+    """
+
+    def __init__(self, name='local'):
+        # Transport name, used as the `frontend` metrics label
+        self.name = name
+        self.connects = CONNECTS.labels(name)
+        self.disconnects = DISCONNECTS.labels(name)
+        self.players = PLAYERS.labels(name)
+        self.lines = LINES.labels(name)
+
+    def join(self, session, room):
+        pass
+
+    def leave(self, session, room):
+        pass
+
+    def broadcast(self, core, room, text, exclude=None):
+        for sess in core.sessions_in_room(room, frontend=self):
+            if sess is not exclude:
+                sess.send(text)
+
+
+class GameCore:
+    """The live world shared by every front end.
+
+    Telnet and web sessions attach here, so they see each other in rooms
+    and `who`, and there is one set of mobs. Front ends attach sessions,
+    feed them input lines and deliver what the core sends back.
+    """
+
+    def __init__(self, world):
+        self.world = world
+        self.sessions = {}
+        self.frontends = []
+        # id(player) -> session, for turning room occupants into sessions
+        self._by_player = {}
+        # Combat rounds resolve off the tick; their output comes back here
+        world.combat.notify = self.notify_player
+        # Optional callback(player) for state changed outside a command
+        # (damage, XP, level-ups), so the front end can save it
+        self.on_player_changed = None
+
+    def attach(self, session, frontend):
+        # Put a session's player into the world
+        if frontend not in self.frontends:
+            self.frontends.append(frontend)
+        stale = self.sessions.get(session.sid)
+        if stale is not None:
+            self.detach(stale, quiet=True)
+        session.frontend = frontend
+        self.sessions[session.sid] = session
+        self._by_player[id(session.player)] = session
+        self.world.add_player(session.player)
+        frontend.join(session, session.player.current_room)
+        frontend.connects.inc()
+        frontend.players.inc()
+        return session
+
+    def detach(self, session, quiet=False):
+        if self.sessions.get(session.sid) is not session:
+            return
+        player = session.player
+        room = player.current_room
+        self.world.combat.leave(player)
+        if not quiet:
+            self.broadcast_room(room, f"{_display_name(player)} disconnects.", exclude=session)
+        session.frontend.leave(session, room)
+        del self.sessions[session.sid]
+        self._by_player.pop(id(player), None)
+        self.world.remove_player(player)
+        session.frontend.disconnects.inc()
+        session.frontend.players.dec()
+
+    def notify_player(self, player, text, events=()):
+        # Deliver text produced outside a command (e.g. a combat round).
+        # Every change a round makes to a player comes with a line for them.
+        if self.on_player_changed is not None:
+            self.on_player_changed(player)
+        session = self._by_player.get(id(player))
+        if session is None:
+            return
+        session.send(text)
+        for event in events:
+            session.signal(event)
+
+    def sessions_in_room(self, room, frontend=None):
+        out = []
+        for player in self.world.players_in_room(room):
+            sess = self._by_player.get(id(player))
+            if sess is not None and (frontend is None or sess.frontend is frontend):
+                out.append(sess)
+        return out
+
+    def broadcast_room(self, room, text, exclude=None):
+        for frontend in self.frontends:
+            frontend.broadcast(self, room, text, exclude)
+
+    def who(self, session):
+        online = [_display_name(s.player, username=True) for s in self.sessions.values()]
+        here = [_display_name(p, username=True)
+                for p in self.world.players_in_room(session.player.current_room, exclude=session.player)]
+        msg = f"Players online ({len(online)}): " + ", ".join(online)
+        if here:
+            msg += f"\nHere with you: {', '.join(here)}"
+        return msg
+
+    def command(self, session, line, trace=None, **env):
+        # Run one input line; replies and room notices go out through sessions.
+        # Returns the direct reply so front ends can react to it. An optional
+        # CommandTrace (game/profiler.py) gets the dispatch/logic/emit split.
+        player = session.player
+        session.frontend.lines.inc()
+        verb = line.strip().lower()
+        if verb == 'who':
+            response = self.who(session)
+            session.send(response)
+            return response
+        prev_room = player.current_room
+        response = handle_command(line, player, self.world, trace=trace, **env)
+        if not isinstance(response, str):
+            response = ''
+        sending = time.perf_counter()
+        if response:
+            session.send(response)
+        new_room = player.current_room
+        if prev_room != new_room and new_room is not None:
+            self._moved(session, prev_room, new_room)
+        if verb in ('quit', 'exit'):
+            session.close()
+        if trace is not None:
+            trace.add('emit', time.perf_counter() - sending)
+        return response
+
+    def _moved(self, session, prev_room, new_room):
+        player = session.player
+        name = _display_name(player)
+        if prev_room is not None:
+            session.frontend.leave(session, prev_room)
+            self.broadcast_room(prev_room, f"{name} leaves the room.", exclude=session)
+        others = [_display_name(p, username=True) for p in self.world.players_in_room(new_room, exclude=player)]
+        if others:
+            session.send(f"You see {', '.join(others)} here.")
+        self.broadcast_room(new_room, f"{name} enters the room.", exclude=session)
+        session.frontend.join(session, new_room)
+
+
+def _display_name(player, username=False):
+    # Account name for listings, character name for in-room messages
+    if username:
+        return getattr(player, 'username', None) or getattr(player, 'name', None) or 'someone'
+    return getattr(player, 'name', None) or getattr(player, 'username', None) or 'someone'
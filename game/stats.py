@@ -0,0 +1,158 @@
+import time
+
+from game.races_classes import RACES, CLASSES
+
+# Derived player stats: race/class base values, worn-item modifiers and
+# timed buffs combine into one cached table per player. Inputs are
+# versioned, so a read is a tuple compare until one of them changes.
+
+BASE_STATS = {
+    'strength': 10,
+    'tech': 10,
+    'speed': 10,
+    # Flat attack bonus on top of strength
+    'attack': 0,
+    # Attack multiplier bonus (0.10 = +10% of strength)
+    'attack_pct': 0.0,
+    # Flat damage added to every hit
+    'damage': 0,
+    'crit_chance': 0.0,
+}
+
+# Attribute stats taken from the race table (its hp/energy are resource
+# pools, which stay on the 0-100 scale the UI and regen use)
+RACE_STATS = ('strength', 'tech', 'speed')
+
+# Modifiers granted while an item is worn, and the effect line it shows
+EQUIPMENT_MODIFIERS = {
+    'Neon Blade': {'strength': 2, 'attack': 3, 'damage': 3, 'crit_chance': 0.15},
+    'Cyberdeck': {'tech': 2},
+}
+EQUIPMENT_EFFECTS = {
+    'Neon Blade': '+3 Atk, 15% Crit',
+}
+
+
+class Buff:
+    """A temporary modifier set; `expires_at` None means until removed."""
+
+    __slots__ = ('name', 'label', 'modifiers', 'expires_at')
+
+    def __init__(self, name, modifiers, label=None, expires_at=None):
+        self.name = name
+        self.modifiers = modifiers
+        self.label = label
+        self.expires_at = expires_at
+
+
+class DerivedStats:
+    """Cached final stats and active effects for one player.
+
+    Recomputed only when race, class, worn equipment or buffs change;
+    expired buffs drop out on the first read after they run out.
+    """
+
+    __slots__ = ('player', 'clock', 'buffs', '_buff_version', '_next_expiry', '_key', '_values', '_effects')
+
+    def __init__(self, player, clock=time.monotonic):
+        self.player = player
+        self.clock = clock
+        self.buffs = {}
+        self._buff_version = 0
+        self._next_expiry = None
+        self._key = None
+        self._values = None
+        self._effects = None
+
+    def __getitem__(self, stat):
+        return self.current()[stat]
+
+    def current(self):
+        # Final stat table (shared; don't mutate)
+        self.expire_due()
+        player = self.player
+        key = (player.race, player.char_class, player.equipment.version, self._buff_version)
+        if key != self._key:
+            self._compute()
+            self._key = key
+        return self._values
+
+    def effects(self):
+        # Active effects as (name, description) pairs, for the client
+        self.current()
+        return self._effects
+
+    def invalidate(self):
+        self._key = None
+
+    def add_buff(self, name, modifiers, label=None, duration=None):
+        # Adding a buff with the same name replaces it (refreshes its timer)
+        expires_at = None if duration is None else self.clock() + duration
+        self.buffs[name] = Buff(name, modifiers, label, expires_at)
+        self._buffs_changed()
+
+    def remove_buff(self, name):
+        if self.buffs.pop(name, None) is not None:
+            self._buffs_changed()
+
+    def has_buff(self, name):
+        buff = self.buffs.get(name)
+        return buff is not None and (buff.expires_at is None or self.clock() < buff.expires_at)
+
+    def expire_due(self):
+        # Like expire(), but only a time compare while no timed buff is due
+        # (buffs without a duration never are); True if any were removed
+        if self._next_expiry is None or self.clock() < self._next_expiry:
+            return False
+        return self.expire()
+
+    def expire(self):
+        # Drop buffs whose time is up; True if any were removed
+        now = self.clock()
+        gone = [name for name, b in self.buffs.items() if b.expires_at is not None and b.expires_at <= now]
+        for name in gone:
+            del self.buffs[name]
+        if gone:
+            self._buffs_changed()
+        else:
+            self._next_expiry = self._earliest_expiry()
+        return bool(gone)
+
+    def _buffs_changed(self):
+        self._buff_version += 1
+        self._next_expiry = self._earliest_expiry()
+
+    def _earliest_expiry(self):
+        times = [b.expires_at for b in self.buffs.values() if b.expires_at is not None]
+        return min(times) if times else None
+
+    def _compute(self):
+        player = self.player
+        values = dict(BASE_STATS)
+        race = RACES.get(player.race)
+        if race is not None:
+            for stat in RACE_STATS:
+                if stat in race['stats']:
+                    values[stat] = race['stats'][stat]
+        char_class = CLASSES.get(player.char_class)
+        if char_class is not None:
+            for stat, bonus in char_class['stats'].items():
+                if stat in values:
+                    values[stat] += bonus
+        effects = []
+        for _, item in player.equipment.items():
+            if item is None:
+                continue
+            for stat, bonus in EQUIPMENT_MODIFIERS.get(item, {}).items():
+                values[stat] += bonus
+            if item in EQUIPMENT_EFFECTS:
+                effects.append((item, EQUIPMENT_EFFECTS[item]))
+        buffed = []
+        for buff in self.buffs.values():
+            for stat, bonus in buff.modifiers.items():
+                values[stat] += bonus
+            if buff.label:
+                buffed.append((buff.name, buff.label))
+        values['attack'] += values['strength'] + int(values['strength'] * values['attack_pct'])
+        self._values = values
+        self._effects = buffed + effects
@@ -0,0 +1,228 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from game.metrics import REGISTRY
+
+FLUSH_SECONDS = REGISTRY.histogram('mud_save_flush_duration_seconds', 'Time to write one batch of dirty accounts')
+ROWS_WRITTEN = REGISTRY.counter('mud_save_rows_written_total', 'Account rows written to the store')
+SAVE_ERRORS = REGISTRY.counter('mud_save_errors_total', 'Account flushes that failed')
+SAVE_QUEUE = REGISTRY.gauge('mud_save_queue_depth', 'Accounts marked dirty and waiting for a flush')
+
+class AccountStore:
+    """SQLite-backed account storage, one row per account.
+
+    Runs in WAL mode so readers never block the writer and each commit is
+    atomic: a crash mid-write leaves the previous row intact instead of a
+    truncated JSON file. Writes are per-account upserts, so saving one
+    player costs the same no matter how many accounts exist.
+    """
+
+    SCHEMA_VERSION = 1
+
+    def __init__(self, path, legacy_json=None):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        self._create_schema()
+        # Serialized form of what is on disk, used to skip unchanged accounts
+        self._written = {}
+        if legacy_json:
+            self.migrate_from_json(legacy_json)
+
+    def _create_schema(self):
+        with self._lock:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS accounts ('
+                ' username TEXT PRIMARY KEY,'
+                ' data TEXT NOT NULL,'
+                ' updated_at REAL NOT NULL)'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)'
+            )
+            self._conn.execute(
+                'INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)',
+                ('schema_version', str(self.SCHEMA_VERSION))
+            )
+            # Refuse a database written by a newer build rather than
+            # misreading (and then overwriting) its rows
+            found = int(self._get_meta('schema_version'))
+            if found > self.SCHEMA_VERSION:
+                raise ValueError(
+                    f"{self.path} uses account schema version {found}, but this server only "
+                    f"understands up to {self.SCHEMA_VERSION}. Upgrade the server or point "
+                    f"ACCOUNTS_DB at another file."
+                )
+
+    def _get_meta(self, key):
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def migrate_from_json(self, json_path):
+        # One-time import of the legacy data/accounts.json file
+        with self._lock:
+            if self._get_meta('migrated_from_json'):
+                return 0
+            if not os.path.exists(json_path):
+                return 0
+            with open(json_path, 'r') as f:
+                legacy = json.load(f)
+            now = time.time()
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                for username, info in legacy.items():
+                    # Rows already in the database win over the legacy file
+                    self._conn.execute(
+                        'INSERT OR IGNORE INTO accounts (username, data, updated_at) VALUES (?, ?, ?)',
+                        (username, json.dumps(info), now)
+                    )
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                    ('migrated_from_json', json_path)
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            return len(legacy)
+
+    def load_all(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT username, data FROM accounts').fetchall()
+        accounts = {}
+        for username, data in rows:
+            accounts[username] = json.loads(data)
+            self._written[username] = data
+        return accounts
+
+    def load(self, username):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data FROM accounts WHERE username = ?', (username,)
+            ).fetchone()
+        if row is None:
+            return None
+        self._written[username] = row[0]
+        return json.loads(row[0])
+
+    def save(self, username, info):
+        self.save_many([(username, info)])
+
+    def save_many(self, items):
+        # Upsert several accounts in one atomic transaction, skipping unchanged rows
+        now = time.time()
+        with self._lock:
+            rows = []
+            for username, info in items:
+                data = json.dumps(info)
+                if self._written.get(username) != data:
+                    rows.append((username, data, now))
+            if not rows:
+                return 0
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.executemany(
+                    'INSERT INTO accounts (username, data, updated_at) VALUES (?, ?, ?) '
+                    'ON CONFLICT(username) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at',
+                    rows
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            for username, data, _ in rows:
+                self._written[username] = data
+            return len(rows)
+
+    def delete(self, username):
+        with self._lock:
+            self._conn.execute('DELETE FROM accounts WHERE username = ?', (username,))
+            self._written.pop(username, None)
+
+    def sync(self, accounts):
+        # Bring the store in line with a full accounts dict: upsert changed rows,
+        # drop rows for accounts that were removed
+        with self._lock:
+            for username in [u for u in self._written if u not in accounts]:
+                self.delete(username)
+            return self.save_many(accounts.items())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SaveScheduler:
+    """Write-behind saver for account state.
+
+    Callers mark a username dirty whenever its state changes; flush() is run
+    every `interval` seconds (by the game loop) and writes all dirty accounts
+    in a single transaction, so a burst of commands costs one write per player.
+    """
+
+    def __init__(self, store, get_account, interval=5.0):
+        self.store = store
+        self.get_account = get_account
+        self.interval = interval
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self.stats = {
+            'flushes': 0,
+            'rows_written': 0,
+            'errors': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+        }
+        SAVE_QUEUE.set_function(self.queue_depth)
+
+    def mark_dirty(self, username):
+        with self._lock:
+            self._dirty.add(username)
+
+    def queue_depth(self):
+        return len(self._dirty)
+
+    def flush(self, usernames=None):
+        # Write dirty accounts (all, or just the given ones) to the store
+        with self._lock:
+            if usernames is None:
+                batch = self._dirty
+                self._dirty = set()
+            else:
+                batch = {u for u in usernames if u in self._dirty}
+                self._dirty -= batch
+        items = []
+        for username in batch:
+            info = self.get_account(username)
+            if info is not None:
+                items.append((username, info))
+        if not items:
+            return 0
+        started = time.perf_counter()
+        try:
+            written = self.store.save_many(items)
+        except Exception:
+            # Put them back so the next flush retries
+            with self._lock:
+                self._dirty.update(username for username, _ in items)
+            self.stats['errors'] += 1
+            SAVE_ERRORS.inc()
+            raise
+        elapsed = time.perf_counter() - started
+        FLUSH_SECONDS.observe(elapsed)
+        ROWS_WRITTEN.inc(written)
+        elapsed_ms = elapsed * 1000.0
+        self.stats['flushes'] += 1
+        self.stats['rows_written'] += written
+        self.stats['last_flush_ms'] = round(elapsed_ms, 3)
+        self.stats['max_flush_ms'] = round(max(self.stats['max_flush_ms'], elapsed_ms), 3)
+        return written
@@ -1,306 +1,290 @@
+import bisect
+import itertools
+import random
+import time
+
+from game.combat import CombatEngine
+from game.metrics import REGISTRY
+from game.objects import ObjectStore
+from game.world_index import DEFAULT_WORLD_DIR, load_index
+
+try:
+    import numpy as np
+except ImportError:  # Optional: roaming falls back to a pure-Python batch step
+    np = None
+
+ROAM_SECONDS = REGISTRY.histogram('mud_world_roam_duration_seconds', 'Time to move every roaming mob one step')
+MOBS_TOTAL = REGISTRY.gauge('mud_world_mobs', 'Roaming mobs in the world after the last roam step')
+
+
+# Shared empty population for rooms without mobs
+_NO_MOBS = {}
+
+
 class World:
-    def __init__(self):
-        self.rooms = {
-            # Existing starter area
-            'start': {
-                'description': 'You are in a small room. The room smells damp and murky, no one has been here in a long time. A small sliver of light peeks through the blinds of a small window.',
-                'exits': {'north': 'hall', 'east': 'closet'}
-            },
-            'hall': {
-                'description': 'A long, dark, dingy hallway littered with discarded aug parts. Unfriendly eyes watch from the shadows. Exits are south and north.',
-                'exits': {'south': 'start', 'north': 'neon_plaza_approach'}
-            },
-            'closet': {
-                'description': 'A dusty closet, nothing of too much interest. Exits are west.',
-                'exits': {'west': 'start'}
-            },
-
-            # Cyberdelia — city hub and streets
-            'neon_plaza_approach': {
-                'description': 'A flickering corridor opens onto the city. Neon bleeds through cracked panels and rain hisses on hot concrete.',
-                'exits': {'south': 'hall', 'north': 'neon_plaza'}
-            },
-            'neon_plaza': {
-                'description': 'Neon Plaza: hologram billboards paint the night sky in synth-light. Street vendors hawk chrome implants beside towering vid-screens.',
-                'exits': {
-                    'south': 'neon_plaza_approach',
-                    'east': 'chrome_avenue_w',
-                    'west': 'synth_street_w',
-                    'north': 'arcology_lobby',
-                    'down': 'underground_metro'
-                }
-            },
-            'chrome_avenue_w': {
-                'description': 'Chrome Avenue (West): rain-slick metal walkways reflect a thousand neon glyphs. Drones hum overhead.',
-                'exits': {'west': 'neon_plaza', 'east': 'chrome_avenue_e', 'south': 'rust_and_circuit'}
-            },
-            'chrome_avenue_e': {
-                'description': 'Chrome Avenue (East): a canyon of glass and steel, AR ads ripple along the facades.',
-                'exits': {'west': 'chrome_avenue_w', 'east': 'corporate_lobby'}
-            },
-            # Note: provide reciprocal path for avenue
-            # Use conventional east/west mapping
-            'corporate_lobby': {
-                'description': 'Corporate Lobby: marble floor, biometric turnstiles, and a waterfall of cascading holo-text.',
-                'exits': {'west': 'chrome_avenue_e', 'up': 'server_farm'}
-            },
-            'server_farm': {
-                'description': 'Server Farm: a cathedral of racks, coolant mist drifting between humming stacks. Security ICE crackles in the air.',
-                'exits': {'down': 'corporate_lobby'}
-            },
-            'rust_and_circuit': {
-                'description': 'Rust & Circuit (Bar): oil-stained booths, synthwave pulsing, and the scent of ozone and whiskey.',
-                'exits': {'north': 'chrome_avenue_w'}
-            },
-
-            'synth_street_w': {
-                'description': 'Synth Street (West): patchwork concrete, tangled cabling, and street docs plying their trade.',
-                'exits': {'east': 'synth_street_e', 'south': 'back_alley_w', 'north': 'data_leak'}
-            },
-            'synth_street_e': {
-                'description': 'Synth Street (East): basslines thump from distant clubs; rain turns the light into liquid color.',
-                'exits': {'west': 'synth_street_w', 'north': 'pulse_reactor'}
-            },
-            'data_leak': {
-                'description': 'The Data Leak (Bar): hackers whisper over phosphor-green cocktails; cracked terminals glow along the bar.',
-                'exits': {'south': 'synth_street_w'}
-            },
-            'pulse_reactor': {
-                'description': 'Pulse Reactor (Club): subsonic beats shake the ribcage as light fractals explode across the dance floor.',
-                'exits': {'south': 'synth_street_e'}
-            },
-
-            # Back alleys and markets
-            'back_alley_w': {
-                'description': 'Back Alley (West): steam vents hiss, graffiti flickers with reactive inks. It feels watched.',
-                'exits': {'north': 'synth_street_w', 'east': 'back_alley_e', 'south': 'night_market'}
-            },
-            'back_alley_e': {
-                'description': 'Back Alley (East): dumpsters overflow with cybernetic scrap; the hum of jury-rigged power lines fills the air.',
-                'exits': {'west': 'back_alley_w', 'east': 'neon_alley_s'}
-            },
-            'night_market': {
-                'description': 'Night Market: tarps and stalls under neon rain—contraband biosoft, knockoff optics, and rare firmware.',
-                'exits': {'north': 'back_alley_w', 'east': 'black_market_bazaar'}
-            },
-            'black_market_bazaar': {
-                'description': 'Black Market Bazaar: encrypted auctions buzz on handhelds; mercs barter in hushed tones.',
-                'exits': {'west': 'night_market'}
-            },
-
-            # Neon Alley and clubs
-            'neon_alley_n': {
-                'description': 'Neon Alley (North): cramped walls glow with animated kanji; puddles ripple with color.',
-                'exits': {'south': 'neon_alley_s', 'east': 'club_nexus'}
-            },
-            'neon_alley_s': {
-                'description': 'Neon Alley (South): cables loop like ivy; a backdoor thumps with bass.',
-                'exits': {'north': 'neon_alley_n', 'west': 'back_alley_e', 'east': 'holo_dive'}
-            },
-            'club_nexus': {
-                'description': 'Club Nexus: chromed monolith speakers, laser fog, VIP mezzanines prowled by corpos and fixers.',
-                'exits': {'west': 'neon_alley_n'}
-            },
-            'holo_dive': {
-                'description': 'The Holo-Dive: retro CRT cages and full-sensory booths; patrons drift through curated illusions.',
-                'exits': {'west': 'neon_alley_s'}
-            },
-
-            # Arcology stack
-            'arcology_lobby': {
-                'description': 'Arcology Tower Lobby: mirrored chrome, whisper-quiet lifts, and a concierge drone that never blinks.',
-                'exits': {'south': 'neon_plaza', 'up': 'arcology_residential'}
-            },
-            'arcology_residential': {
-                'description': 'Arcology Residential: endless corridors of identical doors, soft white noise masking the city’s roar.',
-                'exits': {'down': 'arcology_lobby', 'up': 'arcology_penthouse'}
-            },
-            'arcology_penthouse': {
-                'description': 'Arcology Penthouse: panoramic cityscape under stormclouds; a minimalist throne of glass and neon.',
-                'exits': {'down': 'arcology_residential'}
-            },
-
-            # Underground
-            'underground_metro': {
-                'description': 'Underground Metro: hollow tunnels, vending machines selling stamina chems, and a distant train’s wail.',
-                'exits': {'up': 'neon_plaza', 'south': 'scrapyard'}
-            },
-            'scrapyard': {
-                'description': 'Scrapyard: mountains of rusted bots and drone wings; scavengers pick through sparks and rain.',
-                'exits': {'north': 'underground_metro'}
-            }
-        }
-        self.start_room = 'start'
+    def __init__(self, world_dir=None, cache_dir=None):
+        # Static world comes from data/world/ (world.json + zone files),
+        # compiled once into an immutable index and cached as a snapshot
+        self.index = load_index(world_dir or DEFAULT_WORLD_DIR, cache_dir)
+        self.rooms = self.index.rooms
+        self.start_room = self.index.start_room
         # Stationary NPCs per room (name, role)
-        self.npcs_by_room = {
-            'rust_and_circuit': [
-                {'name': 'Grease', 'role': 'Bartender'},
-                {'name': 'Mox', 'role': 'Bouncer'}
-            ],
-            'data_leak': [
-                {'name': 'Patch', 'role': 'Bartender'},
-                {'name': 'Glimmer', 'role': 'Dealer'}
-            ],
-            'night_market': [
-                {'name': 'Hex', 'role': 'Vendor'},
-                {'name': 'Silk', 'role': 'Vendor'}
-            ],
-            'black_market_bazaar': [
-                {'name': 'Cipher', 'role': 'Fence'}
-            ],
-            'club_nexus': [
-                {'name': 'DJ Void', 'role': 'DJ'},
-                {'name': 'Nyx', 'role': 'Bartender'}
-            ],
-            'holo_dive': [
-                {'name': 'Vera', 'role': 'Attendant'}
-            ],
-            'corporate_lobby': [
-                {'name': 'Concierge-7', 'role': 'Receptionist'}
-            ],
-            'arcology_lobby': [
-                {'name': 'Porter Drone', 'role': 'Concierge'}
-            ]
-        }
+        self.npcs_by_room = self.index.npcs
+        # Online players per room, maintained on connect/disconnect and movement
+        self.players_by_room = {}
         # Dynamic mobs (e.g., roaming gangs) as counts per room
         self.mobs_by_room = {}
-        # Define mob types with weights and base HP
-        self.mob_types = [
-            {'name': 'Street Punk', 'hp': 28, 'weight': 5},
-            {'name': 'Cyber Thug', 'hp': 35, 'weight': 4},
-            {'name': 'Gang Member', 'hp': 40, 'weight': 4},
-            {'name': 'Blade Dancer', 'hp': 45, 'weight': 2},
-            {'name': 'Corpo Security', 'hp': 50, 'weight': 2},
-            {'name': 'Enforcer', 'hp': 55, 'weight': 1},
-            {'name': 'Aug Bruiser', 'hp': 60, 'weight': 1},
-            {'name': 'Drone Swarm', 'hp': 20, 'weight': 2},
-            {'name': 'Net Runner', 'hp': 30, 'weight': 2}
-        ]
+        # Rooms whose mobs or ground items changed since the last drain_changed_rooms()
+        self.changed_rooms = set()
+        # Items lying in rooms (in memory only until a store is attached)
+        self.items = ObjectStore(on_change=lambda room: self.changed_rooms.add(room))
+        # Optional callback(op, room_name, mob_name) for mob changes made by
+        # players, so a cluster follower can forward them to the leader
+        self.mob_listener = None
+        # Mob types with weights and base HP
+        self.mob_types = [dict(m) for m in self.index.mob_types]
+        # Fights in progress; rounds resolve on the game tick
+        self.combat = CombatEngine(self)
+        self._compile_graph()
         self._seed_roaming_gangs()
 
     def get_npcs(self, room_name):
         return list(self.npcs_by_room.get(room_name, []))
 
-    def get_mobs_in_room(self, room_name):
-        # Return expanded list of mob names based on counts
-        mobs = []
-        counts = self.mobs_by_room.get(room_name, {})
+    def add_player(self, player):
+        # Register an online player in the room index
+        self.players_by_room.setdefault(player.current_room, set()).add(player)
+
+    def remove_player(self, player):
+        # Drop a player from the room index (e.g., on disconnect)
+        self._unindex_player(player, player.current_room)
+
+    def _unindex_player(self, player, room_name):
+        occupants = self.players_by_room.get(room_name)
+        if occupants is None or player not in occupants:
+            return False
+        occupants.discard(player)
+        if not occupants:
+            del self.players_by_room[room_name]
+        return True
+
+    def players_in_room(self, room_name, exclude=None):
+        # Online players in a room; cost scales with occupancy, not population
+        return [p for p in self.players_by_room.get(room_name, ()) if p is not exclude]
+
+    def mob_counts(self, room_name):
+        # {mob name: count} for a room (the live dict; copy before changing it)
+        return self.mobs_by_room.get(room_name, _NO_MOBS)
+
+    def pick_mob(self, room_name, rng=random):
+        # One mob name from a room, weighted by count, or None if it's empty.
+        # Walks the types, not the individual mobs.
+        counts = self.mobs_by_room.get(room_name)
+        if not counts:
+            return None
+        total = sum(cnt for cnt in counts.values() if cnt > 0)
+        if total <= 0:
+            return None
+        r = rng.randrange(total)
         for name, cnt in counts.items():
-            mobs.extend([name] * max(0, int(cnt)))
-        return mobs
+            if cnt <= 0:
+                continue
+            if r < cnt:
+                return name
+            r -= cnt
+        return None
+
+    def mob_type(self, name):
+        # Mob type entry (hp, damage, ...) by name, or None
+        return self.mob_types_by_name.get(name)
+
+    def random_mob_type(self, rng=random):
+        # Mob type drawn by its spawn weight
+        r = rng.uniform(0, self._mob_weight_total)
+        i = bisect.bisect_left(self._mob_cum_weights, r)
+        return self.mob_types[min(i, len(self.mob_types) - 1)]
+
+    def _compile_graph(self):
+        # Room ids, street mask and CSR roam targets come precompiled from
+        # the index; only the per-process pieces are set up here
+        index = self.index
+        self.room_names = index.room_names
+        self.room_ids = index.room_ids
+        self.street_mask = index.street_mask
+        self.roam_offsets = index.roam_offsets
+        self.roam_targets = index.roam_targets
+        self.mob_type_ids = {m['name']: i for i, m in enumerate(self.mob_types)}
+        self.mob_types_by_name = {m['name']: m for m in self.mob_types}
+        # Undirected room adjacency (exits either way), for interest queries
+        neighbors = {name: set(room['exits'].values()) for name, room in self.rooms.items()}
+        for name, room in self.rooms.items():
+            for target in room['exits'].values():
+                neighbors.setdefault(target, set()).add(name)
+        self.neighbors = {name: tuple(sorted(adj)) for name, adj in neighbors.items()}
+        self._mob_cum_weights = list(itertools.accumulate(m['weight'] for m in self.mob_types))
+        self._mob_weight_total = self._mob_cum_weights[-1] if self._mob_cum_weights else 0
+        if np is not None:
+            self._np_offsets = np.asarray(self.roam_offsets, dtype=np.int64)
+            self._np_targets = np.asarray(self.roam_targets, dtype=np.int64)
+            self._np_degree = np.diff(self._np_offsets)
+            self._rng = np.random.default_rng()
 
     def _street_rooms(self):
-        # Consider these rooms as streets/alleys where gangs can roam
-        return [r for r in self.rooms.keys() if any(
-            key in r for key in (
-                'plaza', 'avenue', 'street', 'alley', 'market', 'bazaar', 'neon_alley', 'scrapyard'
-            )
-        )]
+        # Streets/alleys where gangs can roam (flagged in the zone files)
+        return self.index.streets
+
+    def is_street(self, room_name):
+        return self.index.is_street(room_name)
+
+    def has_vendor(self, room_name):
+        # True when an NPC here sells things (bartender, vendor, fence, ...)
+        return room_name in self.index.vendors
+
+    def exits_into(self, room_name):
+        # (direction, source_room) pairs for every exit leading into a room
+        return self.index.reverse_exits.get(room_name, ())
 
     def _seed_roaming_gangs(self, count=8):
-        import random
         streets = self._street_rooms()
         for _ in range(count):
-            if not streets:
+            if not streets or not self.mob_types:
                 break
             start = random.choice(streets)
             self.mobs_by_room.setdefault(start, {})
-            # Weighted choice of mob type
-            total = sum(m['weight'] for m in self.mob_types)
-            r = random.uniform(0, total)
-            upto = 0
-            choice = self.mob_types[0]
-            for m in self.mob_types:
-                if upto + m['weight'] >= r:
-                    choice = m
-                    break
-                upto += m['weight']
-            name = choice['name']
+            name = self.random_mob_type()['name']
             self.mobs_by_room[start][name] = self.mobs_by_room[start].get(name, 0) + 1
 
+    def drain_changed_rooms(self):
+        # Rooms whose mobs or items changed since the last call (and forget them)
+        changed, self.changed_rooms = self.changed_rooms, set()
+        return changed
+
+    def rooms_within(self, rooms, radius=1):
+        # Every room at most `radius` exits away from any of `rooms`
+        seen = set(rooms)
+        frontier = seen
+        for _ in range(radius):
+            nxt = set()
+            for room in frontier:
+                for adj in self.neighbors.get(room, ()):
+                    if adj not in seen:
+                        nxt.add(adj)
+            if not nxt:
+                break
+            seen |= nxt
+            frontier = nxt
+        return seen
+
+    def replace_mobs(self, mobs_by_room):
+        # Adopt a whole new mob state (e.g. from the cluster leader); returns
+        # the rooms whose population differs from before
+        changed = _changed_rooms(self.mobs_by_room, mobs_by_room)
+        self.mobs_by_room = mobs_by_room
+        self.changed_rooms |= changed
+        return changed
+
+    def mob_count_matrix(self):
+        # Mob counts as a rooms x mob-types array (NumPy required)
+        names = self.room_names
+        counts = np.zeros((len(names), len(self.mob_types)), dtype=np.int64)
+        for room, per_type in self.mobs_by_room.items():
+            r = self.room_ids.get(room)
+            for mob_name, cnt in per_type.items():
+                t = self.mob_type_ids.get(mob_name)
+                if r is not None and t is not None and cnt > 0:
+                    counts[r, t] += int(cnt)
+        return counts
+
     def tick_roaming(self):
-        # Move each gang member one step along a random available exit
-        import random
-        moves = []
-        for room, counts in list(self.mobs_by_room.items()):
-            for mob_name, count in list(counts.items()):
-                for _ in range(int(count)):
-                    exits = self.rooms.get(room, {}).get('exits', {})
-                    if not exits:
-                        continue
-                    # Prefer to stay on street/alleys
-                    dirs = list(exits.items())
-                    random.shuffle(dirs)
-                    next_room = None
-                    for _, target in dirs:
-                        if target in self._street_rooms():
-                            next_room = target
-                            break
-                    if not next_room:
-                        next_room = random.choice(list(exits.values()))
-                    moves.append((room, next_room, mob_name))
-        # Apply moves
-        for src, dst, mob_name in moves:
-            # decrement from src
-            if self.mobs_by_room.get(src, {}).get(mob_name, 0) > 0:
-                self.mobs_by_room[src][mob_name] -= 1
-                if self.mobs_by_room[src][mob_name] <= 0:
-                    del self.mobs_by_room[src][mob_name]
-            # increment to dst
-            self.mobs_by_room.setdefault(dst, {})
-            self.mobs_by_room[dst][mob_name] = self.mobs_by_room[dst].get(mob_name, 0) + 1
+        # Move every mob one step to a uniformly chosen roam target (street
+        # exits preferred), all at once. Mobs the compiled graph doesn't know
+        # about (unknown rooms or types) stay put. Returns the set of rooms
+        # whose population changed.
+        started = time.perf_counter()
+        stay = {}
+        for room, per_type in self.mobs_by_room.items():
+            for mob_name, cnt in per_type.items():
+                if cnt > 0 and (room not in self.room_ids or mob_name not in self.mob_type_ids):
+                    stay.setdefault(room, {})[mob_name] = cnt
+        if np is not None:
+            moved = self._roam_numpy()
+        else:
+            moved = self._roam_python()
+        for room, per_type in stay.items():
+            dst = moved.setdefault(room, {})
+            for mob_name, cnt in per_type.items():
+                dst[mob_name] = dst.get(mob_name, 0) + cnt
+        changed = self.replace_mobs(moved)
+        ROAM_SECONDS.observe(time.perf_counter() - started)
+        MOBS_TOTAL.set(sum(sum(per_type.values()) for per_type in moved.values()))
+        return changed
+
+    def _roam_numpy(self):
+        counts = self.mob_count_matrix()
+        n_types = counts.shape[1]
+        rows, cols = np.nonzero(counts)
+        n = counts[rows, cols]
+        src = np.repeat(rows, n)
+        typ = np.repeat(cols, n)
+        deg = self._np_degree[src]
+        pick = self._np_offsets[src] + (self._rng.random(src.size) * deg).astype(np.int64)
+        # Rooms without exits keep their mobs
+        has_exit = deg > 0
+        dst = src.copy()
+        dst[has_exit] = self._np_targets[pick[has_exit]]
+        flat = np.bincount(dst * n_types + typ, minlength=counts.size).reshape(counts.shape)
+        moved = {}
+        for r, t in zip(*np.nonzero(flat)):
+            moved.setdefault(self.room_names[r], {})[self.mob_types[t]['name']] = int(flat[r, t])
+        return moved
+
+    def _roam_python(self):
+        offsets, targets, names = self.roam_offsets, self.roam_targets, self.room_names
+        moved = {}
+        for room, per_type in self.mobs_by_room.items():
+            r = self.room_ids.get(room)
+            if r is None:
+                continue
+            lo, hi = offsets[r], offsets[r + 1]
+            for mob_name, cnt in per_type.items():
+                if mob_name not in self.mob_type_ids:
+                    continue
+                for _ in range(int(cnt)):
+                    dst = names[targets[random.randrange(lo, hi)]] if hi > lo else room
+                    per_dst = moved.setdefault(dst, {})
+                    per_dst[mob_name] = per_dst.get(mob_name, 0) + 1
+        return moved
 
     def take_mob(self, room_name, name):
         # Remove one mob instance by name from a room, if present
-        if room_name in self.mobs_by_room and name in self.mobs_by_room[room_name]:
-            self.mobs_by_room[room_name][name] -= 1
-            if self.mobs_by_room[room_name][name] <= 0:
-                del self.mobs_by_room[room_name][name]
+        if self.apply_mob_event('take', room_name, name) and self.mob_listener:
+            self.mob_listener('take', room_name, name)
+
+    def spawn_mob(self, room_name, name):
+        # Add one mob instance by name to a room
+        if self.apply_mob_event('spawn', room_name, name) and self.mob_listener:
+            self.mob_listener('spawn', room_name, name)
+
+    def apply_mob_event(self, op, room_name, name):
+        # Apply a mob change without notifying the listener
+        if op == 'take':
+            if room_name in self.mobs_by_room and name in self.mobs_by_room[room_name]:
+                self.mobs_by_room[room_name][name] -= 1
+                if self.mobs_by_room[room_name][name] <= 0:
+                    del self.mobs_by_room[room_name][name]
+                self.changed_rooms.add(room_name)
+                return True
+            return False
+        if op == 'spawn':
+            self.mobs_by_room.setdefault(room_name, {})
+            self.mobs_by_room[room_name][name] = self.mobs_by_room[room_name].get(name, 0) + 1
+            self.changed_rooms.add(room_name)
+            return True
+        return False
 
     def get_shop_inventory(self, room_name):
-        # Base catalog
-        base = {
-            'Stimpack': 50,
-            'Energy Drink': 25,
-            'Ammo': 25
-        }
-        # Per-venue additions/overrides
-        per_room = {
-            'rust_and_circuit': {
-                'Stimpack': 50,
-                'Energy Drink': 25,
-                'Adrenaline Shot': 60
-            },
-            'data_leak': {
-                'Encrypted Chip': 75,
-                'VR Chip': 40
-            },
-            'night_market': {
-                'Stimpack': 45,
-                'Ammo': 25,
-                'Armor Vest': 120,
-                'EMP Grenade': 90
-            },
-            'black_market_bazaar': {
-                'Holo Cloak': 300,
-                'Neon Blade': 500,
-                'Katana': 350
-            },
-            'club_nexus': {
-                'Adrenaline Shot': 60,
-                'Energy Drink': 25
-            },
-            'holo_dive': {
-                'VR Chip': 40
-            },
-            'corporate_lobby': {
-                'Visitor Pass': 20
-            }
-        }
-        inv = dict(base)
-        if room_name in per_room:
-            inv.update(per_room[room_name])
-        return inv
+        # Base catalog merged with per-venue additions/overrides (read-only)
+        return self.index.shop_for(room_name)
 
     def describe_room(self, room_name):
         room = self.rooms.get(room_name)
@@ -308,11 +292,28 @@ class World:
             return "You are in a void."
         desc = room['description']
         exits = ', '.join(room['exits'].keys())
-        return f"{desc}\nExits: {exits}"
+        text = f"{desc}\nExits: {exits}"
+        items = self.items.items_in(room_name)
+        if items:
+            text += "\nOn the ground: " + ", ".join(f"{name} x{n}" if n > 1 else name for name, n in items.items())
+        return text
 
     def move_player(self, player, direction):
         current = self.rooms.get(player.current_room)
         if not current or direction not in current['exits']:
             return "You can't go that way."
+        src = player.current_room
         player.current_room = current['exits'][direction]
+        # Keep the room index in step; unregistered players are left out
+        if self._unindex_player(player, src):
+            self.add_player(player)
         return self.describe_room(player.current_room)
+
+
+def _changed_rooms(old, new):
+    # Rooms whose {mob: count} differs between two mob states (empty == absent)
+    changed = set()
+    for room in old.keys() | new.keys():
+        if (old.get(room) or _NO_MOBS) != (new.get(room) or _NO_MOBS):
+            changed.add(room)
+    return changed
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import marshal
+import os
+import sys
+from types import MappingProxyType
+
+# Roles whose NPCs sell things; a room with one of them has a shop
+VENDOR_ROLES = ('Bartender', 'Vendor', 'Fence', 'Attendant')
+DEFAULT_WORLD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'world')
+# Bump when the compiled layout changes so stale snapshots are ignored
+INDEX_FORMAT = 1
+
+
+class WorldIndex:
+    """Immutable, precomputed view of the static world.
+
+    Built once from the world data files: interned room ids, reverse exits,
+    the roamable street set, per-room vendor flags and merged shop
+    catalogs, plus the CSR roam-target arrays used by mob roaming. Every
+    lookup is a dict/tuple access.
+    """
+
+    __slots__ = (
+        'name', 'start_room', 'source_hash', 'rooms', 'room_names', 'room_ids',
+        'reverse_exits', 'streets', 'street_mask', 'npcs', 'vendors', 'shops',
+        'base_shop', 'mob_types', 'roam_offsets', 'roam_targets',
+    )
+
+    def __init__(self, compiled):
+        self.name = compiled['name']
+        self.start_room = compiled['start_room']
+        self.source_hash = compiled['source_hash']
+        # rooms keeps the client-facing shape: {name: {'description', 'exits'}}
+        self.rooms = compiled['rooms']
+        self.room_names = tuple(sys.intern(n) for n in compiled['room_names'])
+        self.room_ids = MappingProxyType({n: i for i, n in enumerate(self.room_names)})
+        self.reverse_exits = MappingProxyType(
+            {room: tuple(tuple(e) for e in entries) for room, entries in compiled['reverse_exits'].items()}
+        )
+        self.street_mask = tuple(compiled['street_mask'])
+        self.streets = tuple(n for n, street in zip(self.room_names, self.street_mask) if street)
+        self.npcs = MappingProxyType({room: tuple(npcs) for room, npcs in compiled['npcs'].items()})
+        self.vendors = frozenset(compiled['vendors'])
+        self.base_shop = MappingProxyType(compiled['base_shop'])
+        self.shops = MappingProxyType({room: MappingProxyType(c) for room, c in compiled['shops'].items()})
+        self.mob_types = tuple(compiled['mob_types'])
+        self.roam_offsets = tuple(compiled['roam_offsets'])
+        self.roam_targets = tuple(compiled['roam_targets'])
+
+    def is_street(self, room_name):
+        i = self.room_ids.get(room_name)
+        return i is not None and self.street_mask[i]
+
+    def shop_for(self, room_name):
+        return self.shops.get(room_name, self.base_shop)
+
+
+def _read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def load_sources(world_dir=DEFAULT_WORLD_DIR):
+    # Read world.json and the zone files it lists; returns (raw texts, hash)
+    main_path = os.path.join(world_dir, 'world.json')
+    texts = [(main_path, _read_json(main_path))]
+    for zone in json.loads(texts[0][1]).get('zones', []):
+        zone_path = os.path.join(world_dir, zone)
+        texts.append((zone_path, _read_json(zone_path)))
+    digest = hashlib.sha256()
+    digest.update(f'format={INDEX_FORMAT}'.encode())
+    for path, text in texts:
+        digest.update(os.path.relpath(path, world_dir).encode())
+        digest.update(b'\0')
+        digest.update(text.encode('utf-8'))
+    return texts, digest.hexdigest()
+
+
+def compile_world(texts, source_hash):
+    # Merge zone files into plain data (marshal-friendly) for WorldIndex
+    world = json.loads(texts[0][1])
+    rooms = {}
+    npcs = {}
+    shop_overrides = {}
+    street = {}
+    for path, text in texts[1:]:
+        zone = json.loads(text)
+        for name, room in zone.get('rooms', {}).items():
+            if name in rooms:
+                raise ValueError(f"Room '{name}' defined twice (again in {path})")
+            rooms[name] = {'description': room['description'], 'exits': dict(room.get('exits', {}))}
+            street[name] = bool(room.get('street', False))
+            if room.get('npcs'):
+                npcs[name] = [dict(n) for n in room['npcs']]
+            if room.get('shop'):
+                shop_overrides[name] = dict(room['shop'])
+    start_room = world.get('start_room', 'start')
+    if start_room not in rooms:
+        raise ValueError(f"start_room '{start_room}' is not defined in any zone")
+    for name, room in rooms.items():
+        for direction, target in room['exits'].items():
+            if target not in rooms:
+                raise ValueError(f"Exit '{direction}' of '{name}' leads to unknown room '{target}'")
+
+    room_names = list(rooms.keys())
+    room_ids = {n: i for i, n in enumerate(room_names)}
+    street_mask = [street[n] for n in room_names]
+    reverse_exits = {}
+    for name, room in rooms.items():
+        for direction, target in room['exits'].items():
+            reverse_exits.setdefault(target, []).append([direction, name])
+    # Roam targets per room: street exits if there are any, otherwise every
+    # exit. Exits to the same room appear once per exit, matching a uniform
+    # pick over exits.
+    roam_offsets = [0]
+    roam_targets = []
+    for name in room_names:
+        exits = list(rooms[name]['exits'].values())
+        on_street = [t for t in exits if street[t]]
+        roam_targets.extend(room_ids[t] for t in (on_street or exits))
+        roam_offsets.append(len(roam_targets))
+
+    base_shop = dict(world.get('shop_base', {}))
+    shops = {}
+    for name, overrides in shop_overrides.items():
+        catalog = dict(base_shop)
+        catalog.update(overrides)
+        shops[name] = catalog
+    vendors = [n for n, people in npcs.items() if any(p.get('role') in VENDOR_ROLES for p in people)]
+    return {
+        'name': world.get('name', ''),
+        'start_room': start_room,
+        'source_hash': source_hash,
+        'rooms': rooms,
+        'room_names': room_names,
+        'reverse_exits': reverse_exits,
+        'street_mask': street_mask,
+        'npcs': npcs,
+        'vendors': vendors,
+        'base_shop': base_shop,
+        'shops': shops,
+        'mob_types': [dict(m) for m in world.get('mob_types', [])],
+        'roam_offsets': roam_offsets,
+        'roam_targets': roam_targets,
+    }
+
+
+def _snapshot_path(cache_dir, source_hash):
+    tag = f'py{sys.version_info[0]}{sys.version_info[1]}'
+    return os.path.join(cache_dir, f'world-{source_hash[:20]}-{tag}.marshal')
+
+
+def load_index(world_dir=DEFAULT_WORLD_DIR, cache_dir=None):
+    # Compile the world, reusing a marshal snapshot when the sources are unchanged
+    texts, source_hash = load_sources(world_dir)
+    if cache_dir is None:
+        cache_dir = os.path.join(world_dir, '.cache')
+    path = _snapshot_path(cache_dir, source_hash)
+    try:
+        with open(path, 'rb') as f:
+            compiled = marshal.load(f)
+        if compiled.get('source_hash') == source_hash:
+            return WorldIndex(compiled)
+    except (OSError, EOFError, ValueError, TypeError, AttributeError):
+        pass
+    compiled = compile_world(texts, source_hash)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            marshal.dump(compiled, f)
+        os.replace(tmp, path)
+    except OSError:
+        # A read-only data dir just means no snapshot
+        pass
+    return WorldIndex(compiled)
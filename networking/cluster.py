@@ -0,0 +1,111 @@
+import json
+import os
+import socket
+import uuid
+
+try:
+    import redis
+except ImportError:  # Optional: only needed for multi-worker / multi-node mode
+    redis = None
+
+
+class Cluster:
+    """Coordination between game processes sharing one world.
+
+    With no Redis URL this is a single-process cluster: this process is
+    always the leader and shared state is a no-op. With Redis, processes
+    elect one leader through a renewable lease; the leader is the
+    authoritative world simulation (mob roaming) and publishes mob state,
+    while followers read it and forward mob changes made by their players.
+    """
+
+    LEADER_KEY = 'game:leader'
+    MOBS_KEY = 'game:world:mobs'
+    MOB_EVENTS_KEY = 'game:world:mob_events'
+
+    def __init__(self, url=None, lease_seconds=10.0, role='auto'):
+        self.url = url
+        self.lease_seconds = lease_seconds
+        # 'auto' takes part in leader election, 'edge' never leads
+        self.role = role
+        self.node_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._leader = url is None and role != 'edge'
+        self._redis = None
+        if url:
+            if redis is None:
+                raise RuntimeError('REDIS_URL is set but the redis package is not installed')
+            self._redis = redis.Redis.from_url(url)
+            self._renew = self._redis.register_script(
+                "if redis.call('get', KEYS[1]) == ARGV[1] then "
+                "return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+            )
+
+    @property
+    def distributed(self):
+        return self._redis is not None
+
+    def is_leader(self):
+        return self._leader
+
+    def campaign(self):
+        # Acquire or renew the leader lease; returns whether we lead now
+        if self._redis is None or self.role == 'edge':
+            return self._leader
+        ttl_ms = int(self.lease_seconds * 1000)
+        try:
+            if self._leader:
+                self._leader = bool(self._renew(keys=[self.LEADER_KEY], args=[self.node_id, ttl_ms]))
+            if not self._leader:
+                self._leader = bool(self._redis.set(self.LEADER_KEY, self.node_id, nx=True, px=ttl_ms))
+        except Exception:
+            # Lost contact with Redis: step down rather than risk two leaders
+            self._leader = False
+        return self._leader
+
+    def resign(self):
+        if self._redis is not None and self._leader:
+            try:
+                if self._redis.get(self.LEADER_KEY) == self.node_id.encode():
+                    self._redis.delete(self.LEADER_KEY)
+            except Exception:
+                pass
+        self._leader = False
+
+    def publish_mobs(self, mobs_by_room):
+        if self._redis is not None:
+            self._redis.set(self.MOBS_KEY, json.dumps(mobs_by_room))
+
+    def fetch_mobs(self):
+        # Latest mob state published by the leader, or None if unavailable
+        if self._redis is None:
+            return None
+        raw = self._redis.get(self.MOBS_KEY)
+        return json.loads(raw) if raw else None
+
+    def push_mob_event(self, op, room_name, mob_name):
+        # Followers forward mob changes (e.g., a mob pulled into a fight) to the leader
+        if self._redis is not None and not self._leader:
+            self._redis.rpush(self.MOB_EVENTS_KEY, json.dumps([op, room_name, mob_name]))
+
+    def drain_mob_events(self):
+        if self._redis is None:
+            return []
+        pipe = self._redis.pipeline()
+        pipe.lrange(self.MOB_EVENTS_KEY, 0, -1)
+        pipe.delete(self.MOB_EVENTS_KEY)
+        raw, _ = pipe.execute()
+        return [json.loads(item) for item in raw]
+
+
+def world_tick(world, cluster):
+    # One mob-simulation step. The leader applies forwarded changes, moves the
+    # mobs and publishes the result; followers adopt the published state.
+    if cluster.is_leader():
+        for op, room_name, mob_name in cluster.drain_mob_events():
+            world.apply_mob_event(op, room_name, mob_name)
+        world.tick_roaming()
+        cluster.publish_mobs(world.mobs_by_room)
+    else:
+        mobs = cluster.fetch_mobs()
+        if mobs is not None:
+            world.replace_mobs(mobs)
@@ -0,0 +1,255 @@
+import asyncio
+import itertools
+import json
+import socket
+import threading
+
+from game.player import Player
+from game.profiler import CommandTrace
+from game.session import Frontend, Session
+
+# Local IPC between the world process and protocol edge processes.
+#
+# Newline-delimited JSON over a TCP socket (normally on localhost). An edge
+# (e.g. `server.py` with GAME_GATEWAY set) owns the client sockets and only
+# handles encoding; the world process runs GameCore and sends text back.
+#
+#   edge -> world: {"op": "attach", "sid": ..., "name": ...}
+#                  {"op": "line", "sid": ..., "text": ..., "mark": true?}
+#                  {"op": "detach", "sid": ...}
+#   world -> edge: {"op": "send", "sid": ..., "text": ...}
+#                  {"op": "mark", "sid": ...}   (after the line's replies)
+#                  {"op": "close", "sid": ...}
+
+
+def parse_address(value, default_port=4001):
+    # 'host:port' or just 'port' -> (host, port)
+    host, _, port = str(value).rpartition(':')
+    return (host or '127.0.0.1'), int(port or default_port)
+
+
+def _encode(msg):
+    return (json.dumps(msg, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+class GatewaySession(Session):
+    """A player on an edge process, seen from the world process."""
+
+    def __init__(self, edge, remote_sid, player):
+        super().__init__(f'{edge.edge_id}:{remote_sid}', player)
+        self.edge = edge
+        self.remote_sid = remote_sid
+
+    def send(self, text):
+        self.edge.write({'op': 'send', 'sid': self.remote_sid, 'text': text})
+
+    def close(self):
+        self.edge.write({'op': 'close', 'sid': self.remote_sid})
+
+    def mark(self):
+        self.edge.write({'op': 'mark', 'sid': self.remote_sid})
+
+
+class _Edge:
+    __slots__ = ('edge_id', 'sock', 'sessions', 'alive', '_lock')
+
+    def __init__(self, edge_id, sock, lock):
+        self.edge_id = edge_id
+        self.sock = sock
+        self.sessions = {}
+        self.alive = True
+        # Keeps messages from interleaving; held across sendall(), so it
+        # must be the same kind (green/native) as the socket
+        self._lock = lock
+
+    def write(self, msg):
+        if not self.alive:
+            return
+        data = _encode(msg)
+        with self._lock:
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                self.alive = False
+
+
+class GatewayServer:
+    """World-process end of the gateway: edge sessions become core sessions.
+
+    Runs its accept loop and one reader per edge through `spawn` (e.g.
+    socketio.start_background_task), so pass a socket module and a lock
+    factory that match the server's async mode (eventlet's green socket and
+    Semaphore under eventlet). A native lock held by a greenthread blocked
+    in a green sendall() would stall the whole hub.
+    """
+
+    def __init__(self, core, host='127.0.0.1', port=4001, spawn=None, socket_module=socket, slow_log=None,
+                 lock_factory=threading.Lock):
+        self.core = core
+        self.host = host
+        self.port = port
+        self.spawn = spawn or (lambda fn, *args: threading.Thread(target=fn, args=args, daemon=True).start())
+        self.socket_module = socket_module
+        self.lock_factory = lock_factory
+        # Optional SlowCommandLog for edge players' commands
+        self.slow_log = slow_log
+        self.frontend = Frontend('gateway')
+        self.edges = {}
+        self._ids = itertools.count(1)
+        self._listener = None
+
+    def start(self):
+        sock = self.socket_module.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(64)
+        # Report the real port when bound to 0
+        self.port = sock.getsockname()[1]
+        self._listener = sock
+        self.spawn(self._accept_loop)
+        return self
+
+    def stop(self):
+        if self._listener is not None:
+            try:
+                self._listener.close()
+            except OSError:
+                pass
+            self._listener = None
+
+    def _accept_loop(self):
+        while self._listener is not None:
+            try:
+                conn, _ = self._listener.accept()
+            except OSError:
+                break
+            self.spawn(self._serve_edge, conn)
+
+    def _serve_edge(self, conn):
+        edge = _Edge(next(self._ids), conn, self.lock_factory())
+        self.edges[edge.edge_id] = edge
+        try:
+            for raw in conn.makefile('rb'):
+                try:
+                    msg = json.loads(raw)
+                except ValueError:
+                    continue
+                self._handle(edge, msg)
+        except OSError:
+            pass
+        finally:
+            # Edge gone: its players leave the world
+            edge.alive = False
+            for sess in list(edge.sessions.values()):
+                self.core.detach(sess)
+            edge.sessions.clear()
+            self.edges.pop(edge.edge_id, None)
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _handle(self, edge, msg):
+        op = msg.get('op')
+        sid = msg.get('sid')
+        if op == 'line':
+            sess = edge.sessions.get(sid)
+            if sess is not None:
+                text = str(msg.get('text', ''))
+                if text and self.slow_log is None:
+                    self.core.command(sess, text)
+                elif text:
+                    trace = CommandTrace(text, sess.player.username, sess.player.current_room)
+                    self.core.command(sess, text, trace=trace)
+                    self.slow_log.record(trace)
+                if msg.get('mark'):
+                    sess.mark()
+        elif op == 'attach':
+            player = Player(None, self.core.world.start_room)
+            player.username = player.name = str(msg.get('name') or f'Guest{sid}')
+            sess = GatewaySession(edge, sid, player)
+            edge.sessions[sid] = sess
+            self.core.attach(sess, self.frontend)
+        elif op == 'detach':
+            sess = edge.sessions.pop(sid, None)
+            if sess is not None:
+                self.core.detach(sess)
+
+
+class GatewayClient:
+    """Edge-process end of the gateway (asyncio).
+
+    Forwards attach/line/detach for local sessions and delivers the world's
+    replies to them. If the world process goes away every session is closed.
+    """
+
+    def __init__(self, host='127.0.0.1', port=4001):
+        self.host = host
+        self.port = port
+        self.sessions = {}
+        self._reader = None
+        self._writer = None
+        self._task = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._task = asyncio.create_task(self._read_loop())
+        return self
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def attach(self, session):
+        self.sessions[session.sid] = session
+        await self._write({'op': 'attach', 'sid': session.sid, 'name': session.player.name})
+
+    async def line(self, session, text, mark=False):
+        msg = {'op': 'line', 'sid': session.sid, 'text': text}
+        if mark:
+            msg['mark'] = True
+        await self._write(msg)
+
+    async def detach(self, session):
+        if self.sessions.pop(session.sid, None) is not None:
+            await self._write({'op': 'detach', 'sid': session.sid})
+
+    async def _write(self, msg):
+        if self._writer is None:
+            return
+        self._writer.write(_encode(msg))
+        try:
+            await self._writer.drain()
+        except ConnectionError:
+            pass
+
+    async def _read_loop(self):
+        try:
+            while True:
+                raw = await self._reader.readline()
+                if not raw:
+                    break
+                try:
+                    msg = json.loads(raw)
+                except ValueError:
+                    continue
+                sess = self.sessions.get(msg.get('sid'))
+                if sess is None:
+                    continue
+                if msg.get('op') == 'send':
+                    sess.send(str(msg.get('text', '')))
+                elif msg.get('op') == 'mark':
+                    sess.mark()
+                elif msg.get('op') == 'close':
+                    sess.close()
+        except ConnectionError:
+            pass
+        finally:
+            for sess in list(self.sessions.values()):
+                sess.send("The world server went away. Goodbye!")
+                sess.close()
+            self.sessions.clear()
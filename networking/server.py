@@ -1,40 +1,416 @@
-import socket
-import threading
-from game.commands import handle_command
+import asyncio
+import itertools
+import signal
+
+from game.metrics import CONTENT_TYPE, REGISTRY
 from game.player import Player
+from game.profiler import CommandTrace, SlowCommandLog
+from game.session import Frontend, GameCore, Session
 from game.world import World
 
+# Telnet protocol bytes (RFC 854)
+IAC, SB, SE = 255, 250, 240
+WILL, WONT, DO, DONT = 251, 252, 253, 254
+# Timing mark (RFC 860): a client sends IAC DO TM after its input and gets
+# IAC WILL TM back once everything before it has been processed and answered
+TM = 6
+TIMING_MARK_REQUEST = bytes((IAC, DO, TM))
+TIMING_MARK_REPLY = bytes((IAC, WILL, TM))
+
+# Read from MudServer.stats at scrape time, so counting costs nothing extra
+TELNET_COUNTERS = {
+    'accepted': REGISTRY.counter('mud_telnet_accepted_total', 'Telnet connections accepted'),
+    'lines': REGISTRY.counter('mud_telnet_lines_total', 'Input lines read from telnet clients'),
+    'idle_timeouts': REGISTRY.counter('mud_telnet_idle_timeouts_total', 'Telnet clients closed for idling'),
+    'slow_disconnects': REGISTRY.counter('mud_telnet_slow_disconnects_total',
+                                         'Telnet clients dropped because their output queue filled'),
+    'oversized_lines': REGISTRY.counter('mud_telnet_oversized_lines_total', 'Telnet input lines over max_line'),
+}
+TELNET_CONNECTIONS = REGISTRY.gauge('mud_telnet_connections', 'Open telnet connections')
+
+
+def strip_telnet(data):
+    # Drop telnet negotiation (IAC ...) from a line; IAC IAC is a literal 0xFF
+    if IAC not in data:
+        return data
+    out = bytearray()
+    i, n = 0, len(data)
+    while i < n:
+        b = data[i]
+        if b != IAC:
+            out.append(b)
+            i += 1
+            continue
+        op = data[i + 1] if i + 1 < n else None
+        if op == IAC:
+            out.append(IAC)
+            i += 2
+        elif op in (WILL, WONT, DO, DONT):
+            i += 3
+        elif op == SB:
+            end = data.find(bytes((IAC, SE)), i + 2)
+            i = n if end < 0 else end + 2
+        else:
+            i += 2
+    return bytes(out)
+
+
+def _encode_line(text):
+    # Telnet wants CRLF line ends, including inside multi-line messages.
+    # Bytes (protocol replies such as a timing mark) go out as they are.
+    if isinstance(text, bytes):
+        return text
+    return (text.replace('\r\n', '\n').replace('\n', '\r\n') + '\r\n').encode('utf-8')
+
+
+class Connection:
+    """One telnet client: its player, output queue and writer task."""
+
+    __slots__ = ('reader', 'writer', 'player', 'session', 'queue', 'drained', 'task', 'writer_task', 'closing')
+
+    def __init__(self, reader, writer, player, max_queue):
+        self.reader = reader
+        self.writer = writer
+        self.player = player
+        self.session = None
+        # Bounded so a client that stops reading can't grow server memory
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        # Set by the writer after each flush to the socket
+        self.drained = asyncio.Event()
+        self.task = None
+        self.writer_task = None
+        self.closing = False
+
+
+class TelnetSession(Session):
+    """GameCore session for a telnet connection: text lines, CRLF-terminated."""
+
+    def __init__(self, server, conn, sid):
+        super().__init__(sid, conn.player)
+        self.server = server
+        self.conn = conn
+
+    def send(self, text):
+        self.server.send(self.conn, text)
+
+    def close(self):
+        self.server._close(self.conn)
+
+    def mark(self):
+        # Answer a timing mark, after the replies already queued
+        self.server.send(self.conn, TIMING_MARK_REPLY)
+
+
 class MudServer:
-    def __init__(self, host='0.0.0.0', port=4000):
+    """Asyncio telnet front end for a GameCore.
+
+    One coroutine per connection reads complete lines through a buffered
+    reader, so partial and pipelined input are framed correctly. Output goes
+    through a bounded per-connection queue drained by a writer task that
+    awaits the socket. While a client's queue is past the high-water mark
+    the server stops reading its input; if the queue fills anyway (others'
+    messages keep arriving) the client is dropped. Everything runs on one
+    event loop thread, so `clients` needs no lock. A telnet timing mark
+    (IAC DO TM) on a line is answered once that line's replies are queued,
+    so a client can tell its reply from other output.
+
+    The core is either in-process (`core`, or a new one around `world`) or
+    a world process reached through a GatewayClient (`gateway`), in which
+    case this process is only a protocol edge and holds no world.
+    """
+
+    def __init__(self, host='0.0.0.0', port=4000, world=None, idle_timeout=900.0,
+                 max_line=1024, max_queue=64, shutdown_grace=5.0, core=None, gateway=None,
+                 metrics_port=None, slow_command_ms=50.0):
         self.host = host
         self.port = port
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.gateway = gateway
+        if gateway is not None:
+            self.core = None
+        else:
+            self.core = core if core is not None else GameCore(world if world is not None else World())
+        self.world = self.core.world if self.core is not None else None
+        self.frontend = Frontend('telnet')
+        self.idle_timeout = idle_timeout
+        self.max_line = max_line
+        self.max_queue = max_queue
+        self.high_water = max(1, max_queue // 2)
+        self.shutdown_grace = shutdown_grace
         self.clients = {}
-        self.world = World()
+        self._ids = itertools.count(1)
+        # Optional plain-HTTP /metrics listener (Prometheus text format)
+        self.metrics_port = metrics_port
+        self.slow_commands = SlowCommandLog(slow_command_ms)
+        self._metrics_server = None
+        self._server = None
+        self._stopping = None
+        self.stats = {
+            'accepted': 0,
+            'lines': 0,
+            'idle_timeouts': 0,
+            'slow_disconnects': 0,
+            'oversized_lines': 0,
+        }
+        for key, counter in TELNET_COUNTERS.items():
+            counter.set_function(lambda key=key: self.stats[key])
+        TELNET_CONNECTIONS.set_function(lambda: len(self.clients))
 
     def start(self):
-        self.server_socket.bind((self.host, self.port))
-        self.server_socket.listen()
+        # Blocking entry point: serve until SIGINT/SIGTERM, then shut down cleanly
+        _raise_fd_limit()
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._stopping.set)
+            except (NotImplementedError, RuntimeError):
+                # Not available on Windows or off the main thread
+                pass
+        if self.gateway is not None:
+            await self.gateway.connect()
+        self._server = await asyncio.start_server(
+            self._handle_client, self.host, self.port, limit=self.max_line, backlog=1024,
+        )
         print(f"MUD server started on {self.host}:{self.port}")
+        if self.metrics_port is not None:
+            self._metrics_server = await asyncio.start_server(self._serve_metrics, self.host, self.metrics_port)
+            print(f"Metrics on http://{self.host}:{self.metrics_port}/metrics")
+        # A standalone world resolves its own fights; an edge leaves that to the world process
+        combat_task = asyncio.create_task(self._combat_loop()) if self.core is not None else None
+        try:
+            await self._stopping.wait()
+        finally:
+            if combat_task is not None:
+                combat_task.cancel()
+                await asyncio.gather(combat_task, return_exceptions=True)
+            await self.shutdown()
+
+    async def _combat_loop(self):
+        combat = self.world.combat
+        while True:
+            await asyncio.sleep(combat.round_seconds)
+            combat.tick()
+
+    def stop(self):
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def shutdown(self):
+        # Stop accepting, say goodbye, give queued output a moment to flush
+        server, self._server = self._server, None
+        if server is not None:
+            server.close()
+        if self._metrics_server is not None:
+            self._metrics_server.close()
+            self._metrics_server = None
+        conns = list(self.clients.values())
+        for conn in conns:
+            self.send(conn, "Server shutting down. Goodbye!")
+            self._close(conn)
+        tasks = [c.writer_task for c in conns if c.writer_task is not None]
+        if tasks:
+            await asyncio.wait(tasks, timeout=self.shutdown_grace)
+        for conn in conns:
+            self._close(conn, drain=False)
+            await self._detach(conn)
+        # Let the reader loops see the closed sockets and finish
+        readers = [c.task for c in conns if c.task is not None]
+        if readers:
+            await asyncio.wait(readers, timeout=self.shutdown_grace)
+        if server is not None:
+            await server.wait_closed()
+        if self.gateway is not None:
+            await self.gateway.close()
+
+    def send(self, conn, text):
+        # Non-blocking send for messages the client didn't ask for (broadcasts)
+        if conn.closing:
+            return
+        try:
+            conn.queue.put_nowait(text)
+        except asyncio.QueueFull:
+            self.stats['slow_disconnects'] += 1
+            self._close(conn, drain=False)
+
+    async def reply(self, conn, text):
+        # Send a server notice to the client, waiting while its queue is full
+        if not conn.closing:
+            await conn.queue.put(text)
+
+    async def _handle_client(self, reader, writer):
+        addr = writer.get_extra_info('peername')
+        sid = next(self._ids)
+        player = Player(addr, self.world.start_room if self.world is not None else None)
+        player.username = player.name = f'Guest{sid}'
+        conn = Connection(reader, writer, player, self.max_queue)
+        conn.session = TelnetSession(self, conn, sid)
+        self.clients[writer] = conn
+        self.stats['accepted'] += 1
+        conn.task = asyncio.current_task()
+        conn.writer_task = asyncio.create_task(self._write_loop(conn))
+        try:
+            await self.reply(conn, f"Welcome to the MUD! You are {player.name}.")
+            if self.gateway is not None:
+                await self.gateway.attach(conn.session)
+            else:
+                self.core.attach(conn.session, self.frontend)
+            while not conn.closing:
+                # Backpressure: stop reading while this client's output piles up
+                while conn.queue.qsize() >= self.high_water and not conn.closing:
+                    conn.drained.clear()
+                    await conn.drained.wait()
+                got = await self._read_line(conn)
+                if got is None:
+                    break
+                line, mark = got
+                if not line and not mark:
+                    continue
+                if line:
+                    self.stats['lines'] += 1
+                if self.gateway is not None:
+                    # The world process answers the mark after the line
+                    await self.gateway.line(conn.session, line, mark=mark)
+                    continue
+                if line:
+                    trace = CommandTrace(line, player.username, player.current_room)
+                    self.core.command(conn.session, line, trace=trace)
+                    self.slow_commands.record(trace)
+                if mark:
+                    conn.session.mark()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            # Let queued output (e.g. the reply to 'quit') reach the client
+            # before the socket goes; a client that won't read it is cut off
+            self._close(conn)
+            done, _ = await asyncio.wait([conn.writer_task], timeout=self.shutdown_grace)
+            if not done:
+                self._close(conn, drain=False)
+                await asyncio.gather(conn.writer_task, return_exceptions=True)
+            await self._detach(conn)
+
+    async def _serve_metrics(self, reader, writer):
+        # Minimal HTTP/1.0 responder: GET /metrics, anything else is a 404
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 5.0)
+            parts = head.split(b' ', 2)
+            path = parts[1].split(b'?', 1)[0] if len(parts) > 1 else b''
+            if parts[0] == b'GET' and path == b'/metrics':
+                status, ctype, body = '200 OK', CONTENT_TYPE, REGISTRY.render().encode('utf-8')
+            else:
+                status, ctype, body = '404 Not Found', 'text/plain', b'Not found\n'
+            writer.write(
+                f'HTTP/1.0 {status}\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\n'
+                f'Connection: close\r\n\r\n'.encode('ascii') + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_line(self, conn):
+        # Next complete line as (text, timing mark requested); None on EOF,
+        # idle timeout or shutdown
         while True:
-            client_sock, addr = self.server_socket.accept()
-            player = Player(addr, self.world.start_room)
-            self.clients[client_sock] = player
-            threading.Thread(target=self.handle_client, args=(client_sock,)).start()
-
-    def handle_client(self, client_sock):
-        player = self.clients[client_sock]
-        client_sock.sendall(b"Welcome to the MUD!\n")
+            try:
+                raw = await asyncio.wait_for(conn.reader.readuntil(b'\n'), self.idle_timeout)
+            except asyncio.TimeoutError:
+                self.stats['idle_timeouts'] += 1
+                await self.reply(conn, "Idle timeout. Goodbye!")
+                return None
+            except asyncio.IncompleteReadError as e:
+                # EOF; a final unterminated line still counts
+                if not e.partial.strip():
+                    return None
+                raw = e.partial
+            except asyncio.LimitOverrunError as e:
+                # Discard the oversized line up to and including its newline
+                self.stats['oversized_lines'] += 1
+                if not await self._discard_line(conn, e.consumed):
+                    return None
+                await self.reply(conn, f"Line too long (max {self.max_line} bytes).")
+                continue
+            return strip_telnet(raw).decode('utf-8', 'replace').strip(), TIMING_MARK_REQUEST in raw
+
+    async def _discard_line(self, conn, consumed):
+        reader = conn.reader
         while True:
+            await reader.read(max(1, consumed))
             try:
-                data = client_sock.recv(1024)
-                if not data:
+                await reader.readuntil(b'\n')
+                return True
+            except asyncio.LimitOverrunError as e:
+                consumed = e.consumed
+            except asyncio.IncompleteReadError:
+                return False
+
+    async def _write_loop(self, conn):
+        writer = conn.writer
+        queue = conn.queue
+        try:
+            while True:
+                text = await queue.get()
+                if text is None:
                     break
-                command = data.decode().strip()
-                response = handle_command(command, player, self.world)
-                client_sock.sendall((response + '\n').encode())
-            except Exception as e:
-                print(f"Error: {e}")
-                break
-        client_sock.close()
-        del self.clients[client_sock]
+                writer.write(_encode_line(text))
+                # Coalesce whatever else is already queued into one drain
+                while not queue.empty():
+                    text = queue.get_nowait()
+                    if text is None:
+                        await writer.drain()
+                        return
+                    writer.write(_encode_line(text))
+                await writer.drain()
+                conn.drained.set()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    def _close(self, conn, drain=True):
+        # Ask the writer to finish once the queue is sent; calling it again
+        # while that is under way does nothing. drain=False (or a full queue)
+        # abandons queued output and drops the connection at once.
+        if drain:
+            if conn.closing:
+                return
+            conn.closing = True
+            try:
+                conn.queue.put_nowait(None)
+                return
+            except asyncio.QueueFull:
+                pass
+        conn.closing = True
+        conn.writer.transport.abort()
+        if conn.writer_task is not None:
+            conn.writer_task.cancel()
+        # Wake a reply() blocked on the full queue so the reader loop can exit
+        while not conn.queue.empty():
+            conn.queue.get_nowait()
+        conn.drained.set()
+
+    async def _detach(self, conn):
+        if self.clients.pop(conn.writer, None) is None:
+            return
+        if self.gateway is not None:
+            await self.gateway.detach(conn.session)
+        else:
+            self.core.detach(conn.session)
+
+
+def _raise_fd_limit():
+    # Each client is a file descriptor; lift the soft limit to the hard limit
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
@@ -0,0 +1,58 @@
+import copy
+import threading
+
+
+class PlayerStateTracker:
+    """Remembers the last player_info payload sent to each session id.
+
+    Instead of pushing the full snapshot every tick, callers ask the tracker
+    for the message to send: the first payload for a sid (or after forget())
+    goes out as a full 'player_info', later ones as a 'player_info_delta'
+    carrying only the fields that changed, tagged with a version number so
+    the client can detect a gap and ask for a resync.
+    """
+
+    def __init__(self):
+        self._sent = {}  # sid -> {'version': int, 'fields': dict}
+        self._lock = threading.Lock()
+
+    def full(self, sid, payload):
+        # Always produce a full snapshot (e.g. a resync request); it gets the
+        # next version, so deltas carry on from it
+        with self._lock:
+            return self._full_locked(sid, payload)
+
+    def diff(self, sid, payload):
+        # Return (event, data) to emit, or None if nothing changed
+        with self._lock:
+            state = self._sent.get(sid)
+            if state is None:
+                return self._full_locked(sid, payload)
+            fields = state['fields']
+            changes = {}
+            for key, value in payload.items():
+                if key not in fields or fields[key] != value:
+                    changes[key] = value
+            if not changes:
+                return None
+            for key, value in changes.items():
+                fields[key] = copy.deepcopy(value)
+            state['version'] += 1
+            version = state['version']
+        return 'player_info_delta', {'version': version, 'base': version - 1, 'changes': changes}
+
+    def _full_locked(self, sid, payload):
+        # full() with the lock already held. Versions keep counting up
+        # across snapshots, so a client never sees one go backwards.
+        state = self._sent.get(sid)
+        version = (state['version'] + 1) if state else 1
+        self._sent[sid] = {'version': version, 'fields': copy.deepcopy(payload)}
+        data = dict(payload)
+        data['version'] = version
+        return 'player_info', data
+
+    def forget(self, sid):
+        # Drop what the client has (disconnect); a later diff() for the sid
+        # becomes a full snapshot
+        with self._lock:
+            self._sent.pop(sid, None)
@@ -1,9 +1,21 @@
-import socket
-import threading
+import os
+from networking.gateway import GatewayClient, parse_address
 from networking.server import MudServer
 
 def main():
-    server = MudServer(host='0.0.0.0', port=4000)
+    # With GAME_GATEWAY set this process is only a telnet edge for the world
+    # process (webui.py with GATEWAY_LISTEN); otherwise it runs its own world
+    gateway = None
+    if os.getenv('GAME_GATEWAY'):
+        gateway = GatewayClient(*parse_address(os.getenv('GAME_GATEWAY')))
+    server = MudServer(
+        host=os.getenv('TELNET_HOST', '0.0.0.0'),
+        port=int(os.getenv('TELNET_PORT', '4000')),
+        idle_timeout=float(os.getenv('TELNET_IDLE_TIMEOUT', '900')),
+        gateway=gateway,
+        metrics_port=int(os.environ['TELNET_METRICS_PORT']) if os.getenv('TELNET_METRICS_PORT') else None,
+        slow_command_ms=float(os.getenv('TELNET_SLOW_COMMAND_MS', '50')),
+    )
     server.start()
 
 if __name__ == "__main__":
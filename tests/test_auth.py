@@ -0,0 +1,31 @@
+from werkzeug.security import generate_password_hash
+
+from game.auth import PasswordHasher, RateLimiter
+
+
+def test_check_accepts_only_the_right_password():
+    passwords = PasswordHasher()
+    pwhash = generate_password_hash('hunter2')
+    assert passwords.check(pwhash, 'hunter2')
+    assert not passwords.check(pwhash, 'hunter3')
+
+
+def test_unknown_user_still_costs_a_check():
+    jobs = []
+    passwords = PasswordHasher(execute=lambda fn, *args: jobs.append(fn) or fn(*args))
+    assert passwords.check(None, 'hunter2') is False
+    assert len(jobs) == 1
+    # An empty password is refused without a job
+    assert passwords.check(None, '') is False
+    assert len(jobs) == 1
+
+
+def test_rate_limiter_refills_over_the_window():
+    now = [0.0]
+    limiter = RateLimiter(limit=2, window=10, clock=lambda: now[0])
+    assert limiter.hit('1.2.3.4') == 0
+    assert limiter.hit('1.2.3.4') == 0
+    assert limiter.hit('1.2.3.4') > 0
+    assert limiter.hit('5.6.7.8') == 0
+    now[0] = 5.0
+    assert limiter.hit('1.2.3.4') == 0
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from game.player import Player
+from game.session import Frontend, GameCore, Session
+from game.world import World
+
+
+@pytest.fixture
+def world(tmp_path):
+    random.seed(1234)
+    world = World(cache_dir=str(tmp_path))
+    world.mobs_by_room = {world.start_room: {'Street Punk': 2}}
+    world.combat.notify = lambda player, text, events: player.messages.append(text)
+    return world
+
+
+class _Player(Player):
+    __slots__ = ('messages',)
+
+
+def _player(world, name='Vex'):
+    player = _Player(('127.0.0.1', 0), world.start_room)
+    player.name = player.username = name
+    player.messages = []
+    return player
+
+
+def test_round_resolves_on_tick(world):
+    player = _player(world)
+    enc = world.combat.engage(player, 'Street Punk', from_world=True)
+    assert world.mob_counts(world.start_room) == {'Street Punk': 1}
+    assert enc.round == 0 and player.messages == []
+    world.combat.tick()
+    assert enc.round == 1
+    assert 'Street Punk' in player.messages[0]
+
+
+def test_beaten_mob_ends_the_fight(world):
+    player = _player(world)
+    world.combat.engage(player, 'Street Punk', hp=1, from_world=True)
+    world.combat.tick()
+    assert player.fight is None
+    assert player.last_defeated == 'Street Punk'
+    assert player.xp > 0
+    assert 'You win the fight!' in player.messages[-1]
+    assert world.combat.encounter_in(world.start_room) is None
+    # A dead mob doesn't go back to the streets
+    assert world.mob_counts(world.start_room) == {'Street Punk': 1}
+
+
+def test_surviving_mob_respawns_when_everyone_leaves(world):
+    player = _player(world)
+    world.combat.engage(player, 'Street Punk', hp=1000, from_world=True)
+    world.combat.tick()
+    world.combat.leave(player)
+    assert player.fight is None
+    assert world.combat.encounters == {}
+    assert world.mob_counts(world.start_room) == {'Street Punk': 2}
+
+
+def test_leave_keeps_the_fight_for_the_others(world):
+    first, second = _player(world, 'Vex'), _player(world, 'Nyx')
+    enc = world.combat.engage(first, 'Street Punk', hp=1000, from_world=True)
+    assert world.combat.join(second) is enc
+    world.combat.leave(first)
+    assert first.fight is None
+    assert [c.player for c in enc.players] == [second]
+    world.combat.tick()
+    assert enc.round == 1 and first.messages == []
+    assert second.messages
+
+
+class _Session(Session):
+    def send(self, text):
+        self.player.messages.append(text)
+
+
+def test_disconnect_leaves_the_fight(world):
+    core = GameCore(world)
+    player = _player(world)
+    session = _Session('sid', player)
+    core.attach(session, Frontend())
+    world.combat.engage(player, 'Street Punk', hp=1000, from_world=True)
+    core.detach(session)
+    assert player.fight is None
+    assert world.combat.encounter_in(world.start_room) is None
+    assert world.mob_counts(world.start_room) == {'Street Punk': 2}
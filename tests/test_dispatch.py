@@ -0,0 +1,65 @@
+from game.commands import commands
+from game.dispatch import CommandRegistry
+
+
+def _registry(*names):
+    registry = CommandRegistry()
+    for name in names:
+        registry.register(name, lambda: name)
+    return registry
+
+
+def test_unique_prefix_resolves():
+    registry = _registry('look', 'equip', 'shop')
+    assert registry.resolve('sh').name == 'shop'
+    assert registry.resolve('e').name == 'equip'
+    assert registry.resolve('shop').name == 'shop'
+    assert registry.resolve('shopping') is None
+    assert registry.resolve('x') is None
+
+
+def test_ambiguous_prefix_goes_to_the_earlier_command():
+    registry = _registry('search', 'shop', 'spawn')
+    assert registry.resolve('s').name == 'search'
+    assert registry.resolve('sh').name == 'shop'
+    assert registry.resolve('sp').name == 'spawn'
+
+
+def test_full_name_beats_an_earlier_command_it_prefixes():
+    registry = _registry('goto', 'go')
+    assert registry.resolve('go').name == 'go'
+    assert registry.resolve('got').name == 'goto'
+
+
+def test_aliases_match_exactly_and_beat_prefixes():
+    registry = CommandRegistry()
+    registry.register('drop', None)
+    registry.register('down', None, aliases=('d',))
+    assert registry.resolve('d').name == 'down'
+    assert registry.resolve('do').name == 'down'
+    assert registry.resolve('dr').name == 'drop'
+    # Aliases are not abbreviated
+    registry.register('inventory', None, aliases=('inv',))
+    assert registry.resolve('in').name == 'inventory'
+    assert registry.resolve('iv') is None
+
+
+def test_first_registration_keeps_a_contested_word():
+    registry = CommandRegistry()
+    registry.register('look', None, aliases=('l',))
+    registry.register('l', None)
+    assert registry.resolve('l').name == 'look'
+
+
+def test_parse_splits_verb_and_args():
+    cmd, verb, args = _registry('take').parse('  TA  2 Stimpack ')
+    assert (cmd.name, verb, args) == ('take', 'ta', '2 Stimpack')
+    assert _registry('take').parse('   ') == (None, '', '')
+
+
+def test_game_verb_table():
+    resolved = {verb: commands.resolve(verb).name for verb in ('l', 'n', 'd', 'get', 'se', 'sh', 'dr', 'eq', 'un')}
+    assert resolved == {
+        'l': 'look', 'n': 'north', 'd': 'down', 'get': 'take', 'se': 'search',
+        'sh': 'shop', 'dr': 'drop', 'eq': 'equip', 'un': 'unequip',
+    }
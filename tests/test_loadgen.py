@@ -0,0 +1,44 @@
+import argparse
+import os
+import sys
+import tempfile
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'bench'))
+
+import loadgen  # noqa: E402
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def _post(opener, url, data):
+    try:
+        with opener.open(url, urllib.parse.urlencode(data).encode()) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_spawned_web_server_accepts_more_logins_than_the_rate_limit():
+    # Every bot logs in from 127.0.0.1; more of them than the default auth
+    # rate limit (10 a minute) must still get in, and so must admin_stats
+    clients = 15
+    args = argparse.Namespace(target='web', prefix='bench', clients=clients, password='benchpass')
+    with tempfile.TemporaryDirectory() as tmp:
+        proc, port = loadgen.spawn_server(args, tmp)
+        try:
+            url = f'http://127.0.0.1:{port}'
+            opener = urllib.request.build_opener(_NoRedirect)
+            statuses = [_post(opener, f'{url}/login', {'username': f'bench{i}', 'password': 'benchpass'})
+                        for i in range(clients)]
+            assert statuses == [302] * clients
+            assert _post(opener, f'{url}/admin_login', {'username': 'admin', 'password': 'adminpass'}) == 302
+        finally:
+            proc.kill()
+            proc.wait()
@@ -0,0 +1,22 @@
+import json
+
+from game.dispatch import CommandRegistry
+from game.metrics import LATENCY_BUCKETS, Histogram
+
+
+def test_quantile_past_the_top_bucket_is_the_top_bound():
+    h = Histogram()
+    h.observe(0.001)
+    h.observe(LATENCY_BUCKETS[-1] * 3)
+    assert h.quantile(0.99) == LATENCY_BUCKETS[-1]
+    assert h.quantile(0.5) == 0.001
+
+
+def test_command_timings_stay_valid_json_after_an_over_range_command():
+    registry = CommandRegistry()
+    cmd = registry.register('slowpoke', lambda *args, **kwargs: None)
+    cmd.latency.observe(LATENCY_BUCKETS[-1] + 5.0)
+    timings = registry.timings()
+    # Strict JSON: no Infinity/NaN
+    encoded = json.dumps(timings, allow_nan=False)
+    assert json.loads(encoded)['slowpoke']['p99_ms'] == LATENCY_BUCKETS[-1] * 1000.0
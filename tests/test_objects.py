@@ -0,0 +1,72 @@
+from game.objects import ID_BLOCK, ItemStore, ObjectStore
+from game.player import Player
+
+
+def test_processes_sharing_a_file_keep_each_others_stacks(tmp_path):
+    path = str(tmp_path / 'items.db')
+    first, second = ObjectStore(ItemStore(path)), ObjectStore(ItemStore(path))
+    first.place('plaza', 'Stimpack', 2)
+    first.flush()
+    second.place('plaza', 'Cyberdeck')
+    second.flush()
+    # first never saw the Cyberdeck; rewriting the room must not drop it
+    first.place('plaza', 'Stimpack')
+    first.flush()
+    assert sorted((row[2], row[3]) for row in ItemStore(path).load_all()) == [('Cyberdeck', 1), ('Stimpack', 3)]
+
+
+def test_take_and_drop_move_items_between_ground_and_inventory():
+    ground = ObjectStore()
+    player = Player(('127.0.0.1', 0), 'plaza')
+    stack = ground.place('plaza', 'Stimpack', 3)
+    assert ground.take('plaza', 'stimpack', player.inventory, 2) == ('Stimpack', 2)
+    assert stack.count == 1 and ground.items_in('plaza') == {'Stimpack': 1}
+    # Asking for more than is there takes what's left and removes the stack
+    assert ground.take('plaza', 'Stimpack', player.inventory, 5) == ('Stimpack', 1)
+    assert ground.items_in('plaza') == {} and ground.get(stack.id) is None
+    assert ground.take('plaza', 'Stimpack', player.inventory) == (None, 0)
+    have = player.inventory.count('Stimpack')
+    assert ground.drop('alley', 'STIMPACK', player.inventory, 2) == 'Stimpack'
+    assert player.inventory.count('Stimpack') == have - 2
+    assert ground.items_in('alley') == {'Stimpack': 2}
+    assert ground.drop('alley', 'Plasma Rifle', player.inventory) is None
+
+
+def test_drops_join_the_stack_already_there():
+    ground = ObjectStore()
+    first = ground.place('plaza', 'Stimpack')
+    second = ground.place('plaza', 'stimpack', 2)
+    assert second is first and first.count == 3
+    other = ground.place('alley', 'Stimpack')
+    assert other.id != first.id
+    assert ground.place('plaza', 'Stimpack', 0) is None
+
+
+def test_ground_items_survive_a_reload(tmp_path):
+    path = str(tmp_path / 'items.db')
+    ground = ObjectStore(ItemStore(path))
+    stack = ground.place('plaza', 'Stimpack', 2)
+    ground.place('alley', 'Cyberdeck')
+    ground.take('alley', 'Cyberdeck', Player(('127.0.0.1', 0), 'alley').inventory)
+    assert ground.flush() == 2
+    assert ground.flush() == 0
+    reloaded = ObjectStore(ItemStore(path))
+    assert reloaded.load() == 1
+    assert reloaded.items_in('plaza') == {'Stimpack': 2}
+    assert reloaded.get(stack.id).name == 'Stimpack'
+    # New stacks after a restart don't reuse ids
+    assert reloaded.place('alley', 'Cyberdeck').id > stack.id
+
+
+def test_reserve_ids_hands_out_disjoint_blocks(tmp_path):
+    path = str(tmp_path / 'items.db')
+    first, second = ItemStore(path), ItemStore(path)
+    a = first.reserve_ids(ID_BLOCK)
+    b = second.reserve_ids(ID_BLOCK)
+    c = first.reserve_ids(10)
+    assert (b - a, c - b) == (ID_BLOCK, ID_BLOCK)
+    ground = ObjectStore(first)
+    ids = [ground.place('plaza', f'Item {n}').id for n in range(ID_BLOCK + 1)]
+    # A full block is used before the next is claimed
+    assert ids[:ID_BLOCK] == list(range(c + 10, c + 10 + ID_BLOCK))
+    assert ids[-1] == c + 10 + ID_BLOCK
@@ -0,0 +1,110 @@
+import email
+import time
+
+from game.outbox import FileTransport, MailSender, Outbox, PermanentMailError
+
+
+class FlakyTransport:
+    """Fails the first `failures` sends with `error`, then records messages."""
+
+    def __init__(self, failures=0, error=OSError('connection refused')):
+        self.failures = failures
+        self.error = error
+        self.sent = []
+
+    def send(self, message):
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        self.sent.append(message)
+
+    def idle(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _sender(outbox, transport, **options):
+    return MailSender(outbox, transport, 'mud@example.com', **options)
+
+
+def test_backoff_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr('game.outbox.random.uniform', lambda low, high: 1.0)
+    sender = _sender(None, None, backoff_seconds=30, max_backoff_seconds=200)
+    assert [sender.backoff(n) for n in (1, 2, 3, 4)] == [30, 60, 120, 200]
+
+
+def test_transient_failure_is_retried_later(tmp_path):
+    outbox = Outbox(str(tmp_path / 'outbox.db'))
+    outbox.enqueue('Hi', ['a@example.com'], 'body')
+    transport = FlakyTransport(failures=1)
+    sender = _sender(outbox, transport, backoff_seconds=30)
+    assert sender.run_once() == 0
+    # Not due again until the backoff has passed
+    assert outbox.due() == []
+    later = outbox.due(now=time.time() + 60)
+    assert [m['attempts'] for m in later] == [1]
+    assert outbox.stats() == {'pending': 0, 'sending': 1, 'dead': 0}
+
+
+def test_gives_up_after_max_attempts(tmp_path):
+    outbox = Outbox(str(tmp_path / 'outbox.db'))
+    outbox.enqueue('Hi', ['a@example.com'], 'body')
+    sender = _sender(outbox, FlakyTransport(failures=10), backoff_seconds=0, max_attempts=3)
+    for _ in range(3):
+        sender.run_once()
+    assert outbox.stats() == {'pending': 0, 'sending': 0, 'dead': 1}
+    assert outbox.due(now=time.time() + 3600) == []
+
+
+def test_permanent_error_goes_straight_to_dead(tmp_path):
+    outbox = Outbox(str(tmp_path / 'outbox.db'))
+    outbox.enqueue('Hi', ['a@example.com'], 'body')
+    _sender(outbox, FlakyTransport(failures=1, error=PermanentMailError('550 no such user'))).run_once()
+    assert outbox.stats()['dead'] == 1
+
+
+def test_file_transport_writes_eml(tmp_path):
+    outbox = Outbox(str(tmp_path / 'outbox.db'))
+    outbox.enqueue('Verify', ['a@example.com', 'b@example.com'], 'Click the link.')
+    directory = tmp_path / 'mail'
+    assert _sender(outbox, FileTransport(str(directory))).run_once() == 1
+    files = list(directory.glob('*.eml'))
+    assert len(files) == 1
+    message = email.message_from_bytes(files[0].read_bytes())
+    assert message['To'] == 'a@example.com, b@example.com'
+    assert message['Subject'] == 'Verify'
+    assert message.get_payload(decode=True).decode().strip() == 'Click the link.'
+    assert outbox.pending() == 0
+
+
+def test_each_message_is_claimed_by_one_outbox(tmp_path):
+    path = str(tmp_path / 'outbox.db')
+    first, second = Outbox(path), Outbox(path)
+    for n in range(5):
+        first.enqueue(f'm{n}', ['a@example.com'], 'body')
+    mine = first.due(limit=3)
+    theirs = second.due()
+    assert len(mine) == 3 and len(theirs) == 2
+    assert not {m['id'] for m in mine} & {m['id'] for m in theirs}
+    assert second.due() == []
+
+
+def test_expired_claim_is_picked_up_again(tmp_path):
+    path = str(tmp_path / 'outbox.db')
+    crashed, other = Outbox(path, lease_seconds=10), Outbox(path)
+    crashed.enqueue('Hi', ['a@example.com'], 'body')
+    assert len(crashed.due()) == 1
+    assert other.due() == []
+    assert len(other.due(now=time.time() + 11)) == 1
+
+
+def test_stopped_sender_releases_its_claims(tmp_path):
+    outbox = Outbox(str(tmp_path / 'outbox.db'))
+    for n in range(3):
+        outbox.enqueue(f'm{n}', ['a@example.com'], 'body')
+    sender = _sender(outbox, FlakyTransport())
+    sender.stop()
+    assert sender.run_once() == 0
+    assert len(outbox.due()) == 3
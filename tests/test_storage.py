@@ -0,0 +1,16 @@
+import sqlite3
+
+import pytest
+
+from game.storage import AccountStore
+
+
+def test_store_refuses_a_newer_schema_version(tmp_path):
+    path = str(tmp_path / 'accounts.db')
+    AccountStore(path).close()
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE meta SET value = ? WHERE key = 'schema_version'", (str(AccountStore.SCHEMA_VERSION + 1),))
+    conn.commit()
+    conn.close()
+    with pytest.raises(ValueError, match='schema version'):
+        AccountStore(path)
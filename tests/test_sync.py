@@ -0,0 +1,51 @@
+from networking.sync import PlayerStateTracker
+
+
+def test_first_payload_is_full_then_deltas():
+    tracker = PlayerStateTracker()
+    event, data = tracker.diff('sid', {'hp': 10, 'room': 'plaza'})
+    assert event == 'player_info'
+    assert data == {'hp': 10, 'room': 'plaza', 'version': 1}
+    event, data = tracker.diff('sid', {'hp': 7, 'room': 'plaza'})
+    assert event == 'player_info_delta'
+    assert data == {'version': 2, 'base': 1, 'changes': {'hp': 7}}
+
+
+def test_unchanged_payload_emits_nothing():
+    tracker = PlayerStateTracker()
+    payload = {'hp': 10, 'inventory': {'Stimpack': 1}}
+    tracker.diff('sid', payload)
+    assert tracker.diff('sid', {'hp': 10, 'inventory': {'Stimpack': 1}}) is None
+
+
+def test_nested_values_are_compared_against_a_copy():
+    tracker = PlayerStateTracker()
+    inventory = {'Stimpack': 1}
+    tracker.diff('sid', {'inventory': inventory})
+    # Changing the caller's dict in place must still show up as a change
+    inventory['Stimpack'] = 2
+    event, data = tracker.diff('sid', {'inventory': inventory})
+    assert event == 'player_info_delta'
+    assert data['changes'] == {'inventory': {'Stimpack': 2}}
+
+
+def test_full_snapshot_keeps_counting_versions():
+    tracker = PlayerStateTracker()
+    tracker.diff('sid', {'hp': 10})
+    tracker.diff('sid', {'hp': 9})
+    event, data = tracker.full('sid', {'hp': 9})
+    assert (event, data['version']) == ('player_info', 3)
+    event, data = tracker.diff('sid', {'hp': 8})
+    assert (data['base'], data['version']) == (3, 4)
+
+
+def test_forget_makes_the_next_payload_full():
+    tracker = PlayerStateTracker()
+    tracker.diff('sid', {'hp': 10})
+    tracker.forget('sid')
+    event, data = tracker.diff('sid', {'hp': 10})
+    assert (event, data['version']) == ('player_info', 1)
+    # Other sessions are untouched
+    tracker.diff('other', {'hp': 5})
+    tracker.forget('sid')
+    assert tracker.diff('other', {'hp': 5}) is None
@@ -0,0 +1,175 @@
+import asyncio
+
+from game.session import GameCore
+from game.world import World
+from networking.server import TIMING_MARK_REPLY, TIMING_MARK_REQUEST, MudServer
+
+
+async def _start(tmp_path, **options):
+    # A MudServer on an ephemeral localhost port; returns (server, task, port)
+    server = MudServer(host='127.0.0.1', port=0, core=GameCore(World(cache_dir=str(tmp_path))), **options)
+    task = asyncio.create_task(server.serve())
+    while server._server is None:
+        await asyncio.sleep(0.01)
+    port = server._server.sockets[0].getsockname()[1]
+    return server, task, port
+
+
+async def _stop(server, task):
+    server.stop()
+    await asyncio.wait_for(task, 10)
+
+
+def test_quit_reply_arrives_before_eof(tmp_path):
+    async def run():
+        server, task, port = await _start(tmp_path)
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            assert b'Welcome' in await asyncio.wait_for(reader.readline(), 5)
+            writer.write(b'quit\r\n')
+            await writer.drain()
+            rest = await asyncio.wait_for(reader.read(), 5)
+            assert b'Goodbye!\r\n' in rest
+            # ...and then the server closed the connection
+            assert await reader.read() == b''
+            writer.close()
+        finally:
+            await _stop(server, task)
+
+    asyncio.run(run())
+
+
+class _FakeWriter:
+    """Stands in for a StreamWriter; drain() blocks until `gate` is set."""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.data = bytearray()
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.closed = False
+        self.aborted = False
+        self.transport = self
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        await self.gate.wait()
+
+    def close(self):
+        self.closed = True
+
+    def abort(self):
+        # Like a real transport: the connection is lost, so the reader sees EOF
+        self.aborted = True
+        self.reader.feed_eof()
+
+    def get_extra_info(self, name):
+        return ('127.0.0.1', 40000) if name == 'peername' else None
+
+
+def _fake_client(tmp_path, **options):
+    # A MudServer whose core records input lines instead of running them,
+    # plus a fed StreamReader and fake writer for one client
+    server = MudServer(core=GameCore(World(cache_dir=str(tmp_path))), **options)
+    lines = []
+    server.core.command = lambda session, line, trace=None: lines.append(line)
+    reader = asyncio.StreamReader(limit=server.max_line)
+    writer = _FakeWriter(reader)
+    return server, reader, writer, lines
+
+
+async def _settle():
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+def test_lines_are_framed_across_reads(tmp_path):
+    async def run():
+        server, reader, writer, lines = _fake_client(tmp_path, max_line=64)
+        task = asyncio.create_task(server._handle_client(reader, writer))
+        reader.feed_data(b'lo')
+        await _settle()
+        assert lines == []
+        reader.feed_data(b'ok\r\nsay hi\r\n\r\n\xff\xfb\x01north\r\n')
+        reader.feed_data(b'x' * 100 + b'\r\ninv')
+        reader.feed_eof()
+        await asyncio.wait_for(task, 5)
+        assert lines == ['look', 'say hi', 'north', 'inv']
+        assert server.stats['oversized_lines'] == 1
+        assert b'Line too long' in writer.data
+        assert writer.closed and not server.clients
+
+    asyncio.run(run())
+
+
+def test_reading_pauses_at_high_water(tmp_path):
+    async def run():
+        server, reader, writer, lines = _fake_client(tmp_path, max_queue=8)
+        task = asyncio.create_task(server._handle_client(reader, writer))
+        await _settle()
+        conn = next(iter(server.clients.values()))
+        # The client stops reading: the writer is stuck in drain()
+        writer.gate.clear()
+        server.send(conn, 'first')
+        await _settle()
+        for n in range(server.high_water):
+            server.send(conn, f'broadcast {n}')
+        reader.feed_data(b'look\r\n')
+        await _settle()
+        assert lines == ['look']
+        # Past the high-water mark the next line waits in the socket buffer
+        reader.feed_data(b'north\r\n')
+        await _settle()
+        assert lines == ['look']
+        writer.gate.set()
+        await _settle()
+        assert lines == ['look', 'north']
+        assert b'broadcast 3' in writer.data
+        reader.feed_eof()
+        await asyncio.wait_for(task, 5)
+
+    asyncio.run(run())
+
+
+def test_client_that_stops_reading_is_dropped(tmp_path):
+    async def run():
+        server, reader, writer, lines = _fake_client(tmp_path, max_queue=4)
+        task = asyncio.create_task(server._handle_client(reader, writer))
+        await _settle()
+        conn = next(iter(server.clients.values()))
+        writer.gate.clear()
+        server.send(conn, 'first')
+        await _settle()
+        for n in range(server.max_queue + 1):
+            server.send(conn, f'broadcast {n}')
+        assert server.stats['slow_disconnects'] == 1
+        assert writer.aborted
+        # The dropped connection ends the reader loop and detaches the player
+        await asyncio.wait_for(task, 5)
+        assert not server.clients
+
+    asyncio.run(run())
+
+
+def test_timing_mark_follows_the_reply(tmp_path):
+    async def run():
+        server, task, port = await _start(tmp_path)
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            await asyncio.wait_for(reader.readline(), 5)
+            writer.write(b'look' + TIMING_MARK_REQUEST + b'\r\n')
+            await writer.drain()
+            reply = await asyncio.wait_for(reader.readuntil(TIMING_MARK_REPLY), 5)
+            assert b'Exits:' in reply and reply.endswith(b'\r\n' + TIMING_MARK_REPLY)
+            # A bare mark is answered too, without running anything
+            writer.write(TIMING_MARK_REQUEST + b'\r\n')
+            await writer.drain()
+            assert await asyncio.wait_for(reader.readexactly(3), 5) == TIMING_MARK_REPLY
+            assert server.stats['lines'] == 1
+            writer.close()
+        finally:
+            await _stop(server, task)
+
+    asyncio.run(run())
@@ -1,24 +1,45 @@
 from game.races_classes import RACES, CLASSES
 
 from flask import Flask, render_template, session, request, redirect, url_for
-from flask_socketio import SocketIO, emit, join_room, leave_room
-from flask_mail import Mail, Message
-import threading
+from flask_socketio import SocketIO, emit
 from game.player import Player
 from game.world import World
-from game.commands import handle_command
+from game.auth import AuthBusy, PasswordHasher, RateLimiter
+from game.commands import commands as command_registry
+from game.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY as metrics
+from game.objects import ItemStore
+from game.outbox import FileTransport, MailSender, Outbox, SMTPTransport
+from game.profiler import CommandTrace, SamplingProfiler, SlowCommandLog
+from game.session import Frontend, GameCore, Session
+from game.storage import AccountStore, SaveScheduler
+from game.ticker import TickEngine
+from networking.cluster import Cluster, world_tick
+from networking.gateway import GatewayServer, parse_address
+from networking.sync import PlayerStateTracker
+import atexit
 import json
+import hashlib
 import os
+import signal
+import time
 from dotenv import load_dotenv
-from werkzeug.security import generate_password_hash, check_password_hash
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.security import generate_password_hash
 
 
 load_dotenv()
 
 app = Flask(__name__, static_folder='web/static', template_folder='web/templates')
+# Behind TRUSTED_PROXIES reverse proxies, take the client address from the
+# X-Forwarded-For entry the client-facing one added. Entries further left
+# come from the client and can't be trusted.
+TRUSTED_PROXIES = int(os.getenv('TRUSTED_PROXIES', '0'))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'mud-secret-key')  # For session management
 
-# Flask-Mail configuration (loaded from environment if available)
+# Mail configuration (loaded from environment if available)
 app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.example.com')
 app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', '587'))
 app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', 'true').lower() in ('1', 'true', 'yes')
@@ -26,13 +47,41 @@ app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME', 'your_email@example.com
 app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD', 'your_email_password')
 app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', 'your_email@example.com')
 
-mail = Mail(app)
+# Outbound mail goes through a persistent queue (data/outbox.db) and a
+# background sender on its own OS thread, so a slow SMTP server never holds
+# up a request. Without MAIL_SERVER set (or with MAIL_BACKEND=file) messages
+# are written to MAIL_FILE_DIR as .eml files instead.
+try:
+    from eventlet import patcher as _patcher
+    _native_threading = _patcher.original('threading')
+    _native_time = _patcher.original('time')
+except ImportError:
+    import threading as _native_threading
+    _native_time = time
+outbox = Outbox(os.getenv('MAIL_QUEUE_DB', os.path.join('data', 'outbox.db')), threading_module=_native_threading)
+MAIL_BACKEND = os.getenv('MAIL_BACKEND', 'smtp' if os.getenv('MAIL_SERVER') else 'file')
+if MAIL_BACKEND == 'smtp':
+    mail_transport = SMTPTransport(
+        app.config['MAIL_SERVER'], app.config['MAIL_PORT'], use_tls=app.config['MAIL_USE_TLS'],
+        username=app.config['MAIL_USERNAME'], password=app.config['MAIL_PASSWORD']
+    )
+else:
+    mail_transport = FileTransport(os.getenv('MAIL_FILE_DIR', os.path.join('data', 'mail')))
+mail_sender = MailSender(outbox, mail_transport, app.config['MAIL_DEFAULT_SENDER'], sleep=_native_time.sleep)
+# Signed, expiring links for email verification and password resets
+url_tokens = URLSafeTimedSerializer(app.config['SECRET_KEY'])
+VERIFY_MAX_AGE = 7 * 24 * 3600
+RESET_MAX_AGE = 3600
+# Cluster mode: with REDIS_URL set, Socket.IO emits fan out through Redis and
+# the world simulation runs in one elected process (see networking/cluster.py)
+REDIS_URL = os.getenv('REDIS_URL')
 # Explicit async mode for Render (eventlet) and permissive CORS for external clients
 socketio = SocketIO(
     app,
     manage_session=False,
     async_mode='eventlet',
-    cors_allowed_origins='*'
+    cors_allowed_origins='*',
+    message_queue=os.getenv('SOCKETIO_MESSAGE_QUEUE', REDIS_URL)
 )
 
 # Test route to verify static file serving (must be after app is defined)
@@ -41,19 +90,73 @@ def test_cyberpunk_image():
     return '<img src="/static/cyberpunk_city.jpg" style="max-width:100%">'
 
 ACCOUNTS_FILE = os.path.join('data', 'accounts.json')
+# Accounts live in SQLite (WAL mode, one row per account); the legacy JSON
+# file is imported on first start
+ACCOUNTS_DB = os.getenv('ACCOUNTS_DB', os.path.join('data', 'accounts.db'))
+account_store = AccountStore(ACCOUNTS_DB, legacy_json=ACCOUNTS_FILE)
 
 def load_accounts():
-    if not os.path.exists(ACCOUNTS_FILE):
-        return {}
-    with open(ACCOUNTS_FILE, 'r') as f:
-        return json.load(f)
+    return account_store.load_all()
 
-def save_accounts(accounts):
-    with open(ACCOUNTS_FILE, 'w') as f:
-        json.dump(accounts, f)
+def save_accounts(accounts, usernames=None):
+    # Upsert only the named accounts; without names, write whatever changed
+    if usernames is None:
+        account_store.sync(accounts)
+    else:
+        account_store.save_many([(u, accounts[u]) for u in usernames if u in accounts])
 
 accounts = load_accounts()
 
+# Write-behind saves: commands only mark a player dirty; the scheduler
+# flushes all dirty accounts together every SAVE_INTERVAL seconds
+save_scheduler = SaveScheduler(
+    account_store,
+    lambda username: accounts.get(username),
+    interval=float(os.getenv('SAVE_INTERVAL', '5'))
+)
+
+def _sync_progression(username, player):
+    # Copy live progression from the Player into its account record
+    acc = accounts.get(username)
+    if acc is None or player is None:
+        return False
+    acc.update(player.to_record())
+    save_scheduler.mark_dirty(username)
+    return True
+
+def _flush_all_players():
+    # Final flush: pull every online player's state and write it out
+    for username, player in list(web_players.items()):
+        _sync_progression(username, player)
+    save_scheduler.flush()
+
+def _handle_sigterm(signum, frame):
+    try:
+        _flush_all_players()
+    finally:
+        if callable(_previous_sigterm):
+            _previous_sigterm(signum, frame)
+        elif _previous_sigterm != signal.SIG_IGN:
+            raise SystemExit(0)
+
+_previous_sigterm = signal.getsignal(signal.SIGTERM)
+try:
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+except ValueError:
+    # Not in the main thread (e.g., imported by a worker thread); rely on atexit
+    pass
+atexit.register(_flush_all_players)
+atexit.register(lambda: cluster.resign())
+atexit.register(mail_sender.stop)
+atexit.register(lambda: world.items.flush())
+
+def _refresh_account(username):
+    # Other workers may have changed this account; re-read its row in cluster mode
+    if cluster.distributed and username:
+        fresh = account_store.load(username)
+        if fresh is not None:
+            accounts[username] = fresh
+
 def get_user_info(username):
     info = accounts.get(username)
     if isinstance(info, str):
@@ -61,133 +164,261 @@ def get_user_info(username):
         return {'password': info, 'email': '', 'verified': False}
     return info
 
-# In-memory store for web players (keyed by session id)
+# In-memory store for web players (keyed by username)
 web_players = {}
+web_sessions = {}
 world = World()
+# Ground items persist in SQLite; only rooms that changed are rewritten
+world.items.store = ItemStore(os.getenv('ITEMS_DB', os.path.join('data', 'items.db')))
+world.items.load()
+# The live world every front end attaches to (web here, telnet edges via the gateway)
+core = GameCore(world)
+cluster = Cluster(REDIS_URL, role=os.getenv('GAME_ROLE', 'auto'))
+# Followers forward player-made mob changes to the leader
+world.mob_listener = cluster.push_mob_event
 # Global rule: client-side regen allowed when not in battle (no per-user toggle)
 regen_enabled = True
 
 def _is_in_fight(player):
-    return bool(getattr(player, 'fight_opponent', None)) and getattr(player, 'fight_hp', None) not in (None, 0)
+    return player.in_fight
+
+# The room graph never changes at runtime: serialize it once and version it
+# by content hash so clients can cache it instead of receiving it every tick
+WORLD_MAP_JSON = json.dumps({'rooms': world.rooms}, sort_keys=True, separators=(',', ':'))
+WORLD_MAP_HASH = hashlib.sha1(WORLD_MAP_JSON.encode('utf-8')).hexdigest()[:16]
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Prometheus text format; set METRICS_TOKEN to require a bearer token
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return 'Unauthorized', 401
+    return app.response_class(metrics.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/world_map.json')
+def world_map():
+    resp = app.response_class(WORLD_MAP_JSON, mimetype='application/json')
+    resp.set_etag(WORLD_MAP_HASH)
+    resp.cache_control.public = True
+    # Versioned URLs are immutable; unversioned ones revalidate via ETag
+    if request.args.get('v') == WORLD_MAP_HASH:
+        resp.cache_control.max_age = 31536000
+        resp.cache_control.immutable = True
+    else:
+        resp.cache_control.no_cache = True
+    return resp.make_conditional(request)
+
+def _room_channel(room_name):
+    # Socket.IO room that mirrors a game room, for one-emit room broadcasts
+    return f'room:{room_name}'
+
+# Hot-path metrics (children resolved once; see game/metrics.py)
+EMITS = metrics.counter('mud_socketio_emits_total', 'Socket.IO events emitted, by event', ('event',))
+_emits_message = EMITS.labels('message')
+_emits_room = EMITS.labels('message_room')
+COMMAND_EVENT_SECONDS = metrics.histogram('mud_web_command_event_duration_seconds',
+                                          'Full Socket.IO command handler time, including emits')
+
+
+class WebSession(Session):
+    """GameCore session for a Socket.IO client; text goes out as 'message' events."""
+
+    def send(self, text):
+        _emits_message.inc()
+        socketio.emit('message', {'data': text}, to=self.sid)
+
+    def signal(self, event):
+        # Visual cues: player_hit, player_crit, ...
+        EMITS.labels(event).inc()
+        socketio.emit(event, to=self.sid)
+
+
+class WebFrontend(Frontend):
+    # Game rooms map onto Socket.IO rooms, so a room broadcast is one emit
+    # (and reaches other processes through the message queue in cluster mode)
+    def join(self, session, room):
+        socketio.server.enter_room(session.sid, _room_channel(room), namespace='/')
+
+    def leave(self, session, room):
+        socketio.server.leave_room(session.sid, _room_channel(room), namespace='/')
+
+    def broadcast(self, core, room, text, exclude=None):
+        skip = exclude.sid if exclude is not None and exclude.frontend is self else None
+        _emits_room.inc()
+        socketio.emit('message', {'data': text}, to=_room_channel(room), skip_sid=skip)
+
+
+web_frontend = WebFrontend('web')
+
+def _combat_changed(player):
+    # Combat rounds change HP, XP and levels on the tick, outside any
+    # command: mark web players dirty so the save scheduler writes them.
+    # Gateway (telnet) players pick their own names, so skip anyone who
+    # isn't this account's live web player.
+    if player.username and web_players.get(player.username) is player:
+        _sync_progression(player.username, player)
+
+core.on_player_changed = _combat_changed
+# Optional local IPC endpoint for protocol edges (e.g. `GAME_GATEWAY=127.0.0.1:4001 python server.py`)
+GATEWAY_LISTEN = os.getenv('GATEWAY_LISTEN')
+gateway = None
+if GATEWAY_LISTEN:
+    try:
+        from eventlet.green import socket as _gateway_socket
+        from eventlet.semaphore import Semaphore as _gateway_lock
+    except ImportError:
+        import socket as _gateway_socket
+        from threading import Lock as _gateway_lock
+    _gateway_host, _gateway_port = parse_address(GATEWAY_LISTEN)
+    gateway = GatewayServer(core, _gateway_host, _gateway_port,
+                            spawn=socketio.start_background_task, socket_module=_gateway_socket,
+                            lock_factory=_gateway_lock)
+
+# Last player_info sent to each socket, so updates only carry changed fields
+player_state = PlayerStateTracker()
+
+def _player_info(player):
+    # Build the full player_info payload for a player
+    # Derived stats and effects are cached (game/stats.py); this is a lookup
+    stats = player.stats.current()
+    return {
+        'name': player.name,
+        'race': player.race,
+        'char_class': player.char_class,
+        'level': player.level,
+        'xp': player.xp,
+        'xp_max': player.xp_max,
+        'credits': player.credits,
+        'inventory': player.inventory.to_list(),
+        'equipment': player.equipment.to_dict(),
+        'hp': player.hp,
+        'energy': player.energy,
+        'endurance': player.endurance,
+        'willpower': player.willpower,
+        'strength': stats['strength'],
+        'tech': stats['tech'],
+        'speed': stats['speed'],
+        'abilities': player.abilities,
+        'effects': player.stats.effects(),
+        'current_room': player.current_room,
+        'attack': stats['attack'],
+        'attack_boost': stats['attack_pct'],
+        'fight_opponent': player.fight_opponent,
+        'fight_hp': player.fight_hp,
+        'room_info': {
+            'name': player.current_room,
+            'description': world.rooms[player.current_room]['description'],
+            'exits': world.rooms[player.current_room]['exits'],
+            # {name: count} of what's lying on the ground
+            'items': world.items.items_in(player.current_room),
+            'npcs': world.get_npcs(player.current_room),
+            # {name: count}, so a crowded room costs no more than a quiet one
+            'mobs': dict(world.mob_counts(player.current_room))
+        },
+        # Global rule: enable regen for all players when not in battle
+        'regen_enabled': (regen_enabled and not _is_in_fight(player))
+    }
+
+def _push_player_info(player, full=False):
+    # Send a full snapshot or a versioned delta to the player's socket
+    sid = player.address
+    if not sid:
+        return
+    payload = _player_info(player)
+    if full:
+        update = player_state.full(sid, payload)
+    else:
+        update = player_state.diff(sid, payload)
+    if update is not None:
+        event, data = update
+        EMITS.labels(event).inc()
+        socketio.emit(event, data, to=sid)
 
 # Server-side regen: gently recover stats to 100% over ~60 seconds when not in battle
-def _start_regen_loop():
-    def loop():
-        import time
-        rate = 100.0 / 60.0  # ~1.67 per second
-        while True:
-            try:
-                if regen_enabled:
-                    for username, player in list(web_players.items()):
-                        # Skip players in combat
-                        if _is_in_fight(player):
-                            continue
-                        # Regenerate stats toward 100
-                        for attr in ('hp', 'endurance', 'willpower'):
-                            val = float(getattr(player, attr, 100))
-                            if val < 100.0:
-                                val = min(100.0, val + rate)
-                                setattr(player, attr, round(val))
-                        # Emit updated stats to this player's socket room
-                        sid = getattr(player, 'address', None)
-                        if sid:
-                            socketio.emit('player_info', {
-                                'name': player.name,
-                                'race': player.race,
-                                'char_class': player.char_class,
-                                'level': player.level,
-                                'xp': player.xp,
-                                'xp_max': player.xp_max,
-                                'credits': getattr(player, 'credits', 0),
-                                'inventory': player.inventory,
-                                'equipment': getattr(player, 'equipment', {}),
-                                'hp': getattr(player, 'hp', 100),
-                                'energy': getattr(player, 'energy', 100),
-                                'endurance': getattr(player, 'endurance', 100),
-                                'willpower': getattr(player, 'willpower', 100),
-                                'strength': getattr(player, 'strength', 10),
-                                'tech': getattr(player, 'tech', 10),
-                                'speed': getattr(player, 'speed', 10),
-                                'abilities': getattr(player, 'abilities', []),
-                                'effects': [
-                                    ('Red Eye', '+10% Attack') if getattr(player, 'attack_boost', 0) > 0 else None,
-                                    ('Neon Blade', '+3 Atk, 15% Crit') if getattr(player, 'equipment', {}).get('weapon') == 'Neon Blade' else None
-                                ],
-                                'current_room': player.current_room,
-                                'rooms': world.rooms,
-                                'attack': player.get_attack() if hasattr(player, 'get_attack') else getattr(player, 'strength', 10),
-                                'attack_boost': getattr(player, 'attack_boost', 0),
-                                'fight_opponent': getattr(player, 'fight_opponent', None),
-                                'fight_hp': getattr(player, 'fight_hp', None),
-                                'room_info': {
-                                    'name': player.current_room,
-                                    'description': world.rooms[player.current_room]['description'],
-                                    'exits': world.rooms[player.current_room]['exits'],
-                                    'items': getattr(player, 'room_items', []),
-                                    'npcs': world.get_npcs(player.current_room),
-                                    'mobs': world.get_mobs_in_room(player.current_room)
-                                },
-                                'regen_enabled': (regen_enabled and not _is_in_fight(player))
-                            }, room=sid)
-                time.sleep(1)
-            except Exception:
-                # Avoid crashing the loop; sleep briefly
-                time.sleep(1)
-    t = threading.Thread(target=loop, daemon=True)
-    t.start()
-
-
-def _start_mob_loop():
-    import time
-    def loop():
-        while True:
-            try:
-                world.tick_roaming()
-                for username, player in list(web_players.items()):
-                    sid = getattr(player, 'address', None)
-                    if sid:
-                        socketio.emit('player_info', {
-                            'name': player.name,
-                            'race': player.race,
-                            'char_class': player.char_class,
-                            'level': player.level,
-                            'xp': player.xp,
-                            'xp_max': player.xp_max,
-                            'inventory': player.inventory,
-                            'equipment': getattr(player, 'equipment', {}),
-                            'hp': getattr(player, 'hp', 100),
-                            'energy': getattr(player, 'energy', 100),
-                            'endurance': getattr(player, 'endurance', 100),
-                            'willpower': getattr(player, 'willpower', 100),
-                            'strength': getattr(player, 'strength', 10),
-                            'tech': getattr(player, 'tech', 10),
-                            'speed': getattr(player, 'speed', 10),
-                            'abilities': getattr(player, 'abilities', []),
-                            'effects': [
-                                ('Red Eye', '+10% Attack') if getattr(player, 'attack_boost', 0) > 0 else None,
-                                ('Neon Blade', '+3 Atk, 15% Crit') if getattr(player, 'equipment', {}).get('weapon') == 'Neon Blade' else None
-                            ],
-                            'current_room': player.current_room,
-                            'rooms': world.rooms,
-                            'attack': player.get_attack() if hasattr(player, 'get_attack') else getattr(player, 'strength', 10),
-                            'attack_boost': getattr(player, 'attack_boost', 0),
-                            'fight_opponent': getattr(player, 'fight_opponent', None),
-                            'fight_hp': getattr(player, 'fight_hp', None),
-                            'room_info': {
-                                'name': player.current_room,
-                                'description': world.rooms[player.current_room]['description'],
-                                'exits': world.rooms[player.current_room]['exits'],
-                                'items': getattr(player, 'room_items', []),
-                                'npcs': world.get_npcs(player.current_room),
-                                'mobs': world.get_mobs_in_room(player.current_room)
-                            },
-                            'regen_enabled': (regen_enabled and not _is_in_fight(player))
-                        }, room=sid)
-                time.sleep(3)
-            except Exception:
-                time.sleep(3)
-    t = threading.Thread(target=loop, daemon=True)
-    t.start()
+REGEN_PER_SECOND = 100.0 / 60.0  # ~1.67 per second
+
+def _regen_system():
+    if not regen_enabled:
+        return
+    rate = REGEN_PER_SECOND * _regen_tick.every * ticker.interval
+    for player in ticker.batched(list(web_players.values())):
+        # Skip players in combat
+        if _is_in_fight(player):
+            continue
+        # Regenerate stats toward 100
+        for attr in ('hp', 'endurance', 'willpower'):
+            val = float(getattr(player, attr))
+            if val < 100.0:
+                val = min(100.0, val + rate)
+                setattr(player, attr, round(val))
+                _stale_players.add(player)
+
+
+def _world_system():
+    # Mob roaming (leader) or adopting the leader's mob state (followers)
+    world_tick(world, cluster)
+
+
+# Interest management: a tick only rebuilds player_info for players whose
+# view may have changed -- near a room whose mobs changed (within
+# INTEREST_RADIUS exits), regenerating, fighting (or just out of a fight),
+# or whose timed buff just ran out. Everyone else is left alone, apart
+# from a periodic sweep that catches anything changed some other way.
+INTEREST_RADIUS = int(os.getenv('INTEREST_RADIUS', '1'))
+FULL_SYNC_SECONDS = float(os.getenv('FULL_SYNC_SECONDS', '30'))
+_stale_players = set()
+_fighting_players = set()
+_last_full_sync = 0.0
+INTEREST_PUSHES = metrics.counter('mud_broadcast_pushes_total', 'player_info rebuilds by the broadcast tick, by reason',
+                                  ('reason',))
+_pushes_interest = INTEREST_PUSHES.labels('interest')
+_pushes_sweep = INTEREST_PUSHES.labels('sweep')
+
+def _broadcast_system():
+    # Push changed fields to interested players, in batches with a yield
+    # in between so command handlers keep running
+    global _stale_players, _fighting_players, _last_full_sync
+    now = time.monotonic()
+    sweep = now - _last_full_sync >= FULL_SYNC_SECONDS
+    if sweep:
+        _last_full_sync = now
+    changed = world.drain_changed_rooms()
+    interest = world.rooms_within(changed, INTEREST_RADIUS) if changed else ()
+    stale, _stale_players = _stale_players, set()
+    was_fighting, _fighting_players = _fighting_players, set()
+    for player in ticker.batched(list(web_players.values())):
+        if player.in_fight:
+            _fighting_players.add(player)
+        if sweep:
+            _pushes_sweep.inc()
+        elif (player.current_room in interest or player in stale or player.in_fight
+              or player in was_fighting or player.stats.expire_due()):
+            _pushes_interest.inc()
+        else:
+            continue
+        _push_player_info(player)
+
+
+# Central game loop: systems run in this order within a tick
+# Runs as a Socket.IO background task so it cooperates with the eventlet hub
+ticker = TickEngine(
+    interval=float(os.getenv('TICK_SECONDS', '1')),
+    sleep=socketio.sleep,
+    batch_size=int(os.getenv('TICK_BATCH_SIZE', '100'))
+)
+if cluster.distributed:
+    # Renew well inside the lease so a healthy leader never lapses
+    ticker.register('election', cluster.campaign, period=cluster.lease_seconds / 3.0)
+ticker.register('world', _world_system, period=float(os.getenv('MOB_TICK_SECONDS', '3')))
+# Every process resolves its own players' fights, leader or not
+world.combat.round_seconds = float(os.getenv('COMBAT_ROUND_SECONDS', '2'))
+world.combat.batched = ticker.batched
+ticker.register('combat', world.combat.tick, period=world.combat.round_seconds)
+_regen_tick = ticker.register('regen', _regen_system, period=1.0)
+ticker.register('broadcast', _broadcast_system)
+ticker.register('saves', save_scheduler.flush, period=save_scheduler.interval)
+ticker.register('items', world.items.flush, period=save_scheduler.interval)
 
 
 # Ensure background loops start in production servers (e.g., Gunicorn on Render)
@@ -196,8 +427,14 @@ _loops_started = False
 def _start_background_loops_once():
     global _loops_started
     if not _loops_started:
-        _start_regen_loop()
-        _start_mob_loop()
+        if cluster.distributed:
+            # Settle leadership before the first world tick
+            cluster.campaign()
+        socketio.start_background_task(ticker.run)
+        _native_threading.Thread(target=mail_sender.run, name='mail-sender', daemon=True).start()
+        if gateway is not None:
+            gateway.slow_log = slow_commands
+            gateway.start()
         _loops_started = True
 
 # Start background loops upon module import (Flask 3 removed before_first_request)
@@ -211,13 +448,51 @@ def index():
     return render_template('index.html')
 
 
+# Password hashing is deliberately slow, so it runs in eventlet's native
+# thread pool (AUTH_HASH_WORKERS at a time, the rest queue) instead of on
+# the hub. Auth POSTs are also rate limited per client address.
+try:
+    from eventlet import tpool as _tpool
+    from eventlet.semaphore import BoundedSemaphore as _GreenSemaphore
+    _hash_workers = int(os.getenv('AUTH_HASH_WORKERS', '4'))
+    passwords = PasswordHasher(
+        concurrency=_hash_workers,
+        max_waiting=int(os.getenv('AUTH_HASH_QUEUE', '64')),
+        execute=_tpool.execute,
+        semaphore=_GreenSemaphore(_hash_workers)
+    )
+except ImportError:
+    passwords = PasswordHasher(concurrency=int(os.getenv('AUTH_HASH_WORKERS', '4')),
+                               max_waiting=int(os.getenv('AUTH_HASH_QUEUE', '64')))
+auth_limiter = RateLimiter(limit=int(os.getenv('AUTH_RATE_LIMIT', '10')),
+                           window=float(os.getenv('AUTH_RATE_WINDOW', '60')))
+AUTH_BUSY_MESSAGE = 'The server is busy. Please try again in a moment.'
+
+def _auth_throttled():
+    # Error message if this client has used up its auth attempts, else None
+    # remote_addr already accounts for TRUSTED_PROXIES (see ProxyFix above)
+    wait = auth_limiter.hit(request.remote_addr or 'unknown')
+    if wait:
+        return f'Too many attempts. Try again in {int(wait) + 1} seconds.'
+    return None
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     error = None
     if request.method == 'POST':
+        error = _auth_throttled()
+        if error:
+            return render_template('login.html', error=error), 429
         username = request.form.get('username')
         password = request.form.get('password')
-        if username in accounts and check_password_hash(accounts[username]['password'], password):
+        _refresh_account(username)
+        try:
+            # Unknown usernames still cost a hash check, so response time
+            # doesn't reveal which accounts exist
+            ok = passwords.check(accounts[username]['password'] if username in accounts else None, password)
+        except AuthBusy:
+            return render_template('login.html', error=AUTH_BUSY_MESSAGE), 503
+        if ok:
             session['username'] = username
             # Require race/class selection if not set
             user = accounts[username]
@@ -236,35 +511,109 @@ def register():
     error = None
     success = None
     if request.method == 'POST':
+        error = _auth_throttled()
+        if error:
+            return render_template('register.html', error=error), 429
         username = request.form.get('username')
         password = request.form.get('password')
         email = request.form.get('email')
+        _refresh_account(username)
         if not username or not password or not email:
             error = 'Username, password, and email required.'
         elif username in accounts:
             error = 'Username already exists.'
         else:
+            try:
+                pwhash = passwords.hash(password)
+            except AuthBusy:
+                return render_template('register.html', error=AUTH_BUSY_MESSAGE), 503
+            # Hashing yielded to other greenthreads; the name may be gone now
+            if username in accounts:
+                return render_template('register.html', error='Username already exists.')
             accounts[username] = {
-                'password': generate_password_hash(password),
+                'password': pwhash,
                 'email': email,
                 'verified': False,
                 'race': None,
                 'char_class': None,
                 'credits': 100
             }
-            save_accounts(accounts)
-            # Send verification email
-            try:
-                token = username  # Simple token for demo
-                verify_url = url_for('verify_email', username=token, _external=True)
-                msg = Message('Verify your MUD account', recipients=[email])
-                msg.body = f'Click to verify your account: {verify_url}'
-                mail.send(msg)
-                success = 'Account created! Check your email to verify.'
-            except Exception as e:
-                error = f'Error sending email: {e}'
+            save_accounts(accounts, [username])
+            # Queue the verification email; the mail sender delivers it
+            token = url_tokens.dumps(username, salt='verify-email')
+            verify_url = url_for('verify_email', token=token, _external=True)
+            outbox.enqueue('Verify your MUD account', [email], f'Click to verify your account: {verify_url}')
+            success = 'Account created! Check your email to verify.'
     return render_template('register.html', error=error, success=success)
 
+@app.route('/verify_email/<token>')
+def verify_email(token):
+    try:
+        username = url_tokens.loads(token, salt='verify-email', max_age=VERIFY_MAX_AGE)
+    except BadSignature:
+        return render_template('login.html', error='That verification link is invalid or has expired.')
+    _refresh_account(username)
+    info = accounts.get(username)
+    if not isinstance(info, dict):
+        return render_template('login.html', error='That account no longer exists.')
+    if not info.get('verified'):
+        info['verified'] = True
+        save_accounts(accounts, [username])
+    return render_template('login.html', success='Email verified. You can log in now.')
+
+def _reset_fingerprint(info):
+    # Ties a reset link to the current password hash, so it stops working
+    # once the password has been changed
+    return hashlib.sha256(info['password'].encode('utf-8')).hexdigest()[:16]
+
+@app.route('/reset_password', methods=['GET', 'POST'])
+def reset_password():
+    success = None
+    if request.method == 'POST':
+        error = _auth_throttled()
+        if error:
+            return render_template('reset_password.html', error=error), 429
+        username = request.form.get('username', '').strip()
+        _refresh_account(username)
+        info = get_user_info(username) if username in accounts else None
+        if info and info.get('email'):
+            token = url_tokens.dumps({'u': username, 'h': _reset_fingerprint(info)}, salt='reset-password')
+            reset_url = url_for('reset_password_token', token=token, _external=True)
+            outbox.enqueue('Reset your MUD password', [info['email']],
+                           f'Someone asked to reset the password for {username}.\n'
+                           f'Set a new one here (valid for one hour): {reset_url}\n'
+                           "If that wasn't you, ignore this email.")
+        # Same answer either way, so the form can't be used to probe for accounts
+        success = 'If that account has an email address, a reset link is on its way.'
+    return render_template('reset_password.html', success=success)
+
+@app.route('/reset_password/<token>', methods=['GET', 'POST'])
+def reset_password_token(token):
+    try:
+        data = url_tokens.loads(token, salt='reset-password', max_age=RESET_MAX_AGE)
+        username = data['u']
+    except (BadSignature, KeyError, TypeError):
+        return render_template('reset_password.html', error='That reset link is invalid or has expired.')
+    _refresh_account(username)
+    info = accounts.get(username)
+    if not isinstance(info, dict) or data.get('h') != _reset_fingerprint(info):
+        return render_template('reset_password.html', error='That reset link is invalid or has expired.')
+    if request.method == 'POST':
+        new_password = request.form.get('new_password', '')
+        if not new_password:
+            return render_template('reset_password.html', token=token, error='Enter a new password.')
+        try:
+            pwhash = passwords.hash(new_password)
+        except AuthBusy:
+            return render_template('reset_password.html', token=token, error=AUTH_BUSY_MESSAGE), 503
+        # Another request may have used the link while this one was hashing
+        if data.get('h') != _reset_fingerprint(info):
+            return render_template('reset_password.html', error='That reset link is invalid or has expired.')
+        info['password'] = pwhash
+        save_accounts(accounts, [username])
+        return render_template('login.html', success='Password updated. You can log in now.')
+    return render_template('reset_password.html', token=token)
+
 # Race/Class selection page
 @app.route('/choose_race_class', methods=['GET', 'POST'])
 def choose_race_class():
@@ -277,16 +626,28 @@ def choose_race_class():
         char_class = request.form.get('char_class')
         if not char_name or not race or not char_class or race not in RACES or char_class not in CLASSES:
             return render_template('choose_race_class.html', error='Please enter a name and select a valid race and class.', races=RACES, classes=CLASSES)
+        # Start from the stored row so fields another worker saved aren't
+        # written back stale
+        _refresh_account(username)
+        if username not in accounts:
+            return redirect(url_for('login'))
         accounts[username]['char_name'] = char_name
         accounts[username]['race'] = race
         accounts[username]['char_class'] = char_class
-        save_accounts(accounts)
+        save_accounts(accounts, [username])
         return redirect(url_for('index'))
     return render_template('choose_race_class.html', races=RACES, classes=CLASSES)
 # Admin tools
 ADMIN_USER = 'admin'
 ADMIN_PASS = generate_password_hash('adminpass')
 
+# Always-on slow-command log, shown on the admin page
+slow_commands = SlowCommandLog(threshold_ms=float(os.getenv('SLOW_COMMAND_MS', '50')))
+# On-demand stack sampler. It samples from a native thread so it still sees
+# a greenthread that is hogging the eventlet hub.
+profiler = SamplingProfiler(threading_module=_native_threading, sleep=_native_time.sleep)
+PROFILE_MAX_SECONDS = 60.0
+
 @app.route('/admin', methods=['GET', 'POST'])
 def admin():
     error = None
@@ -297,16 +658,59 @@ def admin():
         username = request.form.get('username')
         if action == 'delete' and username in accounts:
             del accounts[username]
-            save_accounts(accounts)
-    return render_template('admin.html', users=accounts)
+            account_store.delete(username)
+    save_stats = dict(save_scheduler.stats, queue_depth=save_scheduler.queue_depth())
+    return render_template('admin.html', users=accounts, save_stats=save_stats, tick_stats=ticker.snapshot(),
+                           command_stats=command_registry.timings(), slow_commands=slow_commands.recent(),
+                           slow_threshold_ms=slow_commands.threshold_ms, profiling=profiler.running)
+
+@app.route('/admin/profile')
+def admin_profile():
+    # Sample all stacks for ?seconds=N and download them in collapsed
+    # ("folded") format for flamegraph.pl / speedscope
+    if not session.get('admin'):
+        return redirect(url_for('admin_login'))
+    try:
+        seconds = float(request.args.get('seconds', '10'))
+    except ValueError:
+        seconds = 10.0
+    seconds = max(0.5, min(seconds, PROFILE_MAX_SECONDS))
+    stacks = profiler.profile(seconds, wait=socketio.sleep)
+    if stacks is None:
+        return 'A profile is already running. Try again when it finishes.', 409
+    resp = app.response_class(stacks, mimetype='text/plain')
+    resp.headers['Content-Disposition'] = f'attachment; filename=profile-{time.strftime("%Y%m%d-%H%M%S")}.folded'
+    return resp
+
+@app.route('/admin/stats.json')
+def admin_stats():
+    # Same numbers as the admin page, for scripts (e.g. bench/loadgen.py)
+    if not session.get('admin'):
+        return {'error': 'admin login required'}, 403
+    return {
+        'players': len(web_players),
+        'sessions': len(core.sessions),
+        'saves': dict(save_scheduler.stats, queue_depth=save_scheduler.queue_depth()),
+        'ticks': ticker.snapshot(),
+        'commands': command_registry.timings(),
+        'slow_commands': slow_commands.recent(),
+        'mail': outbox.stats(),
+    }
 
 @app.route('/admin_login', methods=['GET', 'POST'])
 def admin_login():
     error = None
     if request.method == 'POST':
+        error = _auth_throttled()
+        if error:
+            return render_template('login.html', error=error), 429
         username = request.form.get('username')
         password = request.form.get('password')
-        if username == ADMIN_USER and check_password_hash(ADMIN_PASS, password):
+        try:
+            ok = username == ADMIN_USER and passwords.check(ADMIN_PASS, password)
+        except AuthBusy:
+            return render_template('login.html', error=AUTH_BUSY_MESSAGE), 503
+        if ok:
             session['admin'] = True
             return redirect(url_for('admin'))
         else:
@@ -318,18 +722,9 @@ def logout():
     # Persist equipment and progression on logout if possible
     username = session.get('username')
     if username and username in web_players and username in accounts:
-        player = web_players.get(username)
         try:
-            accounts[username]['equipment'] = dict(getattr(player, 'equipment', {}))
-            accounts[username]['xp'] = getattr(player, 'xp', accounts[username].get('xp', 0))
-            accounts[username]['level'] = getattr(player, 'level', accounts[username].get('level', 1))
-            accounts[username]['xp_max'] = getattr(player, 'xp_max', accounts[username].get('xp_max', 100))
-            accounts[username]['credits'] = int(getattr(player, 'credits', accounts[username].get('credits', 0)))
-            accounts[username]['inventory'] = list(getattr(player, 'inventory', accounts[username].get('inventory', [])))
-            accounts[username]['current_room'] = getattr(player, 'current_room', accounts[username].get('current_room', world.start_room))
-            for attr in ('hp', 'energy', 'endurance', 'willpower'):
-                accounts[username][attr] = int(getattr(player, attr, accounts[username].get(attr, 100)))
-            save_accounts(accounts)
+            if _sync_progression(username, web_players.get(username)):
+                save_scheduler.flush([username])
         except Exception:
             pass
     session.pop('username', None)
@@ -343,134 +738,80 @@ def handle_connect():
     if not username:
         emit('message', {'data': 'Not authenticated. Please log in.'})
         return
-    # Create a new Player for this session
-    acc = accounts.get(username, {})
-    player = Player(address=sid, start_room=world.start_room)
-    player.username = username
-    # Use character name if set, else fallback to username
-    player.name = acc.get('char_name', username)
-    # Set race and class from account info
-    player.race = acc.get('race')
-    player.char_class = acc.get('char_class')
-    # Restore persisted equipment if available
-    if isinstance(acc.get('equipment'), dict):
+    # A newer tab takes over the account: save the previous session's
+    # state first, so the new player starts from it and an older snapshot
+    # can't be written over it later
+    previous = web_sessions.get(username)
+    if previous is not None:
         try:
-            player.equipment.update(acc.get('equipment'))
+            if _sync_progression(username, previous.player):
+                save_scheduler.flush([username])
         except Exception:
             pass
-    # Restore persisted progression if available
-    if 'level' in acc:
-        try:
-            player.level = int(acc.get('level', player.level))
-        except Exception:
-            pass
-    if 'xp' in acc:
-        try:
-            player.xp = int(acc.get('xp', player.xp))
-        except Exception:
-            pass
-    # Restore credits if available
-    try:
-        player.credits = int(acc.get('credits', getattr(player, 'credits', 100)))
-    except Exception:
-        pass
-    if 'xp_max' in acc:
-        try:
-            player.xp_max = int(acc.get('xp_max', player.xp_max))
-        except Exception:
-            pass
-    # Restore inventory if available
-    if isinstance(acc.get('inventory'), list):
-        try:
-            player.inventory = list(acc.get('inventory'))
-        except Exception:
-            pass
-    # Restore last location if available
-    if isinstance(acc.get('current_room'), str) and acc.get('current_room') in world.rooms:
-        try:
-            player.current_room = acc.get('current_room')
-        except Exception:
-            pass
-    # Restore core stats if available
-    for attr in ('hp', 'energy', 'endurance', 'willpower'):
-        if attr in acc:
-            try:
-                setattr(player, attr, int(acc.get(attr)))
-            except Exception:
-                pass
+        core.detach(previous, quiet=True)
+    # Create a new Player for this session
+    _refresh_account(username)
+    acc = accounts.get(username, {})
+    # Accepts any saved record version (see Player.from_record)
+    player = Player.from_record(acc, sid, world.start_room, username=username, rooms=world.rooms)
     web_players[username] = player
+    web_sessions[username] = core.attach(WebSession(sid, player), web_frontend)
     welcome = world.describe_room(player.current_room)
     emit('message', {'data': f'Welcome {username}!\n{welcome}'})
-    emit('player_info', {
-        'name': player.name,
-        'race': player.race,
-        'char_class': player.char_class,
-        'level': player.level,
-        'xp': player.xp,
-        'xp_max': player.xp_max,
-        'credits': getattr(player, 'credits', 0),
-        'inventory': player.inventory,
-        'equipment': getattr(player, 'equipment', {}),
-        'hp': getattr(player, 'hp', 100),
-        'energy': getattr(player, 'energy', 100),
-        'endurance': getattr(player, 'endurance', 100),
-        'willpower': getattr(player, 'willpower', 100),
-        'strength': getattr(player, 'strength', 10),
-        'tech': getattr(player, 'tech', 10),
-        'speed': getattr(player, 'speed', 10),
-        'abilities': getattr(player, 'abilities', []),
-        'effects': [
-            ('Red Eye', '+10% Attack') if getattr(player, 'attack_boost', 0) > 0 else None,
-            ('Neon Blade', '+3 Atk, 15% Crit') if getattr(player, 'equipment', {}).get('weapon') == 'Neon Blade' else None
-        ],
-        'current_room': player.current_room,
-        'rooms': world.rooms,
-        'attack': player.get_attack() if hasattr(player, 'get_attack') else getattr(player, 'strength', 10),
-        'attack_boost': getattr(player, 'attack_boost', 0),
-        'fight_opponent': getattr(player, 'fight_opponent', None),
-        'fight_hp': getattr(player, 'fight_hp', None),
-        'room_info': {
-            'name': player.current_room,
-            'description': world.rooms[player.current_room]['description'],
-            'exits': world.rooms[player.current_room]['exits'],
-            'items': getattr(player, 'room_items', []),
-            'npcs': world.get_npcs(player.current_room),
-            'mobs': world.get_mobs_in_room(player.current_room)
-        },
-        'regen_enabled': (regen_enabled and not _is_in_fight(player))
-    })
+    emit('world_map', {'hash': WORLD_MAP_HASH, 'url': url_for('world_map', v=WORLD_MAP_HASH)})
+    _push_player_info(player, full=True)
 
 @socketio.on('disconnect')
 def handle_disconnect():
     username = session.get('username')
-    player = web_players.get(username)
-    # Notify players in the same room that this user disconnected
+    sess = web_sessions.get(username)
+    # Only the account's current socket owns the player (a newer tab may have replaced it)
+    if sess is not None and sess.sid == request.sid:
+        player = sess.player
+        # Persist this player's state right away rather than waiting a cycle
+        try:
+            if _sync_progression(username, player):
+                save_scheduler.flush([username])
+        except Exception:
+            pass
+        # Leaves the world and tells the room
+        core.detach(sess)
+        del web_sessions[username]
+        web_players.pop(username, None)
+    player_state.forget(request.sid)
+
+@socketio.on('player_info_resync')
+def handle_player_info_resync(data=None):
+    # Client detected a version gap in player_info_delta; send a fresh snapshot
+    player = web_players.get(session.get('username'))
     if player is not None:
-        room = getattr(player, 'current_room', None)
-        for u, p in list(web_players.items()):
-            if u != username and getattr(p, 'current_room', None) == room:
-                sid_room = getattr(p, 'address', None)
-                if sid_room:
-                    socketio.emit('message', {'data': f"{player.name} disconnects."}, room=sid_room)
-    if username in web_players:
-        del web_players[username]
+        _push_player_info(player, full=True)
 
 @socketio.on('command')
 def handle_command_event(data):
+    started = time.perf_counter()
+    trace = None
+    try:
+        trace = _run_command_event(data)
+    finally:
+        COMMAND_EVENT_SECONDS.observe(time.perf_counter() - started)
+    if trace is not None:
+        slow_commands.record(trace)
+
+_use_command = command_registry.parse('use')[0]
+
+def _run_command_event(data):
     username = session.get('username')
-    player = web_players.get(username)
-    if not player:
+    sess = web_sessions.get(username)
+    if sess is None or sess.sid != request.sid:
         emit('message', {'data': 'Session error. Please reconnect.'})
         return
+    player = sess.player
     command = data.get('command', '').strip()
     if command.lower() in ('quit', 'exit'):
         emit('message', {'data': 'Goodbye!'})
         return
-    # Built-in command: who (online players)
-    if command.lower() == 'who':
-        online = list(web_players.keys())
-        emit('message', {'data': f"Players online ({len(online)}): " + ", ".join(online)})
-        return
+    trace = CommandTrace(command, username, player.current_room)
     # Intercept name change to persist it
     if command.startswith('name '):
         new_name = command[5:].strip()
@@ -478,113 +819,35 @@ def handle_command_event(data):
             player.name = new_name
             # Save to account data
             if username in accounts:
+                mark = time.perf_counter()
                 accounts[username]['char_name'] = new_name
-                save_accounts(accounts)
-    # Handle command; guard against None responses
-    # Track room before command to detect movement
-    prev_room = getattr(player, 'current_room', None)
-    try:
-        response = handle_command(command, player, world, accounts=accounts, save_accounts=save_accounts)
-    except TypeError:
-        # Backward compatibility with older signature
-        response = handle_command(command, player, world)
-    if not isinstance(response, str):
-        response = ''
+                save_accounts(accounts, [username])
+                trace.add('persist', time.perf_counter() - mark)
+    # The core runs the command, sends the reply and handles room
+    # enter/leave notices; what's left here is web-only presentation
+    stimpacks = player.inventory.count('Stimpack')
+    response = core.command(sess, command, trace=trace, accounts=accounts, save_accounts=save_accounts)
+    mark = time.perf_counter()
     # Detect if player was hit (simple example: response contains 'You were hit')
     if response and ('You were hit' in response or 'damage' in response):
         emit('player_hit')
     # Trigger crit visual when battle log includes CRIT!
     if response and ('CRIT!' in response):
         emit('player_crit')
-    # Trigger heal visual when using Stimpack
-    if response and ('Stimpack' in response or 'health and endurance surge' in response):
+    # Trigger heal visual when a 'use' actually consumed a Stimpack (not
+    # on any reply that merely mentions one, e.g. look/take/drop)
+    if player.inventory.count('Stimpack') < stimpacks and command_registry.parse(command)[0] is _use_command:
         emit('player_heal')
-    if response:
-        emit('message', {'data': response})
-    # If player moved rooms, notify them and others in the new room
-    new_room = getattr(player, 'current_room', None)
-    if prev_room != new_room and new_room is not None:
-        # Notify players in the previous room that this player left
-        if prev_room is not None:
-            for u, p in web_players.items():
-                if u != username and getattr(p, 'current_room', None) == prev_room:
-                    sid_prev = getattr(p, 'address', None)
-                    if sid_prev:
-                        socketio.emit('message', {'data': f"{player.name} leaves the room."}, room=sid_prev)
-        # Notify this player of others present
-        others = [u for u, p in web_players.items() if u != username and getattr(p, 'current_room', None) == new_room]
-        if others:
-            emit('message', {'data': f"You see {', '.join(others)} here."})
-        # Notify other players in the room that this player arrived
-        for u, p in web_players.items():
-            if u != username and getattr(p, 'current_room', None) == new_room:
-                sid_other = getattr(p, 'address', None)
-                if sid_other:
-                    socketio.emit('message', {'data': f"{player.name} enters the room."}, room=sid_other)
-    # Detect if player was hit (simple example: response contains 'You were hit')
-    if response and ('You were hit' in response or 'damage' in response):
-        emit('player_hit')
-    if response and ('CRIT!' in response):
-        emit('player_crit')
-    if response and ('Stimpack' in response or 'health and endurance surge' in response):
-        emit('player_heal')
-    # Send updated player info after each command
-    emit('player_info', {
-        'name': player.name,
-        'race': player.race,
-        'char_class': player.char_class,
-        'level': player.level,
-        'xp': player.xp,
-        'xp_max': player.xp_max,
-        'inventory': player.inventory,
-        'equipment': getattr(player, 'equipment', {}),
-        'hp': getattr(player, 'hp', 100),
-        'energy': getattr(player, 'energy', 100),
-        'endurance': getattr(player, 'endurance', 100),
-        'willpower': getattr(player, 'willpower', 100),
-        'strength': getattr(player, 'strength', 10),
-        'tech': getattr(player, 'tech', 10),
-        'speed': getattr(player, 'speed', 10),
-        'abilities': getattr(player, 'abilities', []),
-        'effects': [
-            ('Red Eye', '+10% Attack') if getattr(player, 'attack_boost', 0) > 0 else None,
-            ('Neon Blade', '+3 Atk, 15% Crit') if getattr(player, 'equipment', {}).get('weapon') == 'Neon Blade' else None
-        ],
-        'current_room': player.current_room,
-        'rooms': world.rooms,
-        'attack': player.get_attack() if hasattr(player, 'get_attack') else getattr(player, 'strength', 10),
-        'attack_boost': getattr(player, 'attack_boost', 0),
-        'fight_opponent': getattr(player, 'fight_opponent', None),
-        'fight_hp': getattr(player, 'fight_hp', None),
-        'room_info': {
-            'name': player.current_room,
-            'description': world.rooms[player.current_room]['description'],
-            'exits': world.rooms[player.current_room]['exits'],
-            'items': getattr(player, 'room_items', []),
-            'npcs': world.get_npcs(player.current_room),
-            'mobs': world.get_mobs_in_room(player.current_room)
-        },
-        # Global rule: enable regen for all players when not in battle
-        'regen_enabled': (regen_enabled and not _is_in_fight(player))
-    })
-    # Persist progression (XP, Level) after each command
-    if username in accounts:
-        accounts[username]['xp'] = getattr(player, 'xp', accounts[username].get('xp', 0))
-        accounts[username]['level'] = getattr(player, 'level', accounts[username].get('level', 1))
-        accounts[username]['xp_max'] = getattr(player, 'xp_max', accounts[username].get('xp_max', 100))
-        # Persist equipment (e.g., after equip/unequip/use commands)
-        accounts[username]['equipment'] = dict(getattr(player, 'equipment', {}))
-        accounts[username]['credits'] = int(getattr(player, 'credits', accounts[username].get('credits', 0)))
-        accounts[username]['inventory'] = list(getattr(player, 'inventory', accounts[username].get('inventory', [])))
-        accounts[username]['current_room'] = getattr(player, 'current_room', accounts[username].get('current_room', world.start_room))
-        for attr in ('hp', 'energy', 'endurance', 'willpower'):
-            accounts[username][attr] = int(getattr(player, attr, accounts[username].get(attr, 100)))
-        try:
-            save_accounts(accounts)
-        except Exception:
-            pass
+    # Send updated player info after each command (changed fields only)
+    _push_player_info(player)
+    persisting = time.perf_counter()
+    trace.add('emit', persisting - mark)
+    # Mark progression dirty; the save scheduler writes it out shortly
+    _sync_progression(username, player)
+    trace.add('persist', time.perf_counter() - persisting)
+    return trace
 
 if __name__ == '__main__':
     # Start background loops and run the development server
     _start_background_loops_once()
-    socketio.run(app, host='0.0.0.0', port=5000)
+    socketio.run(app, host='0.0.0.0', port=int(os.getenv('PORT', '5000')))
@@ -0,0 +1,35 @@
+import os
+import time
+from game.world import World
+from networking.cluster import Cluster, world_tick
+
+# Dedicated world-simulation process for cluster mode. Run one (or more, for
+# failover) next to web workers started with GAME_ROLE=edge; the elected
+# leader owns mob state and publishes it to Redis every tick.
+
+def main():
+    url = os.getenv('REDIS_URL')
+    if not url:
+        raise SystemExit('worldsim.py needs REDIS_URL to share the world with web workers')
+    world = World()
+    cluster = Cluster(url)
+    interval = float(os.getenv('MOB_TICK_SECONDS', '3'))
+    print(f"World simulation {cluster.node_id} started")
+    try:
+        while True:
+            was_leader = cluster.is_leader()
+            cluster.campaign()
+            if cluster.is_leader() and not was_leader:
+                # Take over from the last published state, not our own seed
+                mobs = cluster.fetch_mobs()
+                if mobs is not None:
+                    world.replace_mobs(mobs)
+                print(f"{cluster.node_id} is now the world leader")
+            if cluster.is_leader():
+                world_tick(world, cluster)
+            time.sleep(interval)
+    finally:
+        cluster.resign()
+
+if __name__ == "__main__":
+    main()